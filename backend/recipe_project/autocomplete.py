@@ -0,0 +1,159 @@
+"""
+Typeahead suggestions for the search box: the user's recipe and stretch
+titles, tags and ingredient names that have a word starting with a prefix.
+
+Titles and tags are stored in recipes.AutocompleteTerm once per word they
+could be matched from ("herby stew", "stew"), so a prefix is one range scan
+of the (created_by, key) index. Rows belong to a recipe or stretch: they are
+replaced when its title or tags change (the apps' signals and the
+bulk/import paths call replace_terms/store_terms) and go away with it
+through the foreign key. Ingredients are suggested from the ingredient
+token index, which already has a row per word of every ingredient line.
+"""
+import re
+import unicodedata
+
+from django.db import connection, transaction
+from django.db.models import Count
+from recipes.models import AutocompleteTerm, IngredientToken, Recipe
+
+MAX_KEY_LENGTH = 100
+MAX_LABEL_LENGTH = 200
+# Words of a label it can be found from: "slow cooker pulled pork" is not
+# worth six rows.
+MAX_KEY_WORDS = 4
+MAX_SUGGESTIONS = 20
+INDEXED_FIELDS = {'title', 'tags'}
+TITLE_KINDS = ['recipe', 'stretch']
+# Response key per kind.
+GROUPS = {'recipe': 'recipes', 'stretch': 'stretches', 'tag': 'tags', 'ingredient': 'ingredients'}
+
+
+def normalize_key(text):
+    """Lower-cased, accents and punctuation dropped, whitespace collapsed."""
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(re.sub(r'[^\w\s]', ' ', text.lower()).split())
+
+
+def label_keys(label):
+    words = normalize_key(label).split()
+    keys = (' '.join(words[index:])[:MAX_KEY_LENGTH] for index in range(min(len(words), MAX_KEY_WORDS)))
+    return list(dict.fromkeys(keys))
+
+
+def object_labels(obj):
+    """
+    (kind, label) pairs for a recipe or stretch, each label once. Works on
+    historical models too, for the migration that fills the index.
+    """
+    kind = obj._meta.model_name
+    labels = [(kind, obj.title)]
+    labels.extend(('tag', tag) for tag in obj.tags)
+    return labels
+
+
+def term_rows(objects):
+    """(created_by_id, kind, key, label, recipe_id, stretch_id) per row."""
+    rows = []
+    for obj in objects:
+        recipe_id, stretch_id = (obj.pk, None) if obj._meta.model_name == 'recipe' else (None, obj.pk)
+        for kind, label in object_labels(obj):
+            label = label[:MAX_LABEL_LENGTH]
+            rows.extend(
+                (obj.created_by_id, kind, key, label, recipe_id, stretch_id)
+                for key in label_keys(label)
+            )
+    return rows
+
+
+def insert_rows(rows, table=AutocompleteTerm._meta.db_table):
+    """
+    Inserts term rows with one INSERT ... SELECT unnest() statement, like
+    recipes.signals.store_ingredient_tokens.
+    """
+    if not rows:
+        return
+    columns = ', '.join(
+        connection.ops.quote_name(column)
+        for column in ('created_by_id', 'kind', 'key', 'label', 'recipe_id', 'stretch_id')
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {connection.ops.quote_name(table)} ({columns}) '
+            'SELECT * FROM unnest(%s::integer[], %s::varchar[], %s::varchar[], %s::varchar[], %s::bigint[], %s::bigint[])',
+            [list(column) for column in zip(*rows)]
+        )
+
+
+def store_terms(objects):
+    """Indexes newly created recipes or stretches."""
+    insert_rows(term_rows(objects))
+
+
+def replace_terms(objects):
+    """Re-indexes recipes or stretches (all of one model) after a change."""
+    objects = list(objects)
+    if not objects:
+        return
+    owner = 'recipe' if isinstance(objects[0], Recipe) else 'stretch'
+    with transaction.atomic():
+        AutocompleteTerm.objects.filter(**{f'{owner}__in': [obj.pk for obj in objects]}).delete()
+        store_terms(objects)
+
+
+def affects_terms(fields):
+    """Whether a save/bulk update of `fields` (None: all) changes the index."""
+    return fields is None or bool(INDEXED_FIELDS.intersection(fields))
+
+
+def suggest(user, prefix, limit):
+    """
+    Up to `limit` suggestions per kind for `prefix`: titles in alphabetical
+    order of the matching words, with their object's id, tags by how many
+    of the user's recipes and stretches use them and ingredient words by how
+    many of the user's ingredient lines use them.
+    """
+    key = normalize_key(prefix)[:MAX_KEY_LENGTH]
+    results = {group: [] for group in GROUPS.values()}
+    if not key:
+        return results
+    terms = AutocompleteTerm.objects.filter(created_by=user, key__startswith=key)
+
+    # Titles come straight off the index, one LIMIT-ed range per kind. A
+    # title can match from two of its words, so a few extra rows are read
+    # for the duplicates.
+    recipe_titles, stretch_titles = (
+        terms.filter(kind=kind).order_by('key', 'label').values_list('kind', 'label', 'recipe_id', 'stretch_id')[:limit * 2]
+        for kind in TITLE_KINDS
+    )
+    titles = recipe_titles.union(stretch_titles, all=True)
+    seen = set()
+    for kind, label, recipe_id, stretch_id in titles:
+        group = results[GROUPS[kind]]
+        object_id = recipe_id or stretch_id
+        if len(group) < limit and (kind, object_id) not in seen:
+            seen.add((kind, object_id))
+            group.append({'id': object_id, 'title': label})
+
+    # Each object has a tag once per key, so the rows of a (key, label) are
+    # its uses; they are adjacent in the index and grouped without a sort.
+    tags = (
+        terms.filter(kind='tag').values('key', 'label').annotate(uses=Count('*'))
+        .order_by('-uses', 'key', 'label')[:limit * 2]
+    )
+    for row in tags:
+        if len(results['tags']) < limit and row['label'] not in seen:
+            seen.add(row['label'])
+            results['tags'].append({'name': row['label'], 'count': row['uses']})
+
+    # Ingredient lines rather than distinct recipes: the count then comes
+    # from an index-only scan, and a recipe rarely names a word twice.
+    ingredients = (
+        IngredientToken.objects.filter(created_by=user, token__startswith=key)
+        .values('token').annotate(uses=Count('*'))
+        .order_by('-uses', 'token')[:limit]
+    )
+    results['ingredients'] = [{'name': row['token'], 'count': row['uses']} for row in ingredients]
+    return results
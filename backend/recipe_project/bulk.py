@@ -0,0 +1,220 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import generics, serializers, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+# Per-item status for valid items of a batch that was rejected because of
+# other items (WebDAV "Failed Dependency").
+HTTP_424_FAILED_DEPENDENCY = 424
+
+
+class BulkDeleteSerializer(serializers.Serializer):
+    def get_fields(self):
+        # Built per request, so BULK_MAX_ITEMS is read when it is used.
+        return {
+            'ids': serializers.ListField(
+                child=serializers.IntegerField(), allow_empty=False, max_length=settings.BULK_MAX_ITEMS
+            ),
+        }
+
+
+class BulkWriteView(generics.GenericAPIView):
+    """
+    Batch create (POST), partial update (PATCH) and delete (DELETE) for a
+    model serializer.
+
+    Every item is validated with the regular serializer, then all rows are
+    written with bulk_create/bulk_update in one transaction. A batch is all
+    or nothing: if any item fails, nothing is written and the response lists
+    the errors per item, in request order.
+
+    Subclasses set `items_key` (the request/response list name) and
+    `m2m_fields` (write-only list field -> model M2M field), and can use
+    `before_write`/`after_write` for denormalized data that post_save
+    signals would otherwise maintain.
+    """
+    items_key = 'items'
+    m2m_fields = {}
+
+    def get_items(self, request, key):
+        items = request.data.get(key) if isinstance(request.data, dict) else None
+        if not isinstance(items, list) or not items:
+            return None, Response(
+                {'error': f'{key} must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > settings.BULK_MAX_ITEMS:
+            return None, Response(
+                {'error': f'At most {settings.BULK_MAX_ITEMS} items per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return items, None
+
+    def rejected(self, results):
+        for result in results:
+            if 'status' not in result:
+                result['status'] = HTTP_424_FAILED_DEPENDENCY
+        return Response(
+            {'error': 'Batch rejected, nothing was saved', 'results': results},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    def validate(self, items, instances=None):
+        """
+        Returns (validated_data list, results list, ok). With instances,
+        items are validated as partial updates of the matching instance.
+        """
+        validated, results, ok = [], [], True
+        # One serializer for the whole batch: building its fields costs more
+        # than validating an item.
+        serializer = self.get_serializer(partial=instances is not None)
+        for index, item in enumerate(items):
+            result = {'index': index}
+            results.append(result)
+            if instances is not None:
+                serializer.instance = instances.get(item.get('id')) if isinstance(item, dict) else None
+                if serializer.instance is None:
+                    result.update(status=status.HTTP_404_NOT_FOUND, errors={'id': ['Not found.']})
+                    ok = False
+                    continue
+
+            serializer.initial_data = item
+            try:
+                validated.append(serializer.run_validation(item))
+            except ValidationError as exc:
+                result.update(status=status.HTTP_400_BAD_REQUEST, errors=exc.detail)
+                ok = False
+
+        if ok:
+            errors = self.validate_batch(validated)
+            for index, error in errors.items():
+                results[index].update(status=status.HTTP_400_BAD_REQUEST, errors=error)
+                ok = False
+        return validated, results, ok
+
+    def validate_batch(self, validated):
+        """
+        Checks that need one query for the whole batch (e.g. foreign keys).
+        Returns {index: errors}.
+        """
+        return {}
+
+    def split_m2m(self, data):
+        data = dict(data)
+        m2m = {field: data.pop(key) for key, field in self.m2m_fields.items() if key in data}
+        return data, m2m
+
+    def set_m2m(self, instances, m2m_values, replace=False):
+        model = self.get_serializer_class().Meta.model
+        for field in set(self.m2m_fields.values()):
+            through = getattr(model, field).through
+            source = model._meta.get_field(field).m2m_field_name()
+            target = model._meta.get_field(field).m2m_reverse_field_name()
+            changed = [
+                (instance, values[field])
+                for instance, values in zip(instances, m2m_values) if field in values
+            ]
+            if not changed:
+                continue
+            if replace:
+                through.objects.filter(**{f'{source}__in': [instance.pk for instance, _ in changed]}).delete()
+            through.objects.bulk_create([
+                through(**{f'{source}_id': instance.pk, f'{target}_id': pk})
+                for instance, pks in changed for pk in dict.fromkeys(pks)
+            ], batch_size=1000)
+
+    def before_write(self, instances, fields):
+        """
+        Called inside the transaction before the rows are written. fields is
+        None for created instances, otherwise the set of updated field names,
+        which may be extended with fields set here.
+        """
+
+    def after_write(self, instances, fields):
+        """
+        Called inside the transaction after the rows and M2M rows are written.
+        """
+
+    def get_create_kwargs(self):
+        return {'created_by': self.request.user}
+
+    def post(self, request, *args, **kwargs):
+        items, error = self.get_items(request, self.items_key)
+        if error:
+            return error
+        validated, results, ok = self.validate(items)
+        if not ok:
+            return self.rejected(results)
+
+        model = self.get_serializer_class().Meta.model
+        instances, m2m_values = [], []
+        for data in validated:
+            data, m2m = self.split_m2m(data)
+            instances.append(model(**data, **self.get_create_kwargs()))
+            m2m_values.append(m2m)
+
+        with transaction.atomic():
+            self.before_write(instances, None)
+            model.objects.bulk_create(instances, batch_size=1000)
+            self.set_m2m(instances, m2m_values)
+            self.after_write(instances, None)
+
+        for result, instance in zip(results, instances):
+            result.update(status=status.HTTP_201_CREATED, id=instance.pk)
+        return Response({'results': results}, status=status.HTTP_201_CREATED)
+
+    def patch(self, request, *args, **kwargs):
+        items, error = self.get_items(request, self.items_key)
+        if error:
+            return error
+        ids = [item.get('id') for item in items if isinstance(item, dict)]
+        instances = self.get_queryset().in_bulk([pk for pk in ids if isinstance(pk, int)])
+        validated, results, ok = self.validate(items, instances)
+        if not ok:
+            return self.rejected(results)
+
+        now = timezone.now()
+        changed, m2m_values, fields = [], [], {'updated_at'}
+        for item, data in zip(items, validated):
+            instance = instances[item['id']]
+            data, m2m = self.split_m2m(data)
+            for field, value in data.items():
+                setattr(instance, field, value)
+            instance.updated_at = now
+            fields.update(data)
+            changed.append(instance)
+            m2m_values.append(m2m)
+
+        model = self.get_serializer_class().Meta.model
+        with transaction.atomic():
+            self.before_write(changed, fields)
+            model.objects.bulk_update(changed, [model._meta.get_field(name).name for name in fields], batch_size=500)
+            self.set_m2m(changed, m2m_values, replace=True)
+            self.after_write(changed, fields)
+
+        for result, instance in zip(results, changed):
+            result.update(status=status.HTTP_200_OK, id=instance.pk)
+        return Response({'results': results})
+
+    def delete(self, request, *args, **kwargs):
+        serializer = BulkDeleteSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        ids = serializer.validated_data['ids']
+        existing = set(self.get_queryset().filter(pk__in=ids).values_list('pk', flat=True))
+        results = [
+            {'index': index, 'id': pk}
+            if pk in existing else
+            {'index': index, 'id': pk, 'status': status.HTTP_404_NOT_FOUND}
+            for index, pk in enumerate(ids)
+        ]
+        if len(existing) < len(set(ids)):
+            return self.rejected(results)
+
+        with transaction.atomic():
+            self.get_queryset().filter(pk__in=existing).delete()
+
+        for result in results:
+            result['status'] = status.HTTP_204_NO_CONTENT
+        return Response({'results': results})
@@ -0,0 +1,148 @@
+"""
+Response compression negotiated from Accept-Encoding: brotli or gzip,
+whichever the client weighs higher, brotli on a tie.
+
+Only text-like bodies of at least COMPRESS_MIN_SIZE bytes are compressed;
+below that the headers outweigh the saving. A buffered body is kept
+uncompressed when compressing does not make it smaller. Streaming bodies
+(the library export) are compressed chunk by chunk and flushed after each
+one, so the client keeps receiving data as it is produced.
+
+Tokens travel in HttpOnly cookies, never in response bodies, so compressed
+responses do not expose them to BREACH-style length attacks.
+"""
+import time
+import zlib
+
+import brotli
+from django.conf import settings
+from django.http import FileResponse
+from django.utils.cache import patch_vary_headers
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/x-ndjson', 'application/javascript', 'image/svg+xml')
+
+
+class GzipCoder:
+    name = 'gzip'
+
+    def __init__(self):
+        # wbits=31: a gzip header and trailer around the deflate stream.
+        self.compressor = zlib.compressobj(settings.COMPRESS_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self.compressor.compress(data) + self.compressor.flush()
+
+    def process(self, data):
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+class BrotliCoder:
+    name = 'br'
+
+    def __init__(self):
+        self.compressor = brotli.Compressor(quality=settings.COMPRESS_BROTLI_QUALITY)
+
+    def compress(self, data):
+        return self.compressor.process(data) + self.compressor.finish()
+
+    def process(self, data):
+        return self.compressor.process(data) + self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+# In order of preference.
+CODERS = [BrotliCoder, GzipCoder]
+
+
+def accepted_encodings(header):
+    """Parses Accept-Encoding into {coding: q}."""
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(header):
+    """The coder class to use for an Accept-Encoding header, or None."""
+    accepted = accepted_encodings(header)
+    best, best_q = None, 0.0
+    for coder in CODERS:
+        q = accepted.get(coder.name, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coder, q
+    return best
+
+
+def is_compressible(content_type):
+    return content_type.split(';')[0].strip().lower().startswith(COMPRESSIBLE_TYPES)
+
+
+def compress_stream(chunks, coder):
+    for chunk in chunks:
+        if chunk:
+            yield coder.process(chunk)
+    yield coder.finish()
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses as described in the module docstring. Asynchronous
+    streaming bodies are passed through; the API does not produce any.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            response.has_header('Content-Encoding')
+            or isinstance(response, FileResponse)
+            or not is_compressible(response.get('Content-Type', ''))
+            or (response.streaming and response.is_async)
+            or (not response.streaming and len(response.content) < settings.COMPRESS_MIN_SIZE)
+        ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        coder = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if coder is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_stream(response.streaming_content, coder())
+            del response['Content-Length']
+        else:
+            started = time.perf_counter()
+            compressed = coder().compress(response.content)
+            timing = getattr(request, 'timing', None)
+            if timing is not None:
+                timing.compress += time.perf_counter() - started
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # The compressed body is a different representation of the resource.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = f'W/{etag}'
+        response['Content-Encoding'] = coder.name
+        return response
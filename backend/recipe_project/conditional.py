@@ -0,0 +1,123 @@
+import hashlib
+from calendar import timegm
+
+from django.db.models import Count, Max, Subquery, Value
+from django.db.models.constants import LOOKUP_SEP
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified support for GET on generic list and detail views.
+
+    The validators come from one aggregate query -- MAX() of
+    `last_modified_fields` and the row count -- over the object (detail) or
+    the filtered queryset (list), so an unchanged resource is answered with
+    304 Not Modified before any serializer is built.
+
+    Writes that change a payload without touching the row itself (images,
+    routine items) bump the parent's updated_at in the apps' signals.
+    Shared rows nested in the payload (categories, body parts) are listed
+    in `related_validator_models`: the newest updated_at and the row count
+    of each table are folded into the same query, so renaming or deleting
+    one changes the validators of every resource showing it. The nested
+    user is the requesting one, whose fields go into the ETag as they are.
+    """
+    last_modified_fields = ['updated_at']
+    related_validator_models = []
+    etag = None
+    _filtered_queryset = None
+
+    def get(self, request, *args, **kwargs):
+        validators = self.get_conditional_validators()
+        if validators is None:
+            return super().get(request, *args, **kwargs)
+
+        etag, last_modified = validators
+        # Kept for views that also key server-side caches on the validators.
+        self.etag = etag
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=timegm(last_modified.utctimetuple()) if last_modified else None,
+        )
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(timegm(last_modified.utctimetuple()))
+        # Per-user data: browsers may keep it but must revalidate each time.
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def filter_queryset(self, queryset):
+        # On GET the validators and the list (or get_object()) both filter
+        # get_queryset(): filter it once, so filters are validated (and
+        # their choices looked up) once per request.
+        if self.request.method != 'GET':
+            return super().filter_queryset(queryset)
+        if self._filtered_queryset is None:
+            self._filtered_queryset = super().filter_queryset(queryset)
+        return self._filtered_queryset.all()
+
+    def get_validator_queryset(self):
+        queryset = self.get_queryset()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in self.kwargs:
+            return queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return self.filter_queryset(queryset)
+
+    def get_conditional_validators(self):
+        """
+        Returns (quoted ETag, last-modified datetime), or None when the
+        object does not exist and the view should produce its own 404.
+        """
+        aggregates = {
+            f'last_modified_{index}': Max(field)
+            for index, field in enumerate(self.last_modified_fields)
+        }
+        # Joined relations repeat rows. Without them COUNT(*) avoids sorting
+        # every row of a large list, and with MAX(updated_at) can be answered
+        # from an index on (created_by, updated_at) alone.
+        if any(LOOKUP_SEP in field for field in self.last_modified_fields):
+            aggregates['count'] = Count('pk', distinct=True)
+        else:
+            aggregates['count'] = Count('*')
+        # Uncorrelated subqueries, evaluated once per query.
+        related_counts = []
+        for index, model in enumerate(self.related_validator_models):
+            table = model.objects.order_by().annotate(table=Value(1)).values('table')
+            aggregates[f'last_modified_related_{index}'] = Max(
+                Subquery(table.annotate(last_modified=Max('updated_at')).values('last_modified'))
+            )
+            aggregates[f'related_count_{index}'] = Max(Subquery(table.annotate(count=Count('*')).values('count')))
+            related_counts.append(f'related_count_{index}')
+        values = self.get_validator_queryset().order_by().aggregate(**aggregates)
+
+        count = values.pop('count')
+        related_counts = [str(values.pop(name)) for name in related_counts]
+        is_detail = (self.lookup_url_kwarg or self.lookup_field) in self.kwargs
+        if is_detail and not count:
+            return None
+
+        timestamps = [value for value in values.values() if value is not None]
+        last_modified = max(timestamps) if timestamps else None
+
+        user = self.request.user
+        fingerprint = '|'.join([
+            type(self).__name__,
+            str(user.pk),
+            user.get_username(),
+            user.email,
+            user.first_name,
+            user.last_name,
+            self.request.get_full_path(),
+            last_modified.isoformat() if last_modified else '',
+            str(count),
+            *related_counts,
+        ])
+        return quote_etag(hashlib.md5(fingerprint.encode('utf-8')).hexdigest()), last_modified
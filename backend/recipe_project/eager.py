@@ -0,0 +1,202 @@
+import threading
+from collections import OrderedDict
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import ForeignObjectRel, GeneratedField, Prefetch
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from .fieldsets import SparseFieldsetMixin, requested_fieldset
+
+_plans = {}
+# Plans for ?fields=/?expand= combinations, least recently used dropped first.
+MAX_FIELDSET_PLANS = 256
+_fieldset_plans = OrderedDict()
+_fieldset_lock = threading.Lock()
+
+
+def uses_fields(*names):
+    """
+    Declares the model fields that a model method or SerializerMethodField
+    reads, so the eager-loading planner loads them. Names may be relations,
+    which are then joined and loaded in full.
+    """
+    def decorate(method):
+        method.uses_fields = names
+        return method
+    return decorate
+
+
+class Plan:
+    """
+    How to load a model for a serializer: select_related paths, prefetches
+    as (path, model, Plan) and the columns to pass to only().
+    """
+
+    def __init__(self, only=()):
+        self.select = []
+        self.prefetch = []
+        self.only = set(only)
+
+    @classmethod
+    def full(cls, model):
+        return cls(
+            field.name for field in model._meta.concrete_fields
+            if not isinstance(field, GeneratedField)
+        )
+
+    def merge(self, path, child):
+        self.select.append(path)
+        self.select.extend(f'{path}__{select}' for select in child.select)
+        self.prefetch.extend((f'{path}__{prefetch}', model, plan) for prefetch, model, plan in child.prefetch)
+        self.only.add(path)
+        self.only.update(f'{path}__{name}' for name in child.only)
+
+    def apply(self, queryset, restrict=True):
+        if self.select:
+            queryset = queryset.select_related(*self.select)
+        for path, model, plan in self.prefetch:
+            queryset = queryset.prefetch_related(
+                Prefetch(path, queryset=plan.apply(model._default_manager.all(), restrict))
+            )
+        if restrict:
+            queryset = queryset.only(*self.only)
+        return queryset
+
+
+def _model_field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        # Reverse relations are reached through their accessor (routinestretch_set).
+        for relation in model._meta.related_objects:
+            if relation.get_accessor_name() == name:
+                return relation
+    return None
+
+
+def _nested(field):
+    if isinstance(field, serializers.ListSerializer):
+        return field.child
+    if isinstance(field, serializers.BaseSerializer):
+        return field
+    return None
+
+
+def _renders_keys(field):
+    if isinstance(field, serializers.ManyRelatedField):
+        field = field.child_relation
+    return isinstance(field, serializers.PrimaryKeyRelatedField)
+
+
+def _add(plan, model, name, nested=None, keys_only=False):
+    """
+    Plans loading model.<name> for a serializer field (nested is its
+    serializer, if any; keys_only when only primary keys are rendered).
+    Returns False when name is undeclared code, in which case every column
+    of the model has to be loaded.
+    """
+    field = _model_field(model, name)
+    if field is None:
+        declared = getattr(getattr(model, name, None), 'uses_fields', None)
+        if declared is None:
+            return False
+        return all([_add(plan, model, declared_name) for declared_name in declared])
+
+    if not field.is_relation:
+        plan.only.add(field.name)
+        return True
+
+    related = field.related_model
+    if keys_only and field.many_to_one:
+        plan.only.add(field.name)
+        return True
+    if keys_only:
+        child = Plan([related._meta.pk.name])
+    else:
+        child = _build(nested, related) if nested is not None else Plan.full(related)
+    if field.many_to_many or field.one_to_many:
+        if isinstance(field, ForeignObjectRel):
+            # Prefetched rows are matched to their parent on the FK column.
+            child.only.add(field.field.name)
+        plan.prefetch.append((name, related, child))
+    elif name == field.attname:
+        # category_id: the column is enough.
+        plan.only.add(field.name)
+    else:
+        plan.merge(name, child)
+    return True
+
+
+def _build(serializer, model):
+    plan = Plan()
+    complete = True
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.SerializerMethodField):
+            declared = getattr(getattr(serializer, field.method_name), 'uses_fields', None)
+            if declared is None:
+                complete = False
+            else:
+                complete &= all([_add(plan, model, name) for name in declared])
+        elif field.source == '*':
+            complete = False
+        elif _renders_keys(field):
+            complete &= _add(plan, model, field.source_attrs[0], keys_only=len(field.source_attrs) == 1)
+        else:
+            # Dotted sources are planned up to their first hop.
+            nested = _nested(field) if len(field.source_attrs) == 1 else None
+            complete &= _add(plan, model, field.source_attrs[0], nested)
+
+    if not complete:
+        plan.only.update(Plan.full(model).only)
+    return plan
+
+
+def plan_for(serializer_class, model, fieldset=None):
+    if fieldset is None or not issubclass(serializer_class, SparseFieldsetMixin):
+        key = (serializer_class, model)
+        if key not in _plans:
+            _plans[key] = _build(serializer_class(), model)
+        return _plans[key]
+
+    key = (serializer_class, model, fieldset)
+    with _fieldset_lock:
+        plan = _fieldset_plans.get(key)
+        if plan is not None:
+            _fieldset_plans.move_to_end(key)
+            return plan
+    # Raises ValidationError for unknown fields, before anything is cached.
+    plan = _build(serializer_class(context={'fieldset': fieldset}), model)
+    with _fieldset_lock:
+        _fieldset_plans[key] = plan
+        if len(_fieldset_plans) > MAX_FIELDSET_PLANS:
+            _fieldset_plans.popitem(last=False)
+    return plan
+
+
+def eager_load(queryset, serializer_class, restrict=True, fieldset=None):
+    return plan_for(serializer_class, queryset.model, fieldset).apply(queryset, restrict)
+
+
+class EagerLoadingMixin:
+    """
+    Loads what the view's serializer renders, derived once per serializer
+    class from its field tree: select_related for nested objects,
+    prefetch_related (planned recursively) for nested lists and, on reads,
+    only() for the columns the fields use.
+
+    Model methods and SerializerMethodFields declare what they read with
+    @uses_fields; a serializer with undeclared ones loads every column.
+    Serializers with SparseFieldsetMixin are planned for the requested
+    ?fields=/?expand=.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method == 'DELETE':
+            return queryset
+        # Saving an instance with deferred fields would skip those fields.
+        return eager_load(
+            queryset, self.get_serializer_class(),
+            restrict=self.request.method in SAFE_METHODS, fieldset=requested_fieldset(self.request),
+        )
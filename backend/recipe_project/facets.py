@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Q
+from rest_framework import generics
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from .conditional import ConditionalGetMixin
+
+
+def grouped_counts(queryset, *fields):
+    """
+    Row count and favorite count per value of `fields`, in one GROUP BY.
+    """
+    return list(
+        queryset.order_by()
+        .values(*fields)
+        .annotate(count=Count('pk'), favorites=Count('pk', filter=Q(is_favorite=True)))
+    )
+
+
+def favorite_counts(groups):
+    total = sum(group['count'] for group in groups)
+    favorites = sum(group['favorites'] for group in groups)
+    return total, [
+        {'value': True, 'count': favorites},
+        {'value': False, 'count': total - favorites},
+    ]
+
+
+def tag_counts(queryset, limit=None):
+    """
+    Usage count of each tag among the rows of `queryset`, most used first,
+    from one aggregate over the unnested `tags` arrays.
+    """
+    sql, params = queryset.order_by().values('tags').query.sql_with_params()
+    if limit is not None:
+        sql_limit, params = ' LIMIT %s', [*params, limit]
+    else:
+        sql_limit = ''
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT tag, COUNT(*) FROM ({sql}) AS filtered, unnest(filtered.tags) AS tag"
+            f" GROUP BY tag ORDER BY COUNT(*) DESC, tag{sql_limit}",
+            params
+        )
+        return [{'name': name, 'count': count} for name, count in cursor.fetchall()]
+
+
+class FacetsView(ConditionalGetMixin, generics.ListAPIView):
+    """
+    Counts per filter value over the list the same ?search= and filters
+    would return, for the filter sidebar. Subclasses set the list view's
+    filter configuration and implement get_facets(queryset).
+
+    Results are cached under the list's ETag (user, query string, MAX of
+    updated_at and row count), so any write to a matching row misses the
+    cache and nothing needs to be invalidated explicitly. Views whose facets
+    show category or body part names list those models in
+    `related_validator_models`, so renames miss the cache too.
+    """
+    permission_classes = [IsAuthenticated]
+    pagination_class = None
+    cache_prefix = None
+    tag_limit = 50
+
+    def list(self, request, *args, **kwargs):
+        cache_key = f'{self.cache_prefix}:{self.etag}'
+        facets = cache.get(cache_key)
+        if facets is None:
+            facets = self.get_facets(self.filter_queryset(self.get_queryset()))
+            cache.set(cache_key, facets, settings.FACETS_CACHE_TIMEOUT)
+        return Response(facets)
+
+    def get_facets(self, queryset):
+        raise NotImplementedError
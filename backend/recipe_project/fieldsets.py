@@ -0,0 +1,85 @@
+from collections import namedtuple
+from rest_framework import serializers
+
+Fieldset = namedtuple('Fieldset', ['fields', 'expand'])
+
+
+def _names(value):
+    return frozenset(name.strip() for name in (value or '').split(',') if name.strip())
+
+
+def parse_fieldset(params):
+    """
+    Reads ?fields= and ?expand= into a Fieldset, or None when neither is
+    given. fields is None when only ?expand= is.
+    """
+    if 'fields' not in params and 'expand' not in params:
+        return None
+    return Fieldset(_names(params.get('fields')) or None, _names(params.get('expand')))
+
+
+def requested_fieldset(request):
+    params = getattr(request, 'query_params', None)
+    return parse_fieldset(params) if params is not None else None
+
+
+def _collapsed(field):
+    many = isinstance(field, serializers.ListSerializer)
+    return serializers.PrimaryKeyRelatedField(source=field.source, read_only=True, many=many)
+
+
+class SparseFieldsetMixin:
+    """
+    Lets clients pick the fields of a top-level serializer with ?fields=
+    (comma separated). Nested relations named there come back as ids, or
+    in full when they are also named in ?expand=; expanded relations are
+    included without being listed. Without ?fields= everything is rendered
+    as before.
+
+    The fieldset comes from the request, or from context['fieldset'] for
+    the eager-loading planner, which then loads only those columns and
+    skips the relations that are not expanded.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self._fieldset()
+        if fieldset is None:
+            return fields
+
+        readable = {name for name, field in fields.items() if not field.write_only}
+        expandable = {name for name in readable if isinstance(fields[name], serializers.BaseSerializer)}
+        errors = {}
+        if fieldset.fields is not None and fieldset.fields - readable:
+            errors['fields'] = f'Unknown fields: {", ".join(sorted(fieldset.fields - readable))}'
+        if fieldset.expand - expandable:
+            errors['expand'] = (
+                f'Cannot expand: {", ".join(sorted(fieldset.expand - expandable))}. '
+                f'Expandable: {", ".join(sorted(expandable))}'
+            )
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        if fieldset.fields is None:
+            return fields
+        for name in readable:
+            if name in fieldset.expand:
+                continue
+            if name not in fieldset.fields:
+                if fields[name].read_only:
+                    del fields[name]
+                else:
+                    # Still accepted as input on writes.
+                    fields[name].write_only = True
+            elif name in expandable:
+                fields[name] = _collapsed(fields[name])
+        return fields
+
+    def _fieldset(self):
+        # Only the serializer the view renders (or its list) is trimmed.
+        parent = self.parent
+        if parent is not None and not (isinstance(parent, serializers.ListSerializer) and parent.parent is None):
+            return None
+        if 'fieldset' in self.context:
+            return self.context['fieldset']
+        return requested_fieldset(self.context.get('request'))
@@ -0,0 +1,326 @@
+"""
+Export and import of a user's whole library as NDJSON.
+
+The first line is a header, every other line is {"type": ..., "data": {...}}
+with one row of a model. Rows are grouped by type in SECTIONS order, so an
+importer always sees categories and body parts before the recipes and
+stretches that use them, and those before their images and routine links.
+Zip archives hold the NDJSON as library.ndjson and the original images
+under media/<storage name>.
+"""
+import json
+import zipfile
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from recipe_project.autocomplete import store_terms
+from recipe_project.pagination import CursorEncoder
+from recipe_project.tags import MAX_TAG_LENGTH, normalize_tags
+from recipes.models import Category, Recipe, RecipeImage
+from recipes.signals import index_ingredients, store_ingredient_tokens
+from recipes.signals import primary_image_subquery as recipe_primary_image
+from stretches.models import BodyPart, RoutineStretch, Stretch, StretchImage, StretchRoutine
+from stretches.signals import primary_image_subquery as stretch_primary_image
+
+FORMAT = 'misrecetas-library'
+VERSION = 2
+NDJSON_NAME = 'library.ndjson'
+MEDIA_PREFIX = 'media/'
+
+EXPORT_CHUNK_SIZE = 500
+STREAM_BUFFER_SIZE = 64 * 1024
+
+# Derived or per-user columns that are rebuilt on import.
+EXCLUDED_FIELDS = {'created_by', 'search_vector', 'primary_image', 'ingredient_count', 'renditions'}
+
+StretchBodyPart = Stretch.body_parts.through
+
+# (type, model, rows of a user's library, {foreign key attname: type})
+SECTIONS = [
+    ('category', Category, lambda user: Category.objects.filter(recipe__created_by=user).distinct(), {}),
+    ('body_part', BodyPart, lambda user: BodyPart.objects.filter(stretches__created_by=user).distinct(), {}),
+    ('recipe', Recipe, lambda user: Recipe.objects.filter(created_by=user), {'category_id': 'category'}),
+    ('recipe_image', RecipeImage, lambda user: RecipeImage.objects.filter(recipe__created_by=user),
+     {'recipe_id': 'recipe'}),
+    ('stretch', Stretch, lambda user: Stretch.objects.filter(created_by=user), {}),
+    ('stretch_body_part', StretchBodyPart, lambda user: StretchBodyPart.objects.filter(stretch__created_by=user),
+     {'stretch_id': 'stretch', 'bodypart_id': 'body_part'}),
+    ('stretch_image', StretchImage, lambda user: StretchImage.objects.filter(stretch__created_by=user),
+     {'stretch_id': 'stretch'}),
+    ('routine', StretchRoutine, lambda user: StretchRoutine.objects.filter(created_by=user), {}),
+    ('routine_stretch', RoutineStretch, lambda user: RoutineStretch.objects.filter(routine__created_by=user),
+     {'routine_id': 'routine', 'stretch_id': 'stretch'}),
+]
+
+
+class LibraryImportError(Exception):
+    pass
+
+
+def export_fields(model):
+    return [field.attname for field in model._meta.concrete_fields if field.name not in EXCLUDED_FIELDS]
+
+
+def library_records(user):
+    """
+    Yields the header and every row of the user's library as dicts. Rows
+    are read with .values().iterator(), so memory does not grow with the
+    size of the library.
+    """
+    yield {'type': 'header', 'format': FORMAT, 'version': VERSION, 'exported_at': timezone.now()}
+    for record_type, model, queryset, _ in SECTIONS:
+        rows = queryset(user).order_by('pk').values(*export_fields(model))
+        for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield {'type': record_type, 'data': row}
+
+
+def stream_ndjson(user):
+    # Full microsecond timestamps, so an import restores them exactly.
+    encoder = CursorEncoder(ensure_ascii=False)
+    buffer = []
+    size = 0
+    for record in library_records(user):
+        line = (encoder.encode(record) + '\n').encode('utf-8')
+        buffer.append(line)
+        size += len(line)
+        if size >= STREAM_BUFFER_SIZE:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def media_names(user):
+    for model, lookup in ((RecipeImage, 'recipe__created_by'), (StretchImage, 'stretch__created_by')):
+        names = model.objects.filter(**{lookup: user}).exclude(image='').order_by('pk').values_list('image', flat=True)
+        yield from names.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+class _ZipStream:
+    """
+    Write-only, unseekable file object for ZipFile: whatever the archive
+    writes is collected until the streaming generator drains it.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_zip(user, storage=default_storage):
+    """
+    Streams a zip with the NDJSON export and the original images. Images
+    are stored uncompressed: they are JPEG/PNG/WebP already.
+    """
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        with archive.open(NDJSON_NAME, 'w', force_zip64=True) as entry:
+            for chunk in stream_ndjson(user):
+                entry.write(chunk)
+                yield stream.drain()
+
+        for name in media_names(user):
+            try:
+                source = storage.open(name, 'rb')
+            except FileNotFoundError:
+                continue
+            info = zipfile.ZipInfo(MEDIA_PREFIX + name, date_time=datetime.now().timetuple()[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            with source, archive.open(info, 'w', force_zip64=True) as entry:
+                for chunk in iter(lambda: source.read(STREAM_BUFFER_SIZE), b''):
+                    entry.write(chunk)
+                    yield stream.drain()
+    yield stream.drain()
+
+
+class LibraryImporter:
+    """
+    Loads an export into a user's library with batched bulk_create,
+    mapping the exported primary keys to new ones as it goes. Categories
+    and body parts are matched by name and only created when missing.
+
+    `open_media(name)` returns a file object for an exported image, or None
+    when the archive has no media; images whose file is not in the archive
+    are skipped. Exported storage names are never attached as they are,
+    since they could name any file in storage.
+    """
+    batch_size = 500
+
+    def __init__(self, user, open_media=None, storage=default_storage):
+        self.user = user
+        self.open_media = open_media
+        self.storage = storage
+        self.ids = defaultdict(dict)
+        self.counts = Counter()
+        self.sections = {record_type: (model, foreign_keys) for record_type, model, _, foreign_keys in SECTIONS}
+
+    def load(self, lines):
+        lines = iter(lines)
+        header = json.loads(next(lines, '{}') or '{}')
+        if header.get('type') != 'header' or header.get('format') != FORMAT:
+            raise LibraryImportError('Not a library export')
+        if header.get('version', 0) > VERSION:
+            raise LibraryImportError(f"Unsupported export version {header['version']}")
+
+        record_type, batch = None, []
+        for line in lines:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get('type') not in self.sections:
+                raise LibraryImportError(f"Unknown record type {record.get('type')!r}")
+            if record['type'] != record_type or len(batch) >= self.batch_size:
+                self.flush(record_type, batch)
+                record_type, batch = record['type'], []
+            batch.append(record['data'])
+        self.flush(record_type, batch)
+        return self.counts
+
+    def flush(self, record_type, rows):
+        if not rows:
+            return
+        model, foreign_keys = self.sections[record_type]
+        if record_type in ('category', 'body_part'):
+            self.match_by_name(record_type, model, rows)
+            return
+
+        old_ids, objects = [], []
+        for row in rows:
+            row = dict(row)
+            old_id = row.pop('id')
+            for attname, target in foreign_keys.items():
+                if row.get(attname) is not None:
+                    row[attname] = self.ids[target].get(row[attname])
+                    if row[attname] is None and not model._meta.get_field(attname[:-3]).null:
+                        break
+            else:
+                if 'image' in row:
+                    row['image'] = self.import_media(row['image'])
+                    if not row['image']:
+                        continue
+                if 'created_by' in {field.name for field in model._meta.concrete_fields}:
+                    row['created_by'] = self.user
+                old_ids.append(old_id)
+                objects.append(model(**row))
+                continue
+            self.counts[f'{record_type}_skipped'] += 1
+
+        handler = getattr(self, f'before_{record_type}', None)
+        entries = handler(objects) if handler else None
+
+        # auto_now/auto_now_add overwrite the exported timestamps on insert.
+        timestamps = [
+            field.attname for field in model._meta.concrete_fields
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+        ]
+        exported = [[getattr(obj, attname) for attname in timestamps] for obj in objects]
+        model.objects.bulk_create(objects, batch_size=self.batch_size)
+        if timestamps:
+            for obj, values in zip(objects, exported):
+                for attname, value in zip(timestamps, values):
+                    setattr(obj, attname, value)
+            model.objects.bulk_update(objects, timestamps, batch_size=self.batch_size)
+
+        for old_id, obj in zip(old_ids, objects):
+            self.ids[record_type][old_id] = obj.pk
+        self.counts[record_type] += len(objects)
+
+        handler = getattr(self, f'after_{record_type}', None)
+        if handler:
+            handler(objects, entries)
+
+    def match_by_name(self, record_type, model, rows):
+        names = {row['name'] for row in rows}
+        existing = dict(model.objects.filter(name__in=names).values_list('name', 'pk'))
+        missing = [
+            model(name=row['name'], description=row.get('description', ''))
+            for row in rows if row['name'] not in existing
+        ]
+        model.objects.bulk_create(missing, batch_size=self.batch_size)
+        existing.update((obj.name, obj.pk) for obj in missing)
+        for row in rows:
+            self.ids[record_type][row['id']] = existing[row['name']]
+        self.counts[record_type] += len(missing)
+
+    def import_media(self, name):
+        if self.open_media is None or not isinstance(name, str) or not name:
+            return None
+        source = self.open_media(name)
+        if source is None:
+            return None
+        with source:
+            return self.storage.save(name, File(source, name=name))
+
+    # bulk_create skips the post_save handlers that maintain these.
+
+    def before_recipe(self, recipes):
+        _normalize_tags(recipes)
+        return index_ingredients(recipes)
+
+    def before_stretch(self, stretches):
+        _normalize_tags(stretches)
+
+    def after_stretch(self, stretches, entries):
+        store_terms(stretches)
+
+    def after_recipe(self, recipes, entries):
+        store_ingredient_tokens(entries)
+        store_terms(recipes)
+
+    def after_recipe_image(self, images, entries):
+        Recipe.objects.filter(pk__in={image.recipe_id for image in images}).update(
+            primary_image=recipe_primary_image()
+        )
+
+    def after_stretch_image(self, images, entries):
+        Stretch.objects.filter(pk__in={image.stretch_id for image in images}).update(
+            primary_image=stretch_primary_image()
+        )
+
+
+def _normalize_tags(objects):
+    # Version 1 exports hold the comma-separated strings.
+    for obj in objects:
+        obj.tags = [tag[:MAX_TAG_LENGTH] for tag in normalize_tags(obj.tags)]
+
+
+def open_archive(path):
+    """
+    Returns (lines, open_media) for an .ndjson file or a zip export.
+    """
+    if zipfile.is_zipfile(path):
+        archive = zipfile.ZipFile(path)
+        members = set(archive.namelist())
+        if NDJSON_NAME not in members:
+            raise LibraryImportError(f'{path} has no {NDJSON_NAME}')
+
+        def open_media(name):
+            member = MEDIA_PREFIX + name
+            return archive.open(member) if member in members else None
+
+        def lines():
+            with archive.open(NDJSON_NAME) as entry:
+                for line in entry:
+                    yield line.decode('utf-8')
+
+        return lines(), open_media
+
+    def lines():
+        with open(path, encoding='utf-8') as handle:
+            yield from handle
+
+    return lines(), None
@@ -0,0 +1,626 @@
+"""
+HTTP load benchmark for the API, driven by `manage.py benchmark_api`.
+
+Each client is a thread with its own keep-alive connection, logged in as
+one of the seeded perf users (see `manage.py seed_perf_data`). Scenarios
+are run one after the other, every client sending its share of requests
+back to back, so a scenario's throughput is measured at the configured
+concurrency. The runner shares the server's database: it reads the ids it
+needs and prepares the objects that writes consume with the ORM. Writes
+only ever touch objects created by the run, which carry its `marker` and
+are deleted by `cleanup`.
+"""
+import base64
+import hashlib
+import http.client
+import io
+import json
+import math
+import re
+import threading
+import time
+import uuid
+from datetime import timedelta
+from http.cookies import SimpleCookie
+from importlib import import_module
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from recipes.models import Category, Recipe, RecipeImage, UploadSession
+from stretches.models import BodyPart, RoutineStretch, Stretch, StretchImage, StretchRoutine
+from stretches.ranking import spaced_ranks
+
+URLCONFS = ['recipes.urls', 'stretches.urls', 'recipes.urls_auth']
+
+SERVER_TIMING = re.compile(r'(\w+);dur=([\d.]+)(?:;desc="(\d+) queries")?')
+
+
+def _jpeg():
+    buffer = io.BytesIO()
+    Image.new('RGB', (640, 480), 'orange').save(buffer, 'JPEG', quality=80)
+    return buffer.getvalue()
+
+
+UPLOAD = _jpeg()
+UPLOAD_SHA256 = hashlib.sha256(UPLOAD).hexdigest()
+UPLOAD_CAPTION = 'Benchmark upload'
+# The first chunk of a resumable upload of UPLOAD.
+UPLOAD_CHUNK = UPLOAD[:len(UPLOAD) // 2]
+
+
+class Session:
+    """
+    One benchmark client: a keep-alive connection, the user's auth cookies
+    and the ids its requests use.
+    """
+
+    def __init__(self, index, url, user, marker):
+        parts = urlsplit(url)
+        self.index = index
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.user = user
+        self.marker = marker
+        self.cookies = {}
+        self.password = None
+        self.pool = {}
+        self.connection = None
+
+        recipes = Recipe.objects.filter(created_by=user).order_by('-created_at', '-id')
+        stretches = Stretch.objects.filter(created_by=user).order_by('-created_at', '-id')
+        self.recipe_ids = list(recipes.values_list('id', flat=True)[:50])
+        self.stretch_ids = list(stretches.values_list('id', flat=True)[:50])
+        self.routine_ids = list(StretchRoutine.objects.filter(created_by=user).values_list('id', flat=True))
+        self.recipe_image_id = RecipeImage.objects.filter(recipe__created_by=user).values_list('id', flat=True).first()
+        self.stretch_image_id = StretchImage.objects.filter(stretch__created_by=user).values_list('id', flat=True).first()
+        self.category_id = Category.objects.order_by('id').values_list('id', flat=True).first()
+        self.body_part_id = BodyPart.objects.order_by('id').values_list('id', flat=True).first()
+        if not (self.recipe_ids and self.stretch_ids and self.routine_ids and self.recipe_image_id
+                and self.stretch_image_id and self.category_id and self.body_part_id):
+            raise ValueError(f'{user.username} has no recipes, stretches, routines or images to benchmark')
+
+    def login(self, password):
+        self.password = password
+        status, _, data, response = self.request('POST', reverse('login'), {
+            'username': self.user.username, 'password': password,
+        })
+        if status != 200:
+            raise ValueError(f'Could not log in as {self.user.username}: {status} {data[:200]!r}')
+        for header in response.headers.get_all('Set-Cookie') or []:
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+
+    def request(self, method, path, payload=None, files=None, headers=None):
+        headers = {'Accept': 'application/json', **(headers or {})}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        body = None
+        if files:
+            body, headers['Content-Type'] = _multipart(payload or {}, files)
+        elif isinstance(payload, bytes):
+            body = payload
+            headers.setdefault('Content-Type', 'application/octet-stream')
+        elif payload is not None:
+            body = json.dumps(payload).encode()
+            headers['Content-Type'] = 'application/json'
+
+        # A keep-alive connection the server closed is reopened once.
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=120)
+            try:
+                started = time.perf_counter()
+                self.connection.request(method, path, body, headers)
+                response = self.connection.getresponse()
+                data = response.read()
+                return response.status, time.perf_counter() - started, data, response
+            except (http.client.HTTPException, OSError):
+                self.close()
+                if attempt:
+                    raise
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def _multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, content, content_type) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'.encode() + content + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+class Scenario:
+    """
+    One endpoint and method. `build(session, n)` returns the path and
+    optionally a JSON payload (or the raw body), files and headers for the
+    session's n-th request;
+    `prepare(session, count)`, when given, returns the objects those
+    requests consume (stored in session.pool under the scenario's label).
+    """
+
+    def __init__(self, method, route, build, label=None, prepare=None):
+        self.method = method
+        self.route = route
+        self.build = build
+        self.prepare = prepare
+        self.label = f'{method} {route}{f" {label}" if label else ""}'
+
+
+def _path(route, query=None, **kwargs):
+    path = reverse(route, kwargs=kwargs or None)
+    return f'{path}?{urlencode(query)}' if query else path
+
+
+def _recipe_payload(session, n):
+    return {
+        'title': f'{session.marker} recipe {session.index}-{n}',
+        'description': 'Benchmark recipe',
+        'ingredients': '2 cups flour\n1 egg\n200 ml milk\n1 pinch salt',
+        'instructions': 'Mix everything.\nCook until done.',
+        'servings': 4,
+        'category_id': session.category_id,
+        'tags': 'benchmark',
+    }
+
+
+def _stretch_payload(session, n):
+    return {
+        'title': f'{session.marker} stretch {session.index}-{n}',
+        'description': 'Benchmark stretch',
+        'instructions': 'Hold it.',
+        'duration': 30,
+        'body_part_ids': [session.body_part_id],
+    }
+
+
+def _recipes(session, count):
+    return Recipe.objects.bulk_create([
+        Recipe(created_by=session.user, ingredients='1 egg', instructions='Cook.',
+               title=f'{session.marker} recipe {session.index}-{n}')
+        for n in range(count)
+    ])
+
+
+def _stretches(session, count):
+    return Stretch.objects.bulk_create([
+        Stretch(created_by=session.user, title=f'{session.marker} stretch {session.index}-{n}')
+        for n in range(count)
+    ])
+
+
+def _recipe_images(session, count):
+    recipe = _recipes(session, 1)[0]
+    source = RecipeImage.objects.get(pk=session.recipe_image_id)
+    return RecipeImage.objects.bulk_create([
+        RecipeImage(recipe=recipe, image=source.image.name, renditions=source.renditions) for _ in range(count)
+    ])
+
+
+def _stretch_images(session, count):
+    stretch = _stretches(session, 1)[0]
+    source = StretchImage.objects.get(pk=session.stretch_image_id)
+    return StretchImage.objects.bulk_create([
+        StretchImage(stretch=stretch, image=source.image.name, renditions=source.renditions) for _ in range(count)
+    ])
+
+
+def _named(model):
+    def prepare(session, count):
+        return model.objects.bulk_create([
+            model(name=f'{session.marker} {session.index}-{n}-{uuid.uuid4().hex[:6]}') for n in range(count)
+        ])
+    return prepare
+
+
+def _routines(size):
+    """Routines of `size` of the session's stretches, one per request."""
+    def prepare(session, count):
+        routines = StretchRoutine.objects.bulk_create([
+            StretchRoutine(created_by=session.user, name=f'{session.marker} routine {session.index}-{n}')
+            for n in range(count)
+        ])
+        RoutineStretch.objects.bulk_create([
+            RoutineStretch(routine=routine, stretch_id=stretch_id, rank=rank)
+            for routine in routines
+            for stretch_id, rank in zip(session.stretch_ids[:size], spaced_ranks(size))
+        ])
+        return routines
+    return prepare
+
+
+def _routine(size):
+    """One routine shared by all of the session's requests."""
+    def prepare(session, count):
+        return _routines(size)(session, 1) * count
+    return prepare
+
+
+def _upload_payload(session, n, **parent):
+    # A user may only have MAX_OPEN_UPLOADS in progress: the client's
+    # earlier sessions are expired first.
+    UploadSession.objects.filter(
+        created_by=session.user, filename__startswith=f'{session.marker}-{session.index}-',
+        expires_at__gt=timezone.now(),
+    ).update(expires_at=timezone.now())
+    return {
+        **parent, 'filename': f'{session.marker}-{session.index}-{n}.jpg', 'size': len(UPLOAD),
+        'sha256': UPLOAD_SHA256, 'caption': UPLOAD_CAPTION,
+    }
+
+
+def _chunk_headers(chunk, start=0):
+    digest = base64.b64encode(hashlib.sha256(chunk).digest()).decode()
+    return {
+        'Content-Range': f'bytes {start}-{start + len(chunk) - 1}/{len(UPLOAD)}',
+        'Content-Digest': f'sha-256=:{digest}:',
+    }
+
+
+def _upload_sessions(kind, parent, route=None):
+    """
+    Resumable uploads of UPLOAD to one of `parent`'s objects, one per
+    request. With `route`, the whole file is sent to each so it can be
+    completed.
+    """
+    def prepare(session, count):
+        object_id = parent(session, 1)[0].pk
+        expires_at = timezone.now() + timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+        uploads = UploadSession.objects.bulk_create([
+            UploadSession(
+                created_by=session.user, kind=kind, object_id=object_id,
+                filename=f'{session.marker}-{session.index}-{n}.jpg', size=len(UPLOAD), sha256=UPLOAD_SHA256,
+                caption=UPLOAD_CAPTION, expires_at=expires_at,
+            )
+            for n in range(count)
+        ])
+        for upload in uploads if route else []:
+            status, _, data, _ = session.request(
+                'PUT', _path(route, pk=upload.pk), UPLOAD, headers=_chunk_headers(UPLOAD)
+            )
+            if status != 200:
+                raise ValueError(f'Could not upload {upload.filename}: {status} {data[:200]!r}')
+        return uploads
+    return prepare
+
+
+def _pooled(session, scenario, n):
+    return session.pool[scenario][n]
+
+
+SCENARIOS = [
+    # Reads
+    Scenario('GET', 'category-list-create', lambda s, n: _path('category-list-create')),
+    Scenario('GET', 'category-detail', lambda s, n: _path('category-detail', pk=s.category_id)),
+    Scenario('GET', 'recipe-list-create', lambda s, n: _path('recipe-list-create')),
+    Scenario('GET', 'recipe-list-create', lambda s, n: _path('recipe-list-create', {'search': 'stew'}),
+             label='?search'),
+    Scenario('GET', 'recipe-list-create', lambda s, n: _path('recipe-list-create', {'is_favorite': 'true'}),
+             label='?is_favorite'),
+    Scenario('GET', 'recipe-list-create', lambda s, n: _path('recipe-list-create', {'tags': 'quick,family'}),
+             label='?tags'),
+    Scenario('GET', 'recipe-list-create', lambda s, n: _path('recipe-list-create', {'tags_any': 'spicy,summer'}),
+             label='?tags_any'),
+    Scenario('GET', 'recipe-facets', lambda s, n: _path('recipe-facets')),
+    Scenario('GET', 'recipe-facets', lambda s, n: _path('recipe-facets', {'category': s.category_id}),
+             label='?category'),
+    Scenario('GET', 'recipe-tags', lambda s, n: _path('recipe-tags')),
+    Scenario('GET', 'recipe-detail',
+             lambda s, n: _path('recipe-detail', pk=s.recipe_ids[n % len(s.recipe_ids)])),
+    Scenario('GET', 'recipe-image-detail', lambda s, n: _path('recipe-image-detail', pk=s.recipe_image_id)),
+    Scenario('POST', 'generate-shopping-list', lambda s, n: (
+        _path('generate-shopping-list'), {'recipe_ids': s.recipe_ids[:10]},
+    )),
+    Scenario('POST', 'what-can-i-cook', lambda s, n: (
+        _path('what-can-i-cook'), {'ingredients': ['flour', 'eggs', 'milk', 'onion', 'garlic', 'tomato']},
+    )),
+    Scenario('GET', 'export-library', lambda s, n: _path('export-library')),
+    Scenario('GET', 'autocomplete', lambda s, n: _path('autocomplete', {'q': 'st'})),
+    Scenario('GET', 'sync', lambda s, n: _path('sync', {'limit': 100})),
+    Scenario('GET', 'bodypart-list-create', lambda s, n: _path('bodypart-list-create')),
+    Scenario('GET', 'bodypart-detail', lambda s, n: _path('bodypart-detail', pk=s.body_part_id)),
+    Scenario('GET', 'stretch-list-create', lambda s, n: _path('stretch-list-create')),
+    Scenario('GET', 'stretch-list-create', lambda s, n: _path('stretch-list-create', {'body_parts': s.body_part_id}),
+             label='?body_parts'),
+    Scenario('GET', 'stretch-facets', lambda s, n: _path('stretch-facets')),
+    Scenario('GET', 'stretch-tags', lambda s, n: _path('stretch-tags')),
+    Scenario('GET', 'stretch-detail',
+             lambda s, n: _path('stretch-detail', pk=s.stretch_ids[n % len(s.stretch_ids)])),
+    Scenario('GET', 'stretch-image-detail', lambda s, n: _path('stretch-image-detail', pk=s.stretch_image_id)),
+    Scenario('GET', 'routine-list-create', lambda s, n: _path('routine-list-create')),
+    Scenario('GET', 'routine-detail',
+             lambda s, n: _path('routine-detail', pk=s.routine_ids[n % len(s.routine_ids)])),
+    Scenario('GET', 'routine-timeline',
+             lambda s, n: _path('routine-timeline', pk=s.routine_ids[n % len(s.routine_ids)])),
+    Scenario('GET', 'user-profile', lambda s, n: _path('user-profile')),
+
+    # Writes
+    Scenario('POST', 'category-list-create', lambda s, n: (
+        _path('category-list-create'), {'name': f'{s.marker} {s.index}-{n}'},
+    )),
+    Scenario('PUT', 'category-detail', lambda s, n: (
+        _path('category-detail', pk=_pooled(s, 'PUT category-detail', n).pk),
+        {'name': _pooled(s, 'PUT category-detail', n).name, 'description': 'Updated'},
+    ), prepare=_named(Category)),
+    Scenario('DELETE', 'category-detail',
+             lambda s, n: _path('category-detail', pk=_pooled(s, 'DELETE category-detail', n).pk),
+             prepare=_named(Category)),
+    Scenario('POST', 'recipe-list-create', lambda s, n: (_path('recipe-list-create'), _recipe_payload(s, n))),
+    Scenario('PUT', 'recipe-detail', lambda s, n: (
+        _path('recipe-detail', pk=_pooled(s, 'PUT recipe-detail', n).pk), _recipe_payload(s, n),
+    ), prepare=_recipes),
+    Scenario('DELETE', 'recipe-detail',
+             lambda s, n: _path('recipe-detail', pk=_pooled(s, 'DELETE recipe-detail', n).pk),
+             prepare=_recipes),
+    Scenario('POST', 'recipe-bulk', lambda s, n: (
+        _path('recipe-bulk'), {'recipes': [_recipe_payload(s, f'{n}-{item}') for item in range(50)]},
+    ), label='x50'),
+    Scenario('PATCH', 'recipe-bulk', lambda s, n: (
+        _path('recipe-bulk'),
+        {'recipes': [{'id': recipe.pk, 'servings': n % 8 + 1} for recipe in _pooled(s, 'PATCH recipe-bulk x50', n)]},
+    ), label='x50', prepare=lambda s, count: [_recipes(s, 50)] * count),
+    Scenario('DELETE', 'recipe-bulk', lambda s, n: (
+        _path('recipe-bulk'), {'ids': [recipe.pk for recipe in _pooled(s, 'DELETE recipe-bulk x50', n)]},
+    ), label='x50', prepare=lambda s, count: [_recipes(s, 50) for _ in range(count)]),
+    Scenario('POST', 'recipe-image-upload', lambda s, n: (
+        _path('recipe-image-upload'),
+        {'recipe_id': _pooled(s, 'POST recipe-image-upload', n).pk, 'caption': UPLOAD_CAPTION},
+        {'image': (f'{s.marker}-{s.index}-{n}.jpg', UPLOAD, 'image/jpeg')},
+    ), prepare=lambda s, count: _recipes(s, 1) * count),
+    Scenario('POST', 'recipe-image-upload-session', lambda s, n: (
+        _path('recipe-image-upload-session'),
+        _upload_payload(s, n, recipe_id=_pooled(s, 'POST recipe-image-upload-session', n).pk),
+    ), prepare=lambda s, count: _recipes(s, 1) * count),
+    Scenario('GET', 'recipe-image-upload-session-detail', lambda s, n: _path(
+        'recipe-image-upload-session-detail', pk=_pooled(s, 'GET recipe-image-upload-session-detail', n).pk,
+    ), prepare=lambda s, count: _upload_sessions('recipe_image', _recipes)(s, 1) * count),
+    Scenario('PUT', 'recipe-image-upload-session-detail', lambda s, n: (
+        _path('recipe-image-upload-session-detail', pk=_pooled(s, 'PUT recipe-image-upload-session-detail', n).pk),
+        UPLOAD_CHUNK, None, _chunk_headers(UPLOAD_CHUNK),
+    ), prepare=_upload_sessions('recipe_image', _recipes)),
+    Scenario('POST', 'recipe-image-upload-session-detail', lambda s, n: _path(
+        'recipe-image-upload-session-detail', pk=_pooled(s, 'POST recipe-image-upload-session-detail', n).pk,
+    ), prepare=_upload_sessions('recipe_image', _recipes, 'recipe-image-upload-session-detail')),
+    Scenario('PATCH', 'recipe-image-detail', lambda s, n: (
+        _path('recipe-image-detail', pk=_pooled(s, 'PATCH recipe-image-detail', n).pk), {'caption': f'Caption {n}'},
+    ), prepare=_recipe_images),
+    Scenario('DELETE', 'recipe-image-detail',
+             lambda s, n: _path('recipe-image-detail', pk=_pooled(s, 'DELETE recipe-image-detail', n).pk),
+             prepare=_recipe_images),
+    Scenario('POST', 'bodypart-list-create', lambda s, n: (
+        _path('bodypart-list-create'), {'name': f'{s.marker} {s.index}-{n}'},
+    )),
+    Scenario('PUT', 'bodypart-detail', lambda s, n: (
+        _path('bodypart-detail', pk=_pooled(s, 'PUT bodypart-detail', n).pk),
+        {'name': _pooled(s, 'PUT bodypart-detail', n).name, 'description': 'Updated'},
+    ), prepare=_named(BodyPart)),
+    Scenario('DELETE', 'bodypart-detail',
+             lambda s, n: _path('bodypart-detail', pk=_pooled(s, 'DELETE bodypart-detail', n).pk),
+             prepare=_named(BodyPart)),
+    Scenario('POST', 'stretch-list-create', lambda s, n: (_path('stretch-list-create'), _stretch_payload(s, n))),
+    Scenario('PUT', 'stretch-detail', lambda s, n: (
+        _path('stretch-detail', pk=_pooled(s, 'PUT stretch-detail', n).pk), _stretch_payload(s, n),
+    ), prepare=_stretches),
+    Scenario('DELETE', 'stretch-detail',
+             lambda s, n: _path('stretch-detail', pk=_pooled(s, 'DELETE stretch-detail', n).pk),
+             prepare=_stretches),
+    Scenario('POST', 'stretch-bulk', lambda s, n: (
+        _path('stretch-bulk'), {'stretches': [_stretch_payload(s, f'{n}-{item}') for item in range(50)]},
+    ), label='x50'),
+    Scenario('PATCH', 'stretch-bulk', lambda s, n: (
+        _path('stretch-bulk'),
+        {'stretches': [{'id': stretch.pk, 'duration': n % 6 * 10 + 10}
+                       for stretch in _pooled(s, 'PATCH stretch-bulk x50', n)]},
+    ), label='x50', prepare=lambda s, count: [_stretches(s, 50)] * count),
+    Scenario('DELETE', 'stretch-bulk', lambda s, n: (
+        _path('stretch-bulk'), {'ids': [stretch.pk for stretch in _pooled(s, 'DELETE stretch-bulk x50', n)]},
+    ), label='x50', prepare=lambda s, count: [_stretches(s, 50) for _ in range(count)]),
+    Scenario('POST', 'stretch-image-upload', lambda s, n: (
+        _path('stretch-image-upload'),
+        {'stretch_id': _pooled(s, 'POST stretch-image-upload', n).pk, 'caption': UPLOAD_CAPTION},
+        {'image': (f'{s.marker}-{s.index}-{n}.jpg', UPLOAD, 'image/jpeg')},
+    ), prepare=lambda s, count: _stretches(s, 1) * count),
+    Scenario('POST', 'stretch-image-upload-session', lambda s, n: (
+        _path('stretch-image-upload-session'),
+        _upload_payload(s, n, stretch_id=_pooled(s, 'POST stretch-image-upload-session', n).pk),
+    ), prepare=lambda s, count: _stretches(s, 1) * count),
+    Scenario('GET', 'stretch-image-upload-session-detail', lambda s, n: _path(
+        'stretch-image-upload-session-detail', pk=_pooled(s, 'GET stretch-image-upload-session-detail', n).pk,
+    ), prepare=lambda s, count: _upload_sessions('stretch_image', _stretches)(s, 1) * count),
+    Scenario('PUT', 'stretch-image-upload-session-detail', lambda s, n: (
+        _path('stretch-image-upload-session-detail', pk=_pooled(s, 'PUT stretch-image-upload-session-detail', n).pk),
+        UPLOAD_CHUNK, None, _chunk_headers(UPLOAD_CHUNK),
+    ), prepare=_upload_sessions('stretch_image', _stretches)),
+    Scenario('POST', 'stretch-image-upload-session-detail', lambda s, n: _path(
+        'stretch-image-upload-session-detail', pk=_pooled(s, 'POST stretch-image-upload-session-detail', n).pk,
+    ), prepare=_upload_sessions('stretch_image', _stretches, 'stretch-image-upload-session-detail')),
+    Scenario('PATCH', 'stretch-image-detail', lambda s, n: (
+        _path('stretch-image-detail', pk=_pooled(s, 'PATCH stretch-image-detail', n).pk), {'caption': f'Caption {n}'},
+    ), prepare=_stretch_images),
+    Scenario('DELETE', 'stretch-image-detail',
+             lambda s, n: _path('stretch-image-detail', pk=_pooled(s, 'DELETE stretch-image-detail', n).pk),
+             prepare=_stretch_images),
+    Scenario('POST', 'routine-list-create', lambda s, n: (
+        _path('routine-list-create'), {'name': f'{s.marker} routine {s.index}-{n}'},
+    )),
+    Scenario('PUT', 'routine-detail', lambda s, n: (
+        _path('routine-detail', pk=_pooled(s, 'PUT routine-detail', n).pk),
+        {'name': _pooled(s, 'PUT routine-detail', n).name, 'description': f'Updated {n}'},
+    ), prepare=_routine(8)),
+    Scenario('DELETE', 'routine-detail',
+             lambda s, n: _path('routine-detail', pk=_pooled(s, 'DELETE routine-detail', n).pk),
+             prepare=_routines(8)),
+    Scenario('POST', 'routine-stretches', lambda s, n: (
+        _path('routine-stretches', routine_id=_pooled(s, 'POST routine-stretches', n).pk),
+        {'stretch_id': s.stretch_ids[-1]},
+    ), prepare=_routines(8)),
+    Scenario('PUT', 'routine-stretches', lambda s, n: (
+        _path('routine-stretches', routine_id=_pooled(s, 'PUT routine-stretches', n).pk),
+        {'stretch_ids': s.stretch_ids[:8][::-1 if n % 2 else 1]},
+    ), prepare=_routine(8)),
+    Scenario('POST', 'move-routine-stretch', lambda s, n: (
+        _path('move-routine-stretch', routine_id=_pooled(s, 'POST move-routine-stretch', n).pk,
+              stretch_id=s.stretch_ids[n % 8]),
+        {},
+    ), prepare=_routine(8)),
+    Scenario('DELETE', 'remove-stretch-from-routine', lambda s, n: _path(
+        'remove-stretch-from-routine', routine_id=_pooled(s, 'DELETE remove-stretch-from-routine', n).pk,
+        stretch_id=s.stretch_ids[0],
+    ), prepare=_routines(8)),
+
+    # Auth. Login and register are dominated by password hashing.
+    Scenario('POST', 'register', lambda s, n: (
+        _path('register'),
+        {'username': f'{s.marker}-{s.index}-{n}', 'email': f'{s.marker}-{s.index}-{n}@example.com',
+         'password': f'{s.marker}-password'},
+    )),
+    Scenario('POST', 'login', lambda s, n: (_path('login'), {'username': s.user.username, 'password': s.password})),
+    Scenario('POST', 'token-refresh', lambda s, n: (_path('token-refresh'), {'refresh': s.cookies['refresh_token']})),
+    Scenario('PUT', 'user-profile', lambda s, n: (
+        _path('user-profile'),
+        {'username': s.user.username, 'email': s.user.email, 'first_name': 'Perf', 'last_name': str(s.index)},
+    )),
+    # Last: it would blacklist the refresh token if the blacklist app were installed.
+    Scenario('POST', 'logout', lambda s, n: _path('logout')),
+]
+
+
+def uncovered_routes(scenarios=SCENARIOS):
+    """Named routes of URLCONFS that no scenario exercises."""
+    covered = {scenario.route for scenario in scenarios}
+    return [
+        pattern.name
+        for module in URLCONFS
+        for pattern in import_module(module).urlpatterns
+        if pattern.name not in covered
+    ]
+
+
+def run_scenario(scenario, sessions, requests, warmup=0):
+    """
+    Sends `requests` requests (split evenly between the sessions, each in
+    its own thread) after `warmup` unmeasured ones per session. Returns the
+    stats dict reported for the endpoint.
+    """
+    per_session = max(1, math.ceil(requests / len(sessions)))
+    for session in sessions:
+        if scenario.prepare is not None:
+            session.pool[scenario.label] = scenario.prepare(session, per_session + warmup)
+
+    barrier = threading.Barrier(len(sessions) + 1)
+    results = [[] for _ in sessions]
+    failures = []
+
+    def client(session, samples):
+        try:
+            for n in range(warmup):
+                _send(scenario, session, per_session + n)
+        finally:
+            barrier.wait()
+        for n in range(per_session):
+            try:
+                samples.append(_send(scenario, session, n))
+            except (http.client.HTTPException, OSError) as exc:
+                samples.append((0, 0.0, None, None))
+                failures.append(f'{type(exc).__name__}: {exc}')
+
+    threads = [
+        threading.Thread(target=client, args=(session, samples), daemon=True)
+        for session, samples in zip(sessions, results)
+    ]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    samples = [sample for samples in results for sample in samples]
+    return _stats(samples, elapsed, failures)
+
+
+def _send(scenario, session, n):
+    built = scenario.build(session, n)
+    if isinstance(built, str):
+        built = (built,)
+    status, elapsed, data, response = session.request(scenario.method, *built)
+    server = dict.fromkeys(('total', 'queries'))
+    for name, duration, queries in SERVER_TIMING.findall(response.headers.get('Server-Timing', '')):
+        if name == 'total':
+            server['total'] = float(duration)
+        elif name == 'db' and queries:
+            server['queries'] = int(queries)
+    return status, elapsed, server, data if status >= 400 else None
+
+
+def _percentile(values, percent):
+    if not values:
+        return None
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+def _stats(samples, elapsed, failures):
+    latencies = sorted(elapsed_s * 1000 for status, elapsed_s, _, _ in samples if status)
+    server = sorted(timing['total'] for status, _, timing, _ in samples if status and timing['total'] is not None)
+    queries = [timing['queries'] for status, _, timing, _ in samples if status and timing['queries'] is not None]
+    errors = [(status, body) for status, _, _, body in samples if not 200 <= status < 400]
+
+    def rounded(value):
+        return None if value is None else round(value, 2)
+
+    stats = {
+        'requests': len(samples),
+        'errors': len(errors),
+        'throughput_rps': rounded(len(samples) / elapsed if elapsed else 0),
+        'mean_ms': rounded(sum(latencies) / len(latencies) if latencies else None),
+        'p50_ms': rounded(_percentile(latencies, 50)),
+        'p95_ms': rounded(_percentile(latencies, 95)),
+        'p99_ms': rounded(_percentile(latencies, 99)),
+        'max_ms': rounded(latencies[-1] if latencies else None),
+        'server_p50_ms': rounded(_percentile(server, 50)),
+        'queries': max(queries) if queries else None,
+    }
+    if errors or failures:
+        status, body = errors[0]
+        stats['first_error'] = failures[0] if failures else f'{status} {(body or b"")[:300].decode(errors="replace")}'
+    return stats
+
+
+def cleanup(marker):
+    """
+    Deletes everything created under `marker`. The files uploaded with it
+    are released with their images and removed by `manage.py collect_media`
+    once MEDIA_BLOB_GRACE has passed; uploads of the same bytes share one
+    file anyway. Unfinished resumable uploads are expired, for
+    `collect_media` to delete with their files wherever the server keeps them.
+    """
+    uploaded = (
+        RecipeImage.objects.filter(recipe__title__startswith=marker, caption=UPLOAD_CAPTION).count()
+        + StretchImage.objects.filter(stretch__title__startswith=marker, caption=UPLOAD_CAPTION).count()
+    )
+    UploadSession.objects.filter(filename__startswith=f'{marker}-').update(expires_at=timezone.now())
+    deleted = 0
+    for queryset in (
+        Recipe.objects.filter(title__startswith=marker),
+        Stretch.objects.filter(title__startswith=marker),
+        StretchRoutine.objects.filter(name__startswith=marker),
+        Category.objects.filter(name__startswith=marker),
+        BodyPart.objects.filter(name__startswith=marker),
+        User.objects.filter(username__startswith=marker),
+    ):
+        deleted += queryset.delete()[0]
+    return deleted, uploaded
@@ -0,0 +1,291 @@
+"""
+Content-addressed media: every uploaded file and rendition is stored once,
+as blobs/<aa>/<sha256 of the content><extension>, however many images use
+it and whatever it was called when uploaded.
+
+recipes.MediaBlob has a row per stored file with the number of image rows
+(image or rendition) that reference it. Statement-level triggers on the
+image tables keep `refs` current on every insert, update and delete,
+including bulk_create, queryset.update() and cascades. Files whose count
+drops to zero are deleted by collect_media(): right after an image is
+deleted, and for everything else by `manage.py collect_media`.
+
+A file is written before the row that uses it is inserted, so unused blobs
+are only collected once they have not been uploaded for MEDIA_BLOB_GRACE
+seconds. Uploads mark their blob before they look for the file and the
+collector locks the rows it deletes, so an upload racing the collector
+either keeps the blob or writes it again.
+
+serve_media() serves media with ETags; blobs are immutable and cached for a
+year. With MEDIA_OFFLOAD the file itself is sent by the web server. It is
+only routed with DEBUG or MEDIA_OFFLOAD; otherwise the web server serves
+MEDIA_ROOT directly.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+from recipes.models import MediaBlob
+
+BLOB_NAME = re.compile(r'^blobs/[0-9a-f]{2}/(?P<digest>[0-9a-f]{64})(\.\w+)?$')
+EXTENSION = re.compile(r'^\.\w{1,10}$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Files stored under their upload name before content addressing can be
+# replaced by a later upload of the same name once deleted.
+REVALIDATE = 'public, max-age=0, must-revalidate'
+COLLECT_BATCH = 1000
+# Uploads are written here first, next to the blobs they are renamed to.
+SCRATCH = 'blobs/tmp'
+
+# (table, image column, renditions column) of every model whose files are
+# counted.
+COUNTED_TABLES = [
+    ('recipes_recipeimage', 'image', 'renditions'),
+    ('stretches_stretchimage', 'image', 'renditions'),
+]
+
+MEDIA_BLOB_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION media_blob_names(image text, renditions jsonb) RETURNS SETOF text
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT image WHERE image <> ''
+    UNION
+    SELECT rendition.value ->> format
+    FROM jsonb_each(renditions) AS rendition, unnest(ARRAY['webp', 'jpeg']) AS format
+    WHERE jsonb_typeof(rendition.value) = 'object' AND rendition.value ->> format IS NOT NULL
+$$;
+
+CREATE OR REPLACE FUNCTION media_blob_adjust(blob text, delta bigint) RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE recipes_mediablob SET refs = greatest(refs + delta, 0) WHERE name = blob;
+    IF NOT FOUND AND delta > 0 THEN
+        INSERT INTO recipes_mediablob (name, refs, touched_at) VALUES (blob, delta, now())
+        ON CONFLICT (name) DO UPDATE SET refs = recipes_mediablob.refs + EXCLUDED.refs;
+    END IF;
+END
+$$;
+
+-- Blobs are adjusted in name order, so concurrent statements lock them in
+-- the same order.
+CREATE OR REPLACE FUNCTION media_blob_refs() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM media_blob_adjust(name, uses) FROM (
+            SELECT name, count(*) AS uses FROM new_rows, media_blob_names(new_rows.image, new_rows.renditions) AS name
+            GROUP BY name ORDER BY name
+        ) changes;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM media_blob_adjust(name, -uses) FROM (
+            SELECT name, count(*) AS uses FROM old_rows, media_blob_names(old_rows.image, old_rows.renditions) AS name
+            GROUP BY name ORDER BY name
+        ) changes;
+    ELSE
+        PERFORM media_blob_adjust(name, uses) FROM (
+            SELECT name, sum(uses) AS uses FROM (
+                SELECT name, 1 AS uses FROM new_rows, media_blob_names(new_rows.image, new_rows.renditions) AS name
+                UNION ALL
+                SELECT name, -1 FROM old_rows, media_blob_names(old_rows.image, old_rows.renditions) AS name
+            ) used
+            GROUP BY name HAVING sum(uses) <> 0 ORDER BY name
+        ) changes;
+    END IF;
+    RETURN NULL;
+END
+$$;
+"""
+
+DROP_MEDIA_BLOB_FUNCTION_SQL = (
+    'DROP FUNCTION IF EXISTS media_blob_refs(); '
+    'DROP FUNCTION IF EXISTS media_blob_adjust(text, bigint); '
+    'DROP FUNCTION IF EXISTS media_blob_names(text, jsonb);'
+)
+
+
+def media_blob_trigger_sql():
+    """CREATE TRIGGER statements for COUNTED_TABLES, and their reverse."""
+    create = []
+    drop = []
+    for table, _, _ in COUNTED_TABLES:
+        for operation, transition in (
+            ('INSERT', 'NEW TABLE AS new_rows'),
+            ('UPDATE', 'OLD TABLE AS old_rows NEW TABLE AS new_rows'),
+            ('DELETE', 'OLD TABLE AS old_rows'),
+        ):
+            trigger = f'media_blob_{operation.lower()}'
+            create.append(
+                f'CREATE TRIGGER {trigger} AFTER {operation} ON {table} REFERENCING {transition} '
+                f'FOR EACH STATEMENT EXECUTE FUNCTION media_blob_refs()'
+            )
+            drop.append(f'DROP TRIGGER IF EXISTS {trigger} ON {table}')
+    return ';\n'.join(create), ';\n'.join(drop)
+
+
+def media_blob_backfill_sql():
+    """Counts the references of every existing image row."""
+    rows = ' UNION ALL '.join(
+        f'SELECT {image} AS image, {renditions} AS renditions FROM {table}'
+        for table, image, renditions in COUNTED_TABLES
+    )
+    return (
+        'INSERT INTO recipes_mediablob (name, refs, touched_at) '
+        f'SELECT name, count(*), now() FROM ({rows}) used, media_blob_names(used.image, used.renditions) AS name '
+        'GROUP BY name'
+    )
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage that names files after their SHA-256, keeping only the
+    extension of the name it is given. Saving content that is already
+    stored returns the existing name without writing anything.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        # Hash while writing to a temporary file in the same filesystem, so
+        # the blob appears whole under its name or not at all.
+        digest = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(dir=self.scratch_path(), delete=False) as temporary:
+            try:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    temporary.write(chunk)
+            except BaseException:
+                os.unlink(temporary.name)
+                raise
+        return self.save_file(temporary.name, name, digest.hexdigest())
+
+    def save_file(self, path, name, digest):
+        """
+        Stores the file at `path`, whose SHA-256 is `digest`, by moving it
+        into place (it must be under scratch_path()) or deleting it when the
+        content is already stored. Returns the stored name.
+        """
+        extension = os.path.splitext(name)[1].lower()
+        if not EXTENSION.match(extension):
+            extension = ''
+        name = f'blobs/{digest[:2]}/{digest}{extension}'
+        try:
+            MediaBlob.objects.bulk_create(
+                [MediaBlob(name=name)], update_conflicts=True, unique_fields=['name'], update_fields=['touched_at'],
+            )
+            target = self.path(name)
+            if os.path.exists(target):
+                os.unlink(path)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.chmod(path, self.file_permissions_mode or 0o644)
+                os.replace(path, target)
+        except BaseException:
+            if os.path.exists(path):
+                os.unlink(path)
+            raise
+        return name
+
+    def scratch_path(self, *names):
+        """A directory for files on their way in, created on first use."""
+        directory = self.path(os.path.join(SCRATCH, *names))
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+
+def collect_media(names=None, grace=None, limit=COLLECT_BATCH):
+    """
+    Deletes up to `limit` blobs that no image uses and that were not
+    uploaded in the last `grace` seconds (default MEDIA_BLOB_GRACE), only
+    among `names` when given. Returns the names deleted.
+    """
+    if grace is None:
+        grace = settings.MEDIA_BLOB_GRACE
+    with transaction.atomic():
+        unused = MediaBlob.objects.select_for_update(skip_locked=True).filter(
+            refs=0, touched_at__lt=timezone.now() - timedelta(seconds=grace),
+        )
+        if names is not None:
+            unused = unused.filter(name__in=names)
+        deleted = list(unused.order_by('touched_at').values_list('name', flat=True)[:limit])
+        for name in deleted:
+            default_storage.delete(name)
+        MediaBlob.objects.filter(name__in=deleted).delete()
+    return deleted
+
+
+def image_files(instance):
+    """The files an image row uses: the image and its renditions."""
+    names = {instance.image.name} if instance.image else set()
+    for rendition in instance.renditions.values():
+        if isinstance(rendition, dict):
+            names.update(rendition[fmt] for fmt in ('webp', 'jpeg') if rendition.get(fmt))
+    return names
+
+
+def release_image_files(instance):
+    """Deletes the files of a deleted image row that nothing else uses, on commit."""
+    names = image_files(instance)
+    if names:
+        transaction.on_commit(lambda: collect_media(names))
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serves a file from MEDIA_ROOT with an ETag (the digest, for blobs) and
+    answers conditional requests with 304. MEDIA_OFFLOAD hands the body to
+    the web server: 'x-accel-redirect' (nginx, internal location at
+    MEDIA_ACCEL_PREFIX) or 'x-sendfile' (Apache, lighttpd).
+    """
+    if path.startswith(f'{SCRATCH}/'):
+        raise Http404('No such file')
+    try:
+        filename = default_storage.path(path)
+        stat = os.stat(filename)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404('No such file')
+    if not os.path.isfile(filename):
+        raise Http404('No such file')
+
+    blob = BLOB_NAME.match(path)
+    if blob:
+        etag = quote_etag(blob['digest'])
+        last_modified = None
+    else:
+        etag = quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+        last_modified = int(stat.st_mtime)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        if settings.MEDIA_OFFLOAD == 'x-accel-redirect':
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + path
+        elif settings.MEDIA_OFFLOAD == 'x-sendfile':
+            response = HttpResponse(content_type=content_type)
+            response['X-Sendfile'] = filename
+        else:
+            response = FileResponse(open(filename, 'rb'), content_type=content_type)
+
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = IMMUTABLE if blob else REVALIDATE
+    return response
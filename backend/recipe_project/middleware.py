@@ -1,14 +1,19 @@
-from django.http import JsonResponse
-from rest_framework_simplejwt.tokens import UntypedToken
-from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-from django.contrib.auth.models import User
-import jwt
+import json
+import logging
+import time
+from contextlib import ExitStack
 from django.conf import settings
+from django.db import connections
+from rest_framework.exceptions import AuthenticationFailed
+from recipes.authentication import JWTCookieAuthentication
+
+timing_logger = logging.getLogger('recipe_project.timing')
 
 
 class JWTAuthenticationFromCookieMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
+        self.authentication = JWTCookieAuthentication()
 
     def __call__(self, request):
         # Skip middleware for certain paths
@@ -16,31 +21,158 @@ class JWTAuthenticationFromCookieMiddleware:
         if any(request.path.startswith(path) for path in skip_paths):
             return self.get_response(request)
 
-        # Try to get token from cookie
-        access_token = request.COOKIES.get('access_token')
-        
-        if access_token:
-            try:
-                # Validate token
-                UntypedToken(access_token)
-                
-                # Decode token to get user info
-                decoded_token = jwt.decode(
-                    access_token, 
-                    settings.SECRET_KEY, 
-                    algorithms=['HS256']
-                )
-                
-                user_id = decoded_token.get('user_id')
-                if user_id:
-                    try:
-                        user = User.objects.get(id=user_id)
-                        request.user = user
-                    except User.DoesNotExist:
-                        pass
-                        
-            except (InvalidToken, TokenError, jwt.ExpiredSignatureError):
-                # Token is invalid or expired
-                pass
-
-        return self.get_response(request)
\ No newline at end of file
+        # Same verified-token cache as the DRF authentication class, so the
+        # token is decoded at most once per process rather than twice per request.
+        try:
+            result = self.authentication.authenticate(request)
+        except AuthenticationFailed:
+            # User not found or inactive
+            result = None
+
+        if result is not None:
+            request.user = result[0]
+
+        return self.get_response(request)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class RequestTiming:
+    """
+    Phase timings of one request. `execute` is installed with
+    connection.execute_wrapper() and counts every query this thread runs.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql = 0.0
+        self.view_started = self.view_finished = self.rendered = None
+        self.view_sql = 0.0
+        self.compress = 0.0
+        self.budget = None
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - started
+            self.queries += 1
+
+    def start_view(self):
+        self.view_started = time.perf_counter()
+        self.view_sql = self.sql
+
+    def finish_view(self):
+        if self.view_started is not None and self.view_finished is None:
+            self.view_finished = time.perf_counter()
+            self.view_sql = self.sql - self.view_sql
+
+    def finish_render(self, response):
+        self.rendered = time.perf_counter()
+
+    def metrics(self):
+        """
+        Returns {name: milliseconds}: SQL, view code outside SQL (for the API
+        views that is serialization), response rendering, compression of
+        buffered responses and the total.
+        """
+        now = time.perf_counter()
+        view = 0.0
+        if self.view_finished is not None:
+            view = self.view_finished - self.view_started - self.view_sql
+        render = self.rendered - self.view_finished if self.rendered is not None else 0.0
+        return {
+            'db': self.sql * 1000,
+            'view': view * 1000,
+            'render': render * 1000,
+            'compress': self.compress * 1000,
+            'total': (now - self.started) * 1000,
+        }
+
+
+class ServerTimingMiddleware:
+    """
+    Reports where each request spent its time, as a Server-Timing header and
+    a JSON log line on the recipe_project.timing logger: db (with the query
+    count), view, render, compress and total.
+
+    Views may set `query_budget`, a number of queries or {method: number}
+    (function views: the @query_budget decorator). Budgets count every
+    query of the request, authentication included. A request that runs more
+    logs a warning, or raises QueryBudgetExceeded when QUERY_BUDGET_STRICT
+    is on, as in tests.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = RequestTiming()
+        request.timing = timing
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timing.execute))
+            response = self.get_response(request)
+        timing.finish_view()
+
+        metrics = timing.metrics()
+        header = ', '.join(
+            f'db;dur={metrics["db"]:.1f};desc="{timing.queries} queries"' if name == 'db'
+            else f'{name};dur={duration:.1f}'
+            for name, duration in metrics.items()
+        )
+        if response.has_header('Server-Timing'):
+            header = f'{response["Server-Timing"]}, {header}'
+        response['Server-Timing'] = header
+
+        match = request.resolver_match
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'route': match.route if match else None,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'queries': timing.queries,
+            'budget': timing.budget,
+            **{f'{name}_ms': round(duration, 1) for name, duration in metrics.items()},
+        }
+        timing_logger.info(json.dumps(record))
+
+        if timing.budget is not None and timing.queries > timing.budget:
+            message = (
+                f'{request.method} {request.path} ran {timing.queries} queries, '
+                f'over the budget of {timing.budget} for {record["view"]}'
+            )
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            timing_logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        budget = getattr(view_func, 'query_budget', None)
+        if budget is None:
+            budget = getattr(getattr(view_func, 'view_class', None), 'query_budget', None)
+        if isinstance(budget, dict):
+            budget = budget.get(request.method)
+        request.timing.budget = budget
+        request.timing.start_view()
+
+    def process_template_response(self, request, response):
+        # DRF responses render after the view returns.
+        request.timing.finish_view()
+        response.add_post_render_callback(request.timing.finish_render)
+        return response
+
+
+def query_budget(budget):
+    """
+    Sets the query budget of a function view; put it above @api_view.
+    """
+    def decorate(view):
+        view.query_budget = budget
+        return view
+    return decorate
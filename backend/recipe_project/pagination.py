@@ -0,0 +1,205 @@
+import datetime
+import json
+from base64 import b64decode, b64encode
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """
+    Keeps full microsecond precision, which DjangoJSONEncoder truncates;
+    a truncated created_at would skip rows sharing the same millisecond.
+    """
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the view's ordering, with (created_at, id) appended
+    as a tie-breaker so that every row has a unique position.
+
+    The cursor holds the full sort key of the boundary row, so each page is a
+    single range condition on the ordered columns: no OFFSET and no COUNT(*),
+    and page 500 costs the same as page 1.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-created_at'
+    tiebreak_fields = ('created_at', 'id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.model = queryset.model
+        self.keys = self.get_keys(self.ordering)
+
+        position, reverse = self.decode_cursor(request)
+        keys = [_reverse_key(key) for key in self.keys] if reverse else self.keys
+
+        queryset = queryset.order_by(*[_order_by(key) for key in keys])
+        loaded, deferred = queryset.query.deferred_loading
+        if loaded and not deferred:
+            # The links are built from the page's boundary rows, so an only()
+            # (sparse ?fields=) must still load the sort key.
+            queryset = queryset.only(*loaded, *[name for name, _, _ in keys if self._is_field(name)])
+        if position is not None:
+            queryset = queryset.filter(_after(keys, position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        return self.page
+
+    def get_keys(self, ordering):
+        """
+        Returns the sort key as (field, descending, nulls_last) tuples.
+        Tie-breakers follow the direction of the leading field. nulls_last
+        is None for NOT NULL columns, which sort without a NULLS clause so
+        that plain (created_by, -created_at, -id) indexes match.
+        """
+        keys = []
+        seen = set()
+        for field in ordering:
+            name = field.lstrip('-')
+            if name == 'pk':
+                name = 'id'
+            if name not in seen:
+                keys.append((name, field.startswith('-'), self._nulls_last(name)))
+                seen.add(name)
+
+        descending = keys[0][1]
+        for name in self.tiebreak_fields:
+            if name not in seen:
+                keys.append((name, descending, self._nulls_last(name)))
+                seen.add(name)
+        return keys
+
+    def _nulls_last(self, name):
+        try:
+            field = self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return True
+        return True if field.null else None
+
+    def _is_field(self, name):
+        try:
+            self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return False
+        return True
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._build_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self._build_link(self.page[0], reverse=True)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+
+        try:
+            cursor = json.loads(b64decode(encoded.encode('ascii'), altchars=b'-_').decode('utf-8'))
+            if cursor['o'] != list(self.ordering) or len(cursor['p']) != len(self.keys):
+                raise ValueError
+            position = [
+                None if value is None else self._to_python(name, value)
+                for (name, _, _), value in zip(self.keys, cursor['p'])
+            ]
+            reverse = bool(cursor.get('r'))
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+        return position, reverse
+
+    def _to_python(self, name, value):
+        try:
+            field = self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Annotations such as search_rank round-trip through JSON as-is.
+            return value
+        return field.to_python(value)
+
+    def encode_cursor(self, cursor):
+        data = json.dumps(cursor, cls=CursorEncoder, separators=(',', ':'))
+        encoded = b64encode(data.encode('utf-8'), altchars=b'-_').decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _build_link(self, instance, reverse):
+        cursor = {
+            'o': list(self.ordering),
+            'p': [getattr(instance, name) for name, _, _ in self.keys],
+        }
+        if reverse:
+            cursor['r'] = 1
+        return self.encode_cursor(cursor)
+
+
+def _order_by(key):
+    name, descending, nulls_last = key
+    if nulls_last is None:
+        return F(name).desc() if descending else F(name).asc()
+    if nulls_last:
+        return F(name).desc(nulls_last=True) if descending else F(name).asc(nulls_last=True)
+    return F(name).desc(nulls_first=True) if descending else F(name).asc(nulls_first=True)
+
+
+def _reverse_key(key):
+    name, descending, nulls_last = key
+    return (name, not descending, None if nulls_last is None else not nulls_last)
+
+
+def _beyond(key, value):
+    name, descending, nulls_last = key
+    if value is None:
+        return None if nulls_last else Q(**{f'{name}__isnull': False})
+    beyond = Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+    if nulls_last:
+        beyond |= Q(**{f'{name}__isnull': True})
+    return beyond
+
+
+def _after(keys, position):
+    """
+    Builds the lexicographic "row comes after position" condition:
+    (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ...
+    """
+    conditions = []
+    equal = Q()
+    for key, value in zip(keys, position):
+        beyond = _beyond(key, value)
+        if beyond is not None:
+            conditions.append(equal & beyond)
+        name = key[0]
+        equal &= Q(**{f'{name}__isnull': True}) if value is None else Q(**{name: value})
+    return reduce(or_, conditions) if conditions else Q(pk__in=[])
@@ -0,0 +1,24 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer's output, serialized by orjson, which is several times
+    faster on large lists.
+
+    Dates and the types orjson does not know (Decimal, lazy strings, ...)
+    are passed to DRF's encoder, so they come out exactly as before: DRF
+    keeps milliseconds where orjson would keep microseconds. Indented output,
+    as the browsable API asks for, is left to JSONRenderer.
+    """
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=self.encoder_class().default, option=self.options)
+        # Valid JSON but not valid JavaScript; JSONRenderer escapes them too.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
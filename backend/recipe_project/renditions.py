@@ -0,0 +1,148 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.dispatch import Signal
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Rendition name -> longest edge in pixels, largest first so that each
+# rendition can be downscaled from the previous one.
+RENDITIONS = {
+    'full': 1600,
+    'card': 640,
+    'thumbnail': 200,
+}
+
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+# Sent with sender=<image model> and pk once an image's renditions are saved,
+# so the owning objects can be marked as modified.
+renditions_stored = Signal()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def render_renditions(source_path):
+    """
+    Decodes the image at source_path once, applies its EXIF orientation and
+    encodes every rendition as WebP and JPEG. Runs in a worker process, so it
+    only touches the filesystem and returns the encoded bytes.
+    """
+    largest = max(RENDITIONS.values())
+    with Image.open(source_path) as image:
+        # Let the JPEG decoder downscale by a power of two while decoding.
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+        results = {}
+        for name, edge in sorted(RENDITIONS.items(), key=lambda item: -item[1]):
+            image.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+
+            webp = BytesIO()
+            image.save(webp, 'WEBP', quality=WEBP_QUALITY, method=4)
+            jpeg = BytesIO()
+            image.convert('RGB').save(jpeg, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+
+            results[name] = {
+                'width': image.width,
+                'height': image.height,
+                'webp': webp.getvalue(),
+                'jpeg': jpeg.getvalue(),
+            }
+        return results
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_RENDITION_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def store_renditions(field_file, results):
+    """
+    Saves encoded renditions next to the original as
+    <dir>/renditions/<stem>_<name>.<ext> and returns the JSON stored in the
+    model's `renditions` field.
+    """
+    directory, filename = os.path.split(field_file.name)
+    stem = os.path.splitext(filename)[0]
+    renditions = {'source': field_file.name}
+    for name, rendition in results.items():
+        stored = {'width': rendition['width'], 'height': rendition['height']}
+        for fmt, extension in (('webp', 'webp'), ('jpeg', 'jpg')):
+            path = os.path.join(directory, 'renditions', f'{stem}_{name}.{extension}')
+            stored[fmt] = field_file.storage.save(path, ContentFile(rendition[fmt]))
+        renditions[name] = stored
+    return renditions
+
+
+def _finish(model, pk, field_file, future):
+    try:
+        results = future.result()
+        renditions = store_renditions(field_file, results)
+        if model.objects.filter(pk=pk, image=field_file.name).update(renditions=renditions):
+            renditions_stored.send(sender=model, pk=pk)
+    except Exception:
+        logger.exception('Could not render %s %s', model.__name__, pk)
+    finally:
+        close_old_connections()
+
+
+def schedule_renditions(instance):
+    """
+    Renders renditions for an image model instance once the current
+    transaction commits: in the process pool, or inline when
+    IMAGE_RENDITION_WORKERS is 0.
+    """
+    model = type(instance)
+    field_file = instance.image
+
+    def submit():
+        if settings.IMAGE_RENDITION_WORKERS:
+            future = get_executor().submit(render_renditions, field_file.path)
+            future.add_done_callback(partial(_finish, model, instance.pk, field_file))
+        else:
+            instance.renditions = store_renditions(field_file, render_renditions(field_file.path))
+            model.objects.filter(pk=instance.pk).update(renditions=instance.renditions)
+            renditions_stored.send(sender=model, pk=instance.pk)
+
+    transaction.on_commit(submit)
+
+
+def needs_renditions(instance):
+    return bool(instance.image) and instance.renditions.get('source') != instance.image.name
+
+
+def rendition_urls(renditions, storage, request=None):
+    """
+    Serializer representation of a `renditions` field: URLs and dimensions
+    per rendition, absolute when a request is available (like ImageField).
+    """
+    urls = {}
+    for name in RENDITIONS:
+        rendition = renditions.get(name)
+        if not rendition:
+            continue
+        urls[name] = {'width': rendition['width'], 'height': rendition['height']}
+        for fmt in ('webp', 'jpeg'):
+            url = storage.url(rendition[fmt])
+            urls[name][fmt] = request.build_absolute_uri(url) if request is not None else url
+    return urls
@@ -0,0 +1,111 @@
+"""
+Serializer-free read path for the hot list endpoints.
+
+A list serializer builds a model instance per row, then a serializer per
+nested object, and most of a 100-row page goes into that bookkeeping. A
+ListRows subclass produces the same JSON from the page's .values_list()
+tuples instead: to-one relations come from joined columns (the same single
+query select_related makes) and to-many relations from one extra query per
+relation, as with prefetch_related.
+
+The output must stay byte-for-byte what the serializer renders: the
+ListRowsTests in each app's tests.py (and `manage.py benchmark_list_rows`,
+over more data) fail when they differ. Requests with ?fields=/?expand= and, with LIST_ROWS_FAST_PATH
+off, every request still go through the serializer.
+"""
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.response import Response
+from recipe_project.fieldsets import requested_fieldset
+from recipe_project.renditions import rendition_urls
+
+_datetime_field = serializers.DateTimeField()
+
+
+def datetime_value(value):
+    """A datetime as DRF's DateTimeField renders it."""
+    return _datetime_field.to_representation(value)
+
+
+class ListRows:
+    """
+    Renders a page of rows for a list view. `columns` are passed to
+    values_list(named=True) together with the columns the paginator needs
+    for its cursor; render() turns the rows into the list's items.
+    """
+    columns = []
+
+    def __init__(self, context):
+        self.context = context
+
+    def queryset(self, queryset, keys):
+        # The eager-loading planner may have queued prefetches for the serializer.
+        names = dict.fromkeys([*self.columns, *keys])
+        return queryset.prefetch_related(None).values_list(*names, named=True)
+
+    def render(self, rows):
+        raise NotImplementedError
+
+    @staticmethod
+    def cached(cache, key, build):
+        """Builds a nested object once per page and shares it between rows."""
+        value = cache.get(key)
+        if value is None:
+            value = cache[key] = build()
+        return value
+
+    @staticmethod
+    def image(row, prefix, storage):
+        """A primary image as its serializer renders it outside a request."""
+        name = getattr(row, f'{prefix}__image')
+        return {
+            'id': getattr(row, f'{prefix}_id'),
+            'image': storage.url(name) if name else None,
+            'caption': getattr(row, f'{prefix}__caption'),
+            'is_primary': getattr(row, f'{prefix}__is_primary'),
+            'created_at': datetime_value(getattr(row, f'{prefix}__created_at')),
+            'renditions': rendition_urls(getattr(row, f'{prefix}__renditions'), storage),
+        }
+
+    @staticmethod
+    def user(row, prefix):
+        return {
+            'id': getattr(row, f'{prefix}_id'),
+            'username': getattr(row, f'{prefix}__username'),
+            'email': getattr(row, f'{prefix}__email'),
+            'first_name': getattr(row, f'{prefix}__first_name'),
+            'last_name': getattr(row, f'{prefix}__last_name'),
+        }
+
+
+def user_columns(prefix):
+    return [f'{prefix}_id', *(f'{prefix}__{name}' for name in ('username', 'email', 'first_name', 'last_name'))]
+
+
+def image_columns(prefix):
+    return [
+        f'{prefix}_id',
+        *(f'{prefix}__{name}' for name in ('image', 'caption', 'is_primary', 'created_at', 'renditions')),
+    ]
+
+
+class ListRowsMixin:
+    """
+    Serves GET on a list view through `list_rows`, a ListRows subclass.
+    Goes before EagerLoadingMixin and works with KeysetCursorPagination,
+    which reads the cursor from the row tuples.
+    """
+    list_rows = None
+
+    def list(self, request, *args, **kwargs):
+        if self.list_rows is None or not settings.LIST_ROWS_FAST_PATH or requested_fieldset(request) is not None:
+            return super().list(request, *args, **kwargs)
+
+        rows = self.list_rows(self.get_serializer_context())
+        queryset = self.filter_queryset(self.get_queryset())
+        keys = [*queryset.query.annotations, *self.ordering_fields, *self.paginator.tiebreak_fields]
+        queryset = rows.queryset(queryset, keys)
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(rows.render(list(queryset)))
+        return self.get_paginated_response(rows.render(page))
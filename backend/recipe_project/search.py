@@ -0,0 +1,75 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import models
+from django.db.models import F, Func, Q, TextField
+from django.db.models.functions import Greatest
+from django.conf import settings
+from rest_framework import filters
+
+
+# array_to_string() is only STABLE, which a generated column cannot use;
+# created by recipes' 0008 migration.
+TAGS_TEXT_FUNCTION_SQL = (
+    "CREATE OR REPLACE FUNCTION tags_text(varchar[]) RETURNS text "
+    "LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$ SELECT array_to_string($1, ' ') $$"
+)
+
+
+class TagsText(Func):
+    """The tags as one space-separated string, for the search vector."""
+    function = 'tags_text'
+    output_field = TextField()
+
+
+class SearchVectorManager(models.Manager):
+    """
+    Keeps the generated search_vector column out of ordinary SELECTs; it is
+    only ever used in WHERE and ORDER BY clauses.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().defer('search_vector')
+
+
+class RankedSearchFilter(filters.SearchFilter):
+    """
+    Replaces SearchFilter's ILIKE scan with a ranked full-text search over
+    the view model's weighted `search_vector` column (GIN indexed), OR-ed
+    with a pg_trgm word similarity match on `trigram_search_fields` so that
+    misspelt terms still find something.
+
+    Matching rows are annotated with `search_rank`; RankedOrderingFilter
+    orders by it when the client has not asked for an explicit ordering.
+    """
+    search_vector_field = 'search_vector'
+    trigram_weight = 0.5
+
+    def filter_queryset(self, request, queryset, view):
+        terms = ' '.join(self.get_search_terms(request))
+        if not terms:
+            return queryset
+
+        query = SearchQuery(terms, search_type='websearch', config=settings.SEARCH_CONFIG)
+        condition = Q(**{self.search_vector_field: query})
+        rank = SearchRank(F(self.search_vector_field), query)
+
+        trigram_fields = getattr(view, 'trigram_search_fields', [])
+        if trigram_fields:
+            for field in trigram_fields:
+                condition |= Q(**{f'{field}__trigram_word_similar': terms})
+            similarities = [TrigramWordSimilarity(terms, field) for field in trigram_fields]
+            similarity = Greatest(*similarities) if len(similarities) > 1 else similarities[0]
+            rank = rank + similarity * self.trigram_weight
+
+        return queryset.annotate(search_rank=rank).filter(condition)
+
+
+class RankedOrderingFilter(filters.OrderingFilter):
+    """
+    OrderingFilter that defaults to relevance order while a search is active.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        if not request.query_params.get(self.ordering_param):
+            if request.query_params.get(RankedSearchFilter.search_param, '').strip():
+                return ['-search_rank']
+        return super().get_ordering(request, queryset, view)
@@ -0,0 +1,185 @@
+"""
+Synthetic libraries for benchmarks and query-plan checks.
+
+Everything is written with bulk inserts, a chunk of users at a time, so
+volumes are bounded by the database rather than by memory. bulk_create
+skips the post_save handlers, so the ingredient index and the primary
+images are filled in directly, as the library importer does.
+"""
+import io
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.db import connection
+from PIL import Image
+from recipe_project.autocomplete import store_terms
+from recipe_project.renditions import render_renditions, store_renditions
+from recipes.management.commands.benchmark_shopping_list import synthetic_recipes
+from recipes.models import Category, Recipe, RecipeImage
+from recipes.signals import index_ingredients, store_ingredient_tokens
+from recipes.signals import primary_image_subquery as recipe_primary_image
+from stretches.models import BodyPart, RoutineStretch, Stretch, StretchImage, StretchRoutine
+from stretches.ranking import spaced_ranks
+from stretches.signals import primary_image_subquery as stretch_primary_image
+
+CATEGORY_NAMES = [
+    'Breakfast', 'Soups', 'Salads', 'Pasta', 'Rice & Grains', 'Meat', 'Fish', 'Vegetarian',
+    'Baking', 'Desserts', 'Drinks', 'Sauces', 'Snacks', 'Slow cooker', 'Holiday',
+]
+BODY_PART_NAMES = [
+    'Neck', 'Shoulders', 'Upper back', 'Lower back', 'Chest', 'Arms', 'Wrists', 'Hips',
+    'Glutes', 'Hamstrings', 'Quadriceps', 'Calves', 'Ankles', 'Core',
+]
+DISHES = ['stew', 'curry', 'salad', 'soup', 'pie', 'risotto', 'tacos', 'bake', 'stir-fry', 'pancakes', 'casserole']
+FLAVOURS = ['Smoky', 'Lemony', 'Garlic', 'Spicy', "Grandma's", 'Weeknight', 'Herby', 'Creamy', 'Sunday', 'Quick']
+TAGS = ['family', 'quick', 'vegetarian', 'freezer', 'kids', 'spicy', 'gluten-free', 'batch', 'summer', 'winter']
+POSES = ['standing', 'seated', 'kneeling', 'lying', 'wall', 'doorway', 'cross-body', 'figure-four']
+STEPS = [
+    'Prepare and measure all the ingredients.', 'Heat the oil in a large pan over medium heat.',
+    'Add the onions and cook until soft.', 'Stir in the remaining ingredients.',
+    'Simmer for 20 minutes, stirring now and then.', 'Season to taste and serve warm.',
+]
+
+CHUNK_USERS = 100
+BATCH_SIZE = 1000
+
+
+def _placeholder_image(model, color):
+    """
+    Saves one JPEG for every seeded image of `model` to point at, renders
+    its renditions and returns (name, renditions).
+    """
+    field_file = model(image=f'{model._meta.get_field("image").upload_to}seeded.jpg').image
+    buffer = io.BytesIO()
+    Image.new('RGB', (1600, 1200), color).save(buffer, 'JPEG', quality=80)
+    field_file.name = field_file.storage.save(field_file.name, ContentFile(buffer.getvalue()))
+    return field_file.name, store_renditions(field_file, render_renditions(field_file.path))
+
+
+def seed_library(prefix='perf', users=10, recipes=100, images=1, stretches=50, routines=5, routine_size=8,
+                 password=None, image_files=True, seed=0, progress=None):
+    """
+    Creates `users` users named <prefix>-<n>, each with `recipes` recipes
+    (with `images` images each), `stretches` stretches and `routines`
+    routines of `routine_size` stretches. Categories and body parts are
+    shared and matched by name. Returns the users.
+
+    Image rows all share one placeholder file (and its renditions) per app,
+    written to storage unless `image_files` is off.
+    """
+    rng = random.Random(seed)
+    password_hash = make_password(password) if password else make_password(None)
+    categories = _named(Category, CATEGORY_NAMES)
+    body_parts = _named(BodyPart, BODY_PART_NAMES)
+    recipe_image = stretch_image = None
+    if images and image_files:
+        recipe_image = _placeholder_image(RecipeImage, 'tomato')
+        stretch_image = _placeholder_image(StretchImage, 'teal')
+
+    created = []
+    for start in range(0, users, CHUNK_USERS):
+        chunk = User.objects.bulk_create([
+            User(username=f'{prefix}-{index}', email=f'{prefix}-{index}@example.com', password=password_hash)
+            for index in range(start, min(start + CHUNK_USERS, users))
+        ])
+        created.extend(chunk)
+        _seed_recipes(rng, chunk, categories, recipes, images, recipe_image)
+        _seed_stretches(rng, chunk, body_parts, stretches, images, stretch_image, routines, routine_size)
+        if progress:
+            progress(len(created))
+
+    # auto_now_add gave whole batches the same timestamp; spread them out.
+    with connection.cursor() as cursor:
+        for model in (Recipe, Stretch, StretchRoutine):
+            cursor.execute(
+                f"UPDATE {model._meta.db_table} SET created_at = created_at - id * interval '1 minute' "
+                f"WHERE created_by_id = ANY(%s)",
+                [[user.pk for user in created]]
+            )
+    return created
+
+
+def _named(model, names):
+    existing = {obj.name: obj for obj in model.objects.filter(name__in=names)}
+    missing = [model(name=name) for name in names if name not in existing]
+    model.objects.bulk_create(missing)
+    return list(existing.values()) + missing
+
+
+def _seed_recipes(rng, users, categories, count, images, image):
+    recipes = []
+    for user in users:
+        for _, ingredients, servings in synthetic_recipes(count, rng.randint(5, 14), seed=rng.random()):
+            recipes.append(Recipe(
+                title=f'{rng.choice(FLAVOURS)} {rng.choice(DISHES)}',
+                description=f'A {rng.choice(TAGS)} favourite that keeps well.',
+                ingredients=ingredients,
+                instructions='\n'.join(rng.sample(STEPS, rng.randint(3, len(STEPS)))),
+                prep_time=rng.choice([None, 5, 10, 15, 20, 30]),
+                cook_time=rng.choice([None, 10, 20, 30, 45, 60, 90]),
+                servings=servings,
+                category=rng.choice(categories + [None]),
+                tags=rng.sample(TAGS, rng.randint(0, 3)),
+                created_by=user,
+                is_favorite=rng.random() < 0.1,
+            ))
+    entries = index_ingredients(recipes)
+    Recipe.objects.bulk_create(recipes, batch_size=BATCH_SIZE)
+    store_ingredient_tokens(entries)
+    store_terms(recipes)
+
+    name, renditions = image or ('recipe_images/seeded.jpg', {})
+    RecipeImage.objects.bulk_create([
+        RecipeImage(recipe=recipe, image=name, renditions=renditions, is_primary=index == 0)
+        for recipe in recipes for index in range(images)
+    ], batch_size=BATCH_SIZE)
+    Recipe.objects.filter(created_by__in=users).update(primary_image=recipe_primary_image())
+
+
+def _seed_stretches(rng, users, body_parts, count, images, image, routines, routine_size):
+    stretches = [
+        Stretch(
+            title=f'{rng.choice(POSES).capitalize()} {rng.choice(body_parts).name.lower()} stretch',
+            description='Slow and controlled, breathing throughout.',
+            instructions='Get into position.\nHold without bouncing.\nRelease slowly.',
+            duration=rng.choice([None, 20, 30, 45, 60]),
+            repetitions=rng.choice([None, 2, 3, 5]),
+            difficulty_level=rng.choice(['beginner', 'intermediate', 'advanced']),
+            tags=rng.sample(TAGS, rng.randint(0, 2)),
+            created_by=user,
+            is_favorite=rng.random() < 0.1,
+        )
+        for user in users for _ in range(count)
+    ]
+    Stretch.objects.bulk_create(stretches, batch_size=BATCH_SIZE)
+    store_terms(stretches)
+    Stretch.body_parts.through.objects.bulk_create([
+        Stretch.body_parts.through(stretch=stretch, bodypart=body_part)
+        for stretch in stretches for body_part in rng.sample(body_parts, rng.randint(1, 3))
+    ], batch_size=BATCH_SIZE)
+    name, renditions = image or ('stretch_images/seeded.jpg', {})
+    StretchImage.objects.bulk_create([
+        StretchImage(stretch=stretch, image=name, renditions=renditions, is_primary=index == 0)
+        for stretch in stretches for index in range(images)
+    ], batch_size=BATCH_SIZE)
+    Stretch.objects.filter(created_by__in=users).update(primary_image=stretch_primary_image())
+
+    by_owner = {}
+    for stretch in stretches:
+        by_owner.setdefault(stretch.created_by_id, []).append(stretch)
+    seeded = StretchRoutine.objects.bulk_create([
+        StretchRoutine(name=f'{rng.choice(["Morning", "Evening", "Desk", "Post-run"])} routine {index + 1}',
+                       created_by=user)
+        for user in users for index in range(routines)
+    ], batch_size=BATCH_SIZE)
+    items = []
+    for routine in seeded:
+        picked = rng.sample(by_owner.get(routine.created_by_id, []), min(routine_size, count))
+        for stretch, rank in zip(picked, spaced_ranks(len(picked))):
+            items.append(RoutineStretch(
+                routine=routine, stretch=stretch, rank=rank,
+                custom_duration=rng.choice([None, None, 30, 60]),
+            ))
+    RoutineStretch.objects.bulk_create(items, batch_size=BATCH_SIZE)
@@ -18,6 +18,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
@@ -26,6 +27,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so that its total covers the rest of the stack.
+    'recipe_project.middleware.ServerTimingMiddleware',
+    'recipe_project.compression.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -94,8 +98,79 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Uploads are stored once per distinct content, see recipe_project.media.
+STORAGES = {
+    'default': {'BACKEND': 'recipe_project.media.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+# Seconds an unused media file is kept after its last upload: long enough
+# for the request that uploaded it to insert the image that uses it.
+MEDIA_BLOB_GRACE = config('MEDIA_BLOB_GRACE', default=60 * 60, cast=int)
+# How media responses send the file: '' streams it from Django,
+# 'x-accel-redirect' hands it to nginx (an internal location serving
+# MEDIA_ROOT at MEDIA_ACCEL_PREFIX) and 'x-sendfile' to Apache or lighttpd.
+MEDIA_OFFLOAD = config('MEDIA_OFFLOAD', default='')
+MEDIA_ACCEL_PREFIX = config('MEDIA_ACCEL_PREFIX', default='/internal-media/')
+
+# Worker processes that render image thumbnails; 0 renders inline.
+IMAGE_RENDITION_WORKERS = config('IMAGE_RENDITION_WORKERS', default=2, cast=int)
+# Largest image accepted by the resumable upload endpoints, in bytes.
+IMAGE_UPLOAD_MAX_SIZE = config('IMAGE_UPLOAD_MAX_SIZE', default=20 * 1024 * 1024, cast=int)
+# Seconds a resumable upload is kept after its last chunk before
+# `manage.py collect_media` deletes it.
+UPLOAD_SESSION_TTL = config('UPLOAD_SESSION_TTL', default=24 * 60 * 60, cast=int)
+
+# Largest batch accepted by the bulk create/update/delete endpoints. A full
+# batch of recipes needs a larger request body than Django's 2.5 MB default.
+BULK_MAX_ITEMS = config('BULK_MAX_ITEMS', default=1000, cast=int)
+DATA_UPLOAD_MAX_MEMORY_SIZE = config('DATA_UPLOAD_MAX_MEMORY_SIZE', default=10 * 1024 * 1024, cast=int)
+
+# Seconds a routine timeline stays cached. Entries are keyed on the routine's
+# validators, so edits never serve a stale timeline; this only bounds memory.
+ROUTINE_TIMELINE_CACHE_TIMEOUT = config('ROUTINE_TIMELINE_CACHE_TIMEOUT', default=24 * 60 * 60, cast=int)
+
+# Seconds facet counts stay cached. Like timelines they are keyed on the
+# list's validators, so writes are never served stale counts.
+FACETS_CACHE_TIMEOUT = config('FACETS_CACHE_TIMEOUT', default=60 * 60, cast=int)
+
+# Serve the recipe and stretch lists from .values_list() rows instead of
+# their serializers, see recipe_project.rows.
+LIST_ROWS_FAST_PATH = config('LIST_ROWS_FAST_PATH', default=True, cast=bool)
+
+# Responses smaller than COMPRESS_MIN_SIZE bytes are sent uncompressed, see
+# recipe_project.compression. Brotli quality 4 compresses about as well as
+# gzip level 6 in a fraction of the time; 11 is far too slow per request.
+COMPRESS_MIN_SIZE = config('COMPRESS_MIN_SIZE', default=1024, cast=int)
+COMPRESS_GZIP_LEVEL = config('COMPRESS_GZIP_LEVEL', default=6, cast=int)
+COMPRESS_BROTLI_QUALITY = config('COMPRESS_BROTLI_QUALITY', default=4, cast=int)
+
+# Requests that run more queries than their view's query_budget log a
+# warning; with QUERY_BUDGET_STRICT (on in the test suites, see
+# recipe_project.testing) they fail.
+QUERY_BUDGET_STRICT = config('QUERY_BUDGET_STRICT', default=False, cast=bool)
+
+# One JSON line per request with its Server-Timing metrics, see
+# recipe_project.middleware.ServerTimingMiddleware.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'recipe_project.timing': {
+            'handlers': ['console'],
+            'level': config('REQUEST_TIMING_LOG_LEVEL', default='INFO'),
+        },
+    },
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Text search configuration used for the generated search_vector columns.
+# Changing it requires a migration, so it is deliberately not read from env.
+SEARCH_CONFIG = 'english'
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'recipes.authentication.JWTCookieAuthentication',
@@ -104,6 +179,15 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'recipe_project.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'recipe_project.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 SIMPLE_JWT = {
@@ -123,6 +207,12 @@ SIMPLE_JWT = {
     'TOKEN_TYPE_CLAIM': 'token_type',
 }
 
+# In-process cache of verified access tokens (recipes.authentication).
+# The TTL bounds how long another worker process may keep honouring a token
+# after its user was deactivated or changed password.
+JWT_VERIFIED_TOKEN_CACHE_SIZE = config('JWT_VERIFIED_TOKEN_CACHE_SIZE', default=10000, cast=int)
+JWT_VERIFIED_TOKEN_CACHE_TTL = config('JWT_VERIFIED_TOKEN_CACHE_TTL', default=60, cast=int)
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
     "http://127.0.0.1:3000",
@@ -0,0 +1,186 @@
+"""
+Delta sync for offline clients: GET /api/recipes/sync/?since=<cursor>
+returns the recipes, stretches, routines, routine items and images written
+since the cursor, and the ids of those deleted since.
+
+Every synced row has one recipes.SyncChange entry. An AFTER trigger on the
+synced tables moves it to the end of a global sequence on each insert or
+update and marks it deleted on delete, so bulk writes, queryset.update()
+and the library import are covered as well as the views. The feed is a
+range scan of (created_by, seq) from the cursor.
+
+A sequence value is taken before its transaction commits, so a reader
+could see seq 12 committed while 11 is still in flight and move its cursor
+past 11 for good. Writers therefore hold a shared advisory lock on their
+user until they commit, and the feed takes it exclusively before reading.
+"""
+from functools import cache
+
+from django.db import connection, transaction
+from recipe_project.eager import eager_load
+from recipe_project.fieldsets import Fieldset
+from recipes.models import Recipe, RecipeImage, SyncChange
+from recipes.serializers import RecipeImageSyncSerializer, RecipeSerializer
+from stretches.models import RoutineStretch, Stretch, StretchImage, StretchRoutine
+from stretches.serializers import (
+    RoutineStretchSyncSerializer, StretchImageSyncSerializer, StretchRoutineSerializer, StretchSerializer,
+)
+
+DEFAULT_SYNC_LIMIT = 500
+MAX_SYNC_LIMIT = 1000
+# pg_advisory_xact_lock(SYNC_LOCK, user id); spells "SYNC".
+SYNC_LOCK = 0x53594E43
+
+# (kind, table, parent kind, parent column): rows without created_by take
+# their owner from their parent's entry.
+SYNCED_TABLES = [
+    ('recipe', 'recipes_recipe', None, None),
+    ('recipe_image', 'recipes_recipeimage', 'recipe', 'recipe_id'),
+    ('stretch', 'stretches_stretch', None, None),
+    ('stretch_image', 'stretches_stretchimage', 'stretch', 'stretch_id'),
+    ('routine', 'stretches_stretchroutine', None, None),
+    ('routine_stretch', 'stretches_routinestretch', 'routine', 'routine_id'),
+]
+
+SYNC_FUNCTION_SQL = f"""
+CREATE SEQUENCE IF NOT EXISTS sync_change_seq;
+
+CREATE OR REPLACE FUNCTION sync_log_change() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    owner integer;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        SELECT created_by_id INTO owner FROM recipes_syncchange WHERE kind = TG_ARGV[0] AND object_id = OLD.id;
+        IF owner IS NOT NULL THEN
+            PERFORM pg_advisory_xact_lock_shared({SYNC_LOCK}, owner);
+            UPDATE recipes_syncchange SET seq = nextval('sync_change_seq'), deleted = true
+            WHERE kind = TG_ARGV[0] AND object_id = OLD.id;
+        END IF;
+        RETURN NULL;
+    END IF;
+
+    IF TG_NARGS = 1 THEN
+        owner := NEW.created_by_id;
+    ELSE
+        SELECT created_by_id INTO owner FROM recipes_syncchange
+        WHERE kind = TG_ARGV[1] AND object_id = (to_jsonb(NEW) ->> TG_ARGV[2])::bigint;
+    END IF;
+    IF owner IS NOT NULL THEN
+        PERFORM pg_advisory_xact_lock_shared({SYNC_LOCK}, owner);
+        INSERT INTO recipes_syncchange (created_by_id, kind, object_id, seq, deleted)
+        VALUES (owner, TG_ARGV[0], NEW.id, nextval('sync_change_seq'), false)
+        ON CONFLICT (kind, object_id) DO UPDATE SET seq = EXCLUDED.seq, deleted = false;
+    END IF;
+    RETURN NULL;
+END
+$$;
+"""
+
+DROP_SYNC_FUNCTION_SQL = 'DROP FUNCTION IF EXISTS sync_log_change(); DROP SEQUENCE IF EXISTS sync_change_seq;'
+
+
+def _trigger_args(kind, parent_kind, parent_column):
+    args = [kind] if parent_kind is None else [kind, parent_kind, parent_column]
+    return ', '.join(f"'{arg}'" for arg in args)
+
+
+def sync_trigger_sql():
+    """CREATE TRIGGER statements for SYNCED_TABLES, and their reverse."""
+    create = ';\n'.join(
+        f'CREATE TRIGGER sync_change AFTER INSERT OR UPDATE OR DELETE ON {table} '
+        f'FOR EACH ROW EXECUTE FUNCTION sync_log_change({_trigger_args(kind, parent_kind, parent_column)})'
+        for kind, table, parent_kind, parent_column in SYNCED_TABLES
+    )
+    drop = ';\n'.join(f'DROP TRIGGER IF EXISTS sync_change ON {table}' for _, table, _, _ in SYNCED_TABLES)
+    return create, drop
+
+
+def sync_backfill_sql():
+    """Adds an entry for every existing row, parents before their children."""
+    statements = []
+    for kind, table, parent_kind, parent_column in SYNCED_TABLES:
+        if parent_kind is None:
+            select = f"SELECT created_by_id, '{kind}', id, nextval('sync_change_seq'), false FROM {table}"
+        else:
+            select = (
+                f"SELECT parent.created_by_id, '{kind}', child.id, nextval('sync_change_seq'), false "
+                f"FROM {table} child JOIN recipes_syncchange parent "
+                f"ON parent.kind = '{parent_kind}' AND parent.object_id = child.{parent_column}"
+            )
+        statements.append(
+            f'INSERT INTO recipes_syncchange (created_by_id, kind, object_id, seq, deleted) {select}'
+        )
+    return ';\n'.join(statements)
+
+
+# kind: (response key, model, serializer, relations sent in full)
+KINDS = {
+    'recipe': ('recipes', Recipe, RecipeSerializer, frozenset({'category'})),
+    'recipe_image': ('recipe_images', RecipeImage, RecipeImageSyncSerializer, frozenset()),
+    'stretch': ('stretches', Stretch, StretchSerializer, frozenset({'body_parts'})),
+    'stretch_image': ('stretch_images', StretchImage, StretchImageSyncSerializer, frozenset()),
+    'routine': ('routines', StretchRoutine, StretchRoutineSerializer, frozenset()),
+    'routine_stretch': ('routine_stretches', RoutineStretch, RoutineStretchSyncSerializer, frozenset()),
+}
+
+
+@cache
+def sync_fieldset(serializer_class, expand):
+    """
+    Every readable field, with the synced relations (images, routine items)
+    collapsed to ids: the feed sends those rows on their own.
+    """
+    readable = frozenset(name for name, field in serializer_class().fields.items() if not field.write_only)
+    return Fieldset(readable, expand)
+
+
+def parse_cursor(value):
+    """The sequence number in a ?since= cursor, 0 for none; None if invalid."""
+    if value is None:
+        return 0
+    return int(value) if value.isdecimal() else None
+
+
+def changes_since(request, since, limit):
+    """
+    Up to `limit` changes of the user's library after `since`, oldest first.
+    A first sync (since=0) skips tombstones.
+    """
+    user = request.user
+    results = {response_key: [] for response_key, _, _, _ in KINDS.values()}
+    deleted = {response_key: [] for response_key, _, _, _ in KINDS.values()}
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s, %s)', [SYNC_LOCK, user.pk])
+        entries = SyncChange.objects.filter(created_by=user, seq__gt=since)
+        if not since:
+            entries = entries.filter(deleted=False)
+        entries = list(entries.order_by('seq').values_list('seq', 'kind', 'object_id', 'deleted')[:limit + 1])
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+
+        upserts = {}
+        for _, kind, object_id, is_deleted in entries:
+            if is_deleted:
+                deleted[KINDS[kind][0]].append(object_id)
+            else:
+                upserts.setdefault(kind, []).append(object_id)
+
+        for kind, object_ids in upserts.items():
+            response_key, model, serializer_class, expand = KINDS[kind]
+            fieldset = sync_fieldset(serializer_class, expand)
+            queryset = eager_load(model._default_manager.filter(pk__in=object_ids), serializer_class, fieldset=fieldset)
+            objects = {obj.pk: obj for obj in queryset}
+            serializer = serializer_class(
+                [objects[pk] for pk in object_ids if pk in objects], many=True,
+                context={'request': request, 'fieldset': fieldset},
+            )
+            results[response_key] = serializer.data
+
+    return {
+        'cursor': str(entries[-1][0] if entries else since),
+        'has_more': has_more,
+        'changes': results,
+        'deleted': deleted,
+    }
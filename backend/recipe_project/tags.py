@@ -0,0 +1,101 @@
+"""
+Tags are stored normalized in a varchar[] column with a GIN index, so
+filtering on them uses the array operators (@> for all of, && for any of)
+and counting them is one unnest() GROUP BY.
+"""
+import re
+
+import django_filters
+from rest_framework import serializers
+from .facets import FacetsView, tag_counts
+
+MAX_TAG_LENGTH = 50
+MAX_TAGS = 20
+# Largest ?limit= of a tag cloud; larger values are capped.
+MAX_TAG_CLOUD_LIMIT = 1000
+
+
+def normalize_tags(value):
+    """
+    Turns a comma-separated string or a list of tags into the stored form:
+    trimmed, lower-cased, inner whitespace collapsed, without empty or
+    repeated tags, in their original order.
+    """
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    tags = []
+    for tag in value:
+        tag = re.sub(r'\s+', ' ', str(tag)).strip().lower()
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+class TagsField(serializers.Field):
+    """
+    Reads and writes tags as the comma-separated string the API has always
+    used; a JSON list of tags is accepted on input too.
+    """
+    default_error_messages = {
+        'invalid': 'Expected a comma-separated string or a list of tags.',
+        'too_long': f'Tags can be at most {MAX_TAG_LENGTH} characters: {{tags}}.',
+        'too_many': f'At most {MAX_TAGS} tags.',
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            if not all(isinstance(tag, str) for tag in data):
+                self.fail('invalid')
+        elif not isinstance(data, str):
+            self.fail('invalid')
+        tags = normalize_tags(data)
+        too_long = [tag for tag in tags if len(tag) > MAX_TAG_LENGTH]
+        if too_long:
+            self.fail('too_long', tags=', '.join(too_long))
+        if len(tags) > MAX_TAGS:
+            self.fail('too_many')
+        return tags
+
+    def to_representation(self, value):
+        return ', '.join(value)
+
+
+class TagsFilter(django_filters.CharFilter):
+    """
+    ?tags=vegan,quick matches rows with all of the tags; with
+    match='any' (?tags_any=) rows with at least one of them.
+    """
+
+    def __init__(self, *args, match='all', **kwargs):
+        kwargs.setdefault('field_name', 'tags')
+        kwargs.setdefault('lookup_expr', 'contains' if match == 'all' else 'overlap')
+        super().__init__(*args, **kwargs)
+
+    def filter(self, qs, value):
+        tags = normalize_tags(value)
+        if not tags:
+            return qs
+        return super().filter(qs, tags)
+
+
+class TagCloudView(FacetsView):
+    """
+    Every tag of the user's rows with its usage count, most used first;
+    ?limit= keeps only the top ones. Cached like the facets.
+    """
+    query_budget = {'GET': 3}
+    filter_backends = []
+
+    def get_facets(self, queryset):
+        return tag_counts(queryset, self.tag_limit)
+
+    @property
+    def tag_limit(self):
+        limit = self.request.query_params.get('limit')
+        if limit is None:
+            return None
+        if not limit.isdecimal() or int(limit) < 1:
+            raise serializers.ValidationError({'limit': 'Must be a positive integer.'})
+        return min(int(limit), MAX_TAG_CLOUD_LIMIT)
@@ -0,0 +1,114 @@
+"""Helpers shared by the recipes and stretches test suites."""
+import json
+import logging
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from recipe_project.seeding import seed_library
+from recipes.models import AutocompleteTerm, Recipe, RecipeImage, SyncChange
+from stretches.models import RoutineStretch, Stretch, StretchImage, StretchRoutine
+
+# Tables that grow with the number of users. Scanning one of these
+# sequentially, or sorting a large part of one to return a page, is a
+# regression.
+LARGE_TABLES = {
+    model._meta.db_table for model in (
+        Recipe, RecipeImage, AutocompleteTerm, Stretch, StretchImage, Stretch.body_parts.through,
+        StretchRoutine, RoutineStretch, SyncChange,
+    )
+}
+INDEX_SCANS = {'Index Scan', 'Index Only Scan', 'Bitmap Heap Scan'}
+
+
+def plan_nodes(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class APITestCase(TestCase):
+    """
+    TestCase with an authenticated GET helper and quiet timing logs. Requests
+    over their view's query budget fail.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # One INFO line per request from ServerTimingMiddleware; budget
+        # warnings still show.
+        timing_logger = logging.getLogger('recipe_project.timing')
+        cls.addClassCleanup(timing_logger.setLevel, timing_logger.level)
+        timing_logger.setLevel(logging.WARNING)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def get(self, user, path, **extra):
+        return self.client_for(user).get(path, **extra)
+
+
+class QueryPlanTestCase(APITestCase):
+    """
+    Seeds many users with modest libraries, so each user's rows are a small
+    fraction of every table as in production, and EXPLAINs the queries of
+    the hot endpoints: none may scan a large table sequentially or sort
+    more than `max_sort_rows` rows to return a page.
+    """
+    seed_options = {'users': 20, 'recipes': 250, 'stretches': 100, 'routines': 10}
+    max_sort_rows = 100
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_library(prefix='plans', image_files=False, **cls.seed_options)[0]
+        with connection.cursor() as cursor:
+            for table in sorted(LARGE_TABLES):
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(table)}')
+
+    def plan_problems(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(self.user, path)
+        if response.status_code != 200:
+            return [f'GET {path} returned {response.status_code}']
+
+        plans = []
+        with connection.cursor() as cursor:
+            # The seeded tables are far smaller than production ones, small
+            # enough for a sequential scan to win anyway: only plans that
+            # cannot use an index may scan.
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            try:
+                for query in queries.captured_queries:
+                    sql = query['sql']
+                    if sql.startswith('SELECT'):
+                        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql)
+                        plan = cursor.fetchone()[0]
+                        plans.append((sql, json.loads(plan) if isinstance(plan, str) else plan))
+            finally:
+                cursor.execute('RESET enable_seqscan')
+
+        problems = []
+        for sql, plan in plans:
+            root = plan[0]['Plan']
+            for node in plan_nodes(root):
+                table = node.get('Relation Name')
+                if table in LARGE_TABLES and node['Node Type'] not in INDEX_SCANS:
+                    problems.append(f'{node["Node Type"]} on {table} in {sql[:200]}')
+                if (root['Node Type'] == 'Limit' and node['Node Type'] in ('Sort', 'Incremental Sort')
+                        and node['Plan Rows'] > self.max_sort_rows):
+                    problems.append(
+                        f'{node["Node Type"]} of ~{node["Plan Rows"]} rows on {node["Sort Key"]} in {sql[:200]}'
+                    )
+        return problems
+
+    def assertIndexedPlans(self, checks):
+        """Checks every (label, path) in a subtest."""
+        for label, path in checks:
+            with self.subTest(label):
+                problems = self.plan_problems(path)
+                self.assertFalse(problems, '\n'.join(problems))
@@ -0,0 +1,330 @@
+"""
+Resumable image uploads, for phones on connections that drop: the photo is
+sent in byte ranges and an interrupted upload continues from the last byte
+the server received instead of starting over.
+
+    POST   images/uploads/       {recipe_id | stretch_id, filename, size,
+                                  sha256?, caption?, is_primary?}
+    GET    images/uploads/<id>/  the session; `offset` is the next byte to send
+    PUT    images/uploads/<id>/  Content-Range: bytes <offset>-<end>/<size>
+    POST   images/uploads/<id>/  completes the upload, 201 with the image
+    DELETE images/uploads/<id>/  cancels it
+
+Chunks are streamed to a file in the media storage's scratch directory as
+they arrive, never held in memory, and the bytes of a chunk cut short by a
+dropped connection are kept. A PUT may carry a sha-256 Content-Digest,
+checked while the chunk is written. Completing reads the file once to hash
+it, checks it against `sha256` when the client gave one and with Pillow,
+then moves it into the content-addressed storage without copying it.
+
+Sessions expire UPLOAD_SESSION_TTL seconds after their last chunk;
+`manage.py collect_media` deletes them and their files.
+"""
+import base64
+import fcntl
+import hashlib
+import os
+import re
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+from rest_framework import generics, status
+from rest_framework.response import Response
+from recipes.models import UploadSession
+from recipes.serializers import UploadSessionSerializer
+
+CHUNK_SIZE = 64 * 1024
+# Sessions a user can have in progress; each may hold IMAGE_UPLOAD_MAX_SIZE
+# bytes of disk.
+MAX_OPEN_UPLOADS = 20
+UPLOAD_DIR = 'uploads'
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+CONTENT_DIGEST = re.compile(r'(?:^|,)\s*sha-256=:([A-Za-z0-9+/]+=*):')
+INVALID_IMAGE = (
+    'Upload a valid image. The file you uploaded was either not an image or a corrupted image.'
+)
+
+
+def upload_path(session):
+    return os.path.join(default_storage.scratch_path(UPLOAD_DIR), str(session.pk))
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def delete_upload_file(session):
+    _unlink(upload_path(session))
+
+
+def release_upload_file(session):
+    """Deletes the file of a deleted session on commit, by which time Django has cleared its pk."""
+    path = upload_path(session)
+    transaction.on_commit(lambda: _unlink(path))
+
+
+def expire_upload_sessions(limit=1000):
+    """Deletes up to `limit` expired sessions; their files go with them. Returns the number deleted."""
+    expired = UploadSession.objects.filter(expires_at__lte=timezone.now()).values_list('pk', flat=True)[:limit]
+    return UploadSession.objects.filter(pk__in=list(expired)).delete()[0]
+
+
+@contextmanager
+def locked_upload(session):
+    """
+    The session's file, opened for writing under an exclusive lock, or None
+    while another request holds the lock.
+    """
+    with os.fdopen(os.open(upload_path(session), os.O_RDWR | os.O_CREAT, 0o600), 'r+b') as file:
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield None
+        else:
+            yield file
+
+
+def received_offset(session, file):
+    """
+    The committed offset of a session whose file is locked, or None once it
+    was completed or cancelled. A file shorter than the offset (lost
+    scratch directory) moves it back.
+    """
+    offset = UploadSession.objects.filter(pk=session.pk).values_list('offset', flat=True).first()
+    if offset is None:
+        return None
+    return min(offset, os.fstat(file.fileno()).st_size)
+
+
+def receive_chunk(stream, file, start, length, digest=None):
+    """
+    Writes up to `length` bytes of `stream` to `file` at `start`, updating
+    `digest`, and returns the number of bytes written. Stops early, without
+    raising, when the client goes away.
+    """
+    file.truncate(start)
+    file.seek(start)
+    received = 0
+    try:
+        while received < length:
+            chunk = stream.read(min(CHUNK_SIZE, length - received))
+            if not chunk:
+                break
+            file.write(chunk)
+            if digest is not None:
+                digest.update(chunk)
+            received += len(chunk)
+    except OSError:
+        # UnreadablePostError: the connection dropped mid-chunk.
+        pass
+    file.flush()
+    return received
+
+
+def _parent_name(model):
+    return model._meta.verbose_name.capitalize()
+
+
+class UploadSessionView(generics.GenericAPIView):
+    """
+    Base for the upload endpoints of an image model. Subclasses set
+    `serializer_class` (the image serializer), `parent_model`,
+    `parent_field` (the image's foreign key to it) and `kind`
+    (UploadSession.KIND_CHOICES).
+    """
+    parent_model = None
+    parent_field = None
+    kind = None
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(
+            created_by=self.request.user, kind=self.kind, expires_at__gt=timezone.now()
+        )
+
+    def session_response(self, session, status_code=status.HTTP_200_OK):
+        return Response(UploadSessionSerializer(session).data, status=status_code)
+
+    def locked_response(self, session):
+        return Response(
+            {'error': 'Another request is writing this upload', 'offset': session.offset},
+            status=status.HTTP_409_CONFLICT
+        )
+
+    def gone_response(self, session):
+        delete_upload_file(session)
+        return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+
+
+class UploadSessionCreateView(UploadSessionView):
+    query_budget = {'POST': 4}
+
+    def post(self, request, *args, **kwargs):
+        parent_id = request.data.get(f'{self.parent_field}_id')
+        try:
+            parent_id = int(parent_id)
+        except (TypeError, ValueError):
+            parent_id = None
+        if parent_id is None or not self.parent_model.objects.filter(id=parent_id, created_by=request.user).exists():
+            return Response(
+                {'error': f'{_parent_name(self.parent_model)} not found'}, status=status.HTTP_404_NOT_FOUND
+            )
+        open_uploads = UploadSession.objects.filter(created_by=request.user, expires_at__gt=timezone.now())
+        if open_uploads.count() >= MAX_OPEN_UPLOADS:
+            return Response(
+                {'error': f'At most {MAX_OPEN_UPLOADS} uploads can be in progress'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = UploadSessionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        session = serializer.save(
+            created_by=request.user, kind=self.kind, object_id=parent_id,
+            expires_at=timezone.now() + timedelta(seconds=settings.UPLOAD_SESSION_TTL),
+        )
+        return self.session_response(session, status.HTTP_201_CREATED)
+
+
+class UploadSessionDetailView(UploadSessionView):
+    # Completing runs the image's save signals, which vary; chunks must not.
+    query_budget = {'GET': 1, 'PUT': 3}
+
+    def get(self, request, *args, **kwargs):
+        return self.session_response(self.get_object())
+
+    def delete(self, request, *args, **kwargs):
+        self.get_object().delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def put(self, request, *args, **kwargs):
+        """Appends the request body, the bytes named by Content-Range."""
+        session = self.get_object()
+        match = CONTENT_RANGE.match(request.headers.get('Content-Range', ''))
+        if match is None:
+            return Response(
+                {'error': 'Content-Range must be bytes <start>-<end>/<size>'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        start, end = int(match[1]), int(match[2])
+        if match[3] != '*' and int(match[3]) != session.size:
+            return Response(
+                {'error': f'The upload is {session.size} bytes long'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if start > end or end >= session.size:
+            return Response(
+                {'error': f'The upload is {session.size} bytes long'},
+                status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+            )
+        length = end - start + 1
+        try:
+            content_length = int(request.META['CONTENT_LENGTH'])
+        except (KeyError, ValueError):
+            return Response({'error': 'Content-Length is required'}, status=status.HTTP_411_LENGTH_REQUIRED)
+        if content_length != length:
+            return Response(
+                {'error': 'The body must be the bytes named by Content-Range'}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        expected = None
+        if 'Content-Digest' in request.headers:
+            digest_match = CONTENT_DIGEST.search(request.headers['Content-Digest'])
+            if digest_match is None:
+                return Response(
+                    {'error': 'Content-Digest must include sha-256'}, status=status.HTTP_400_BAD_REQUEST
+                )
+            try:
+                expected = base64.b64decode(digest_match[1])
+            except ValueError:
+                expected = None
+            if expected is None or len(expected) != hashlib.sha256().digest_size:
+                return Response(
+                    {'error': 'Content-Digest is not a sha-256 digest'}, status=status.HTTP_400_BAD_REQUEST
+                )
+
+        with locked_upload(session) as file:
+            if file is None:
+                return self.locked_response(session)
+            offset = received_offset(session, file)
+            if offset is None:
+                return self.gone_response(session)
+            if start != offset:
+                return Response(
+                    {'error': f'The next chunk starts at byte {offset}', 'offset': offset},
+                    status=status.HTTP_409_CONFLICT
+                )
+
+            digest = hashlib.sha256() if expected is not None else None
+            received = receive_chunk(request.stream, file, start, length, digest)
+            corrupt = digest is not None and (received < length or digest.digest() != expected)
+            if corrupt:
+                file.truncate(start)
+                received = 0
+            session.offset = start + received
+            session.expires_at = timezone.now() + timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+            # Cancelling does not wait for the lock.
+            if not UploadSession.objects.filter(pk=session.pk).update(
+                offset=session.offset, expires_at=session.expires_at
+            ):
+                return self.gone_response(session)
+
+        if corrupt:
+            return Response(
+                {'error': 'The chunk does not match its Content-Digest', 'offset': session.offset},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if received < length:
+            return Response(
+                {'error': 'The chunk was cut short', 'offset': session.offset}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return self.session_response(session)
+
+    def post(self, request, *args, **kwargs):
+        """Completes the upload and attaches it as an image."""
+        session = self.get_object()
+        with locked_upload(session) as file:
+            if file is None:
+                return self.locked_response(session)
+            offset = received_offset(session, file)
+            if offset is None:
+                return self.gone_response(session)
+            if offset < session.size:
+                return Response(
+                    {'error': f'Only {offset} of {session.size} bytes were received', 'offset': offset},
+                    status=status.HTTP_409_CONFLICT
+                )
+            if not self.parent_model.objects.filter(id=session.object_id, created_by=request.user).exists():
+                session.delete()
+                return Response(
+                    {'error': f'{_parent_name(self.parent_model)} not found'}, status=status.HTTP_404_NOT_FOUND
+                )
+
+            file.seek(0)
+            digest = hashlib.file_digest(file, 'sha256').hexdigest()
+            if session.sha256 and digest != session.sha256:
+                session.delete()
+                return Response(
+                    {'error': 'The file does not match its sha256, upload it again'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            file.seek(0)
+            try:
+                Image.open(file).verify()
+            except Exception:
+                session.delete()
+                return Response({'image': [INVALID_IMAGE]}, status=status.HTTP_400_BAD_REQUEST)
+
+            name = default_storage.save_file(upload_path(session), session.filename, digest)
+            with transaction.atomic():
+                image = self.get_serializer_class().Meta.model.objects.create(
+                    **{f'{self.parent_field}_id': session.object_id},
+                    image=name, caption=session.caption, is_primary=session.is_primary,
+                )
+                session.delete()
+        return Response(self.get_serializer(image).data, status=status.HTTP_201_CREATED)
@@ -1,7 +1,7 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+from recipe_project.media import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -10,5 +10,7 @@ urlpatterns = [
     path('api/stretches/', include('stretches.urls')),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# In production the web server (or a cloud storage bucket) serves /media/
+# itself; with MEDIA_OFFLOAD Django only picks the file and adds its headers.
+if settings.DEBUG or settings.MEDIA_OFFLOAD:
+    urlpatterns.append(re_path(rf'^{settings.MEDIA_URL.lstrip("/")}(?P<path>.+)$', serve_media, name='media'))
@@ -1,3 +1,6 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict, namedtuple
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.tokens import UntypedToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
@@ -6,10 +9,118 @@ import jwt
 from django.conf import settings
 
 
+# User columns kept in the cache, in model order as Model.from_db expects;
+# anything else is loaded lazily on access.
+CACHED_USER_FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields
+    if field.attname in ('id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')
+)
+
+CacheEntry = namedtuple('CacheEntry', ['signing_input', 'expires_at', 'user_id', 'token', 'user_values'])
+
+
+class VerifiedTokenCache:
+    """
+    Bounded, thread-safe LRU of access tokens whose signature has already
+    been verified, holding the validated token and a slim copy of the user
+    row so that repeat requests skip both the HMAC check and the auth_user
+    SELECT.
+
+    Entries are keyed by the token's signature segment and live for at most
+    `ttl` seconds and never past the token's own `exp`. The cache is
+    per-process: recipes.signals drops a user's entries whenever the User row
+    is saved or deleted (password change, deactivation), and other processes
+    catch up within `ttl`.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._keys_by_user = defaultdict(set)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, raw_token):
+        """
+        Returns (user, validated_token) for a cached token, or None.
+        """
+        signing_input, _, signature = raw_token.rpartition('.')
+        with self._lock:
+            entry = self._entries.get(signature)
+            if entry is None or entry.signing_input != signing_input:
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.time():
+                self._discard(signature)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(signature)
+            self.hits += 1
+
+        # A fresh instance per request, so views may modify and save it.
+        user = User.from_db('default', CACHED_USER_FIELDS, entry.user_values)
+        return user, entry.token
+
+    def set(self, raw_token, validated_token, user):
+        if self.maxsize <= 0:
+            return
+        signing_input, _, signature = raw_token.rpartition('.')
+        expires_at = min(time.time() + self.ttl, validated_token.get('exp', 0))
+        user_values = tuple(getattr(user, field) for field in CACHED_USER_FIELDS)
+        with self._lock:
+            self._discard(signature)
+            self._entries[signature] = CacheEntry(signing_input, expires_at, user.pk, validated_token, user_values)
+            self._keys_by_user[user.pk].add(signature)
+            while len(self._entries) > self.maxsize:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for signature in list(self._keys_by_user.get(user_id, ())):
+                self._discard(signature)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def _discard(self, signature):
+        entry = self._entries.pop(signature, None)
+        if entry is not None:
+            keys = self._keys_by_user.get(entry.user_id)
+            if keys is not None:
+                keys.discard(signature)
+                if not keys:
+                    del self._keys_by_user[entry.user_id]
+
+
+token_cache = VerifiedTokenCache(
+    maxsize=settings.JWT_VERIFIED_TOKEN_CACHE_SIZE,
+    ttl=settings.JWT_VERIFIED_TOKEN_CACHE_TTL,
+)
+
+
 class JWTCookieAuthentication(JWTAuthentication):
     """
     Custom authentication class that reads JWT tokens from HTTP-only cookies
-    instead of the Authorization header.
+    instead of the Authorization header. Verified tokens are remembered in
+    token_cache.
     """
     
     def authenticate(self, request):
@@ -18,11 +129,17 @@ class JWTCookieAuthentication(JWTAuthentication):
         
         if raw_token is None:
             return None
-            
+
+        cached = token_cache.get(raw_token)
+        if cached is not None:
+            return cached
+
         # Validate the token using parent class method
         try:
             validated_token = self.get_validated_token(raw_token)
             user = self.get_user(validated_token)
-            return (user, validated_token)
         except (InvalidToken, TokenError):
-            return None
\ No newline at end of file
+            return None
+
+        token_cache.set(raw_token, validated_token, user)
+        return (user, validated_token)
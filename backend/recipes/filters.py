@@ -0,0 +1,12 @@
+import django_filters
+from recipe_project.tags import TagsFilter
+from .models import Recipe
+
+
+class RecipeFilter(django_filters.FilterSet):
+    tags = TagsFilter()
+    tags_any = TagsFilter(match='any')
+
+    class Meta:
+        model = Recipe
+        fields = ['category', 'is_favorite', 'tags', 'tags_any']
@@ -0,0 +1,166 @@
+import re
+import unicodedata
+from fractions import Fraction
+from functools import lru_cache
+
+
+UNICODE_FRACTIONS = {
+    '¼': '1/4', '½': '1/2', '¾': '3/4', '⅓': '1/3', '⅔': '2/3',
+    '⅛': '1/8', '⅜': '3/8', '⅝': '5/8', '⅞': '7/8',
+}
+
+# Canonical unit -> spellings found in ingredient lines.
+UNIT_ALIASES = {
+    'g': ['g', 'gr', 'gram', 'grams', 'gramme', 'grammes'],
+    'kg': ['kg', 'kgs', 'kilo', 'kilos', 'kilogram', 'kilograms'],
+    'mg': ['mg', 'milligram', 'milligrams'],
+    'oz': ['oz', 'ounce', 'ounces'],
+    'lb': ['lb', 'lbs', 'pound', 'pounds'],
+    'ml': ['ml', 'milliliter', 'milliliters', 'millilitre', 'millilitres'],
+    'cl': ['cl', 'centiliter', 'centiliters', 'centilitre', 'centilitres'],
+    'dl': ['dl', 'deciliter', 'deciliters', 'decilitre', 'decilitres'],
+    'l': ['l', 'liter', 'liters', 'litre', 'litres'],
+    'tsp': ['tsp', 'tsps', 'teaspoon', 'teaspoons'],
+    'tbsp': ['tbsp', 'tbsps', 'tbs', 'tablespoon', 'tablespoons'],
+    'cup': ['cup', 'cups', 'c'],
+    'fl oz': ['fl oz', 'fl. oz', 'fluid ounce', 'fluid ounces'],
+    'pint': ['pint', 'pints', 'pt'],
+    'quart': ['quart', 'quarts', 'qt'],
+    'gallon': ['gallon', 'gallons', 'gal'],
+    'pinch': ['pinch', 'pinches'],
+    'dash': ['dash', 'dashes'],
+    'clove': ['clove', 'cloves'],
+    'slice': ['slice', 'slices'],
+    'can': ['can', 'cans', 'tin', 'tins'],
+    'package': ['package', 'packages', 'pkg', 'packet', 'packets'],
+    'bunch': ['bunch', 'bunches'],
+    'handful': ['handful', 'handfuls'],
+    'piece': ['piece', 'pieces'],
+    'stick': ['stick', 'sticks'],
+}
+
+UNITS = {
+    alias: unit
+    for unit, aliases in UNIT_ALIASES.items()
+    for alias in aliases
+}
+
+# Words that describe preparation or size rather than the ingredient itself.
+STOPWORDS = {
+    'a', 'an', 'and', 'or', 'of', 'to', 'for', 'the', 'with', 'into', 'about', 'plus',
+    'fresh', 'freshly', 'dried', 'large', 'medium', 'small', 'big', 'chopped',
+    'diced', 'minced', 'sliced', 'grated', 'shredded', 'crushed', 'ground',
+    'peeled', 'finely', 'roughly', 'thinly', 'softened', 'melted', 'beaten',
+    'room', 'temperature', 'optional', 'taste', 'needed', 'extra', 'whole',
+    'cold', 'warm', 'hot', 'raw', 'cooked', 'divided', 'packed', 'heaping', 'level',
+}
+
+QUANTITY_RE = re.compile(
+    r'^\s*(?P<quantity>'
+    r'\d+\s+\d+/\d+'            # mixed number: 1 1/2
+    r'|\d+/\d+'                 # fraction: 3/4
+    r'|\d+(?:[.,]\d+)?'         # integer or decimal: 2, 0.5, 0,5
+    r')'
+    r'(?:\s*(?:-|–|to)\s*(?P<upper>\d+(?:[.,]\d+)?|\d+/\d+))?'  # range: 2-3
+)
+
+UNIT_RE = re.compile(
+    r'^\s*(?P<unit>' + '|'.join(
+        re.escape(alias) for alias in sorted(UNITS, key=len, reverse=True)
+    ) + r')\.?(?=\s|$|\))',
+    re.IGNORECASE,
+)
+
+
+def _to_fraction(text):
+    text = text.replace(',', '.')
+    if ' ' in text:
+        whole, fraction = text.split(None, 1)
+        return Fraction(whole) + Fraction(fraction)
+    return Fraction(text)
+
+
+@lru_cache(maxsize=4096)
+def parse_ingredient(line):
+    """
+    Splits an ingredient line such as "1 1/2 cups plain flour, sifted" into
+    (quantity, unit, name). quantity is a Fraction or None, unit is the
+    canonical unit from UNIT_ALIASES or None, and name is the normalized
+    ingredient name ("plain flour").
+
+    Results are memoized: the same lines ("1 tsp salt") recur across
+    recipes, and shopping lists parse thousands of lines per request.
+    """
+    text = line.strip()
+    if not text.isascii():
+        for char, replacement in UNICODE_FRACTIONS.items():
+            text = text.replace(char, f' {replacement}')
+    text = text.strip().lstrip('-*•').strip()
+
+    quantity = None
+    match = QUANTITY_RE.match(text)
+    if match:
+        try:
+            quantity = _to_fraction(match.group('quantity'))
+            if match.group('upper'):
+                # Shop for the top of a "2-3 carrots" range.
+                quantity = max(quantity, _to_fraction(match.group('upper')))
+        except (ValueError, ZeroDivisionError):
+            quantity = None
+        else:
+            text = text[match.end():]
+
+    unit = None
+    match = UNIT_RE.match(text)
+    # A lone "c" or "l" is only a unit when a quantity precedes it.
+    if match and (quantity is not None or len(match.group('unit')) > 1):
+        unit = UNITS[match.group('unit').lower()]
+        text = text[match.end():]
+
+    return quantity, unit, normalize_name(text)
+
+
+def normalize_name(text):
+    """
+    Lower-cases an ingredient name and strips accents, parentheticals,
+    trailing preparation notes ("..., chopped") and a leading "of".
+    """
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = text.lower()
+    text = re.sub(r'\([^)]*\)', ' ', text)
+    text = text.split(',', 1)[0]
+    text = re.sub(r'[^a-z\s-]', ' ', text)
+    text = re.sub(r'^\s*of\s+', '', text)
+    return ' '.join(text.split())
+
+
+def singularize(word):
+    if len(word) <= 3 or word.endswith(('ss', 'us', 'is')):
+        return word
+    if word.endswith('ies'):
+        return word[:-3] + 'y'
+    if word.endswith(('oes', 'ches', 'shes', 'xes')):
+        return word[:-2]
+    if word.endswith('s'):
+        return word[:-1]
+    return word
+
+
+def name_tokens(name):
+    """
+    Index tokens for a normalized ingredient name: singular content words,
+    e.g. "cherry tomatoes" -> ["cherry", "tomato"].
+    """
+    tokens = []
+    for word in re.split(r'[\s-]+', name):
+        if len(word) > 1 and word not in STOPWORDS:
+            token = singularize(word)
+            if token not in tokens:
+                tokens.append(token)
+    return tokens
+
+
+def ingredient_tokens(line):
+    return name_tokens(parse_ingredient(line)[2])
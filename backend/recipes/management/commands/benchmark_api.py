@@ -0,0 +1,128 @@
+import json
+import re
+import subprocess
+import uuid
+from datetime import datetime, timezone
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from recipe_project.loadtest import SCENARIOS, Session, cleanup, run_scenario, uncovered_routes
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test every API route against a running server with concurrent '
+        'clients logged in as the users from seed_perf_data. Reports '
+        'throughput and p50/p95/p99 latency per endpoint and can save them as '
+        'JSON to diff between commits. The server must use this database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the running server')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients, one user each')
+        parser.add_argument('--requests', type=int, default=200, help='Measured requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=2, help='Unmeasured requests per client and endpoint')
+        parser.add_argument('--prefix', default='perf', help='Username prefix used by seed_perf_data')
+        parser.add_argument('--password', default='perf-password')
+        parser.add_argument('--only', help='Regex; run only the endpoints whose label matches')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--compare', help='Print the change against a previous --output file')
+
+    def handle(self, *args, **options):
+        missing = uncovered_routes()
+        if missing:
+            raise CommandError(f'No benchmark scenario for routes: {", ".join(missing)}')
+
+        scenarios = SCENARIOS
+        if options['only']:
+            scenarios = [scenario for scenario in SCENARIOS if re.search(options['only'], scenario.label)]
+            if not scenarios:
+                raise CommandError(f'No endpoint matches {options["only"]!r}')
+
+        users = list(User.objects.filter(username__startswith=f"{options['prefix']}-").order_by('id')[:options['concurrency']])
+        if not users:
+            raise CommandError(f'No {options["prefix"]}-* users; run seed_perf_data first')
+        marker = f'bench-{uuid.uuid4().hex[:8]}'
+
+        sessions = []
+        results = {}
+        try:
+            for index in range(options['concurrency']):
+                session = Session(index, options['url'], users[index % len(users)], marker)
+                sessions.append(session)
+                session.login(options['password'])
+
+            self.stdout.write(f'{"endpoint":<48} {"reqs":>6} {"errs":>5} {"req/s":>8} {"p50":>8} {"p95":>8} {"p99":>8}')
+            for scenario in scenarios:
+                stats = run_scenario(scenario, sessions, options['requests'], options['warmup'])
+                results[scenario.label] = stats
+                line = (
+                    f'{scenario.label:<48} {stats["requests"]:>6} {stats["errors"]:>5} '
+                    f'{stats["throughput_rps"]:>8.1f} {_ms(stats["p50_ms"])} {_ms(stats["p95_ms"])} {_ms(stats["p99_ms"])}'
+                )
+                self.stdout.write(self.style.ERROR(line) if stats['errors'] else line)
+                if stats['errors']:
+                    self.stdout.write(f'    {stats["first_error"]}')
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+        finally:
+            for session in sessions:
+                session.close()
+            deleted, uploads = cleanup(marker)
+            self.stdout.write(f'Cleaned up {deleted} objects and {uploads} uploads')
+
+        report = {
+            'commit': _git('rev-parse', 'HEAD'),
+            'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+            'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'url': options['url'],
+            'concurrency': options['concurrency'],
+            'requests': options['requests'],
+            'warmup': options['warmup'],
+            'endpoints': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, sort_keys=True)
+                output.write('\n')
+            self.stdout.write(f'Results written to {options["output"]}')
+        if options['compare']:
+            self._compare(options['compare'], report)
+
+        failed = [label for label, stats in results.items() if stats['errors']]
+        if failed:
+            raise CommandError(f'{len(failed)} endpoints returned errors: {", ".join(failed)}')
+
+    def _compare(self, path, report):
+        with open(path) as previous_file:
+            previous = json.load(previous_file)
+        self.stdout.write(f'\nAgainst {path} ({(previous.get("commit") or "unknown")[:12]}):')
+        self.stdout.write(f'{"endpoint":<48} {"req/s":>9} {"p50":>9} {"p95":>9} {"p99":>9}')
+        for label, stats in report['endpoints'].items():
+            before = previous.get('endpoints', {}).get(label)
+            if before is None:
+                self.stdout.write(f'{label:<48} {"new":>9}')
+                continue
+            self.stdout.write(f'{label:<48} ' + ' '.join(
+                _change(before.get(key), stats.get(key))
+                for key in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms')
+            ))
+
+
+def _ms(value):
+    return f'{value:>6.1f}ms' if value is not None else f'{"-":>8}'
+
+
+def _change(before, after):
+    if not before or after is None:
+        return f'{"-":>9}'
+    return f'{(after - before) / before:>+9.1%}'
+
+
+def _git(*args):
+    try:
+        return subprocess.run(
+            ['git', *args], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
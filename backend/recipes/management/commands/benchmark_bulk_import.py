@@ -0,0 +1,92 @@
+import time
+import uuid
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory, force_authenticate
+from recipes.views import RecipeBulkView
+from stretches.models import BodyPart
+from stretches.views import StretchBulkView
+from .benchmark_shopping_list import synthetic_recipes
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the bulk recipe/stretch endpoints against the configured '
+        'database. Fails when creates fall below --target items per second.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--stretches', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--target', type=float, default=1000, help='Minimum created items per second')
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        user = User.objects.create_user(f'bulk-benchmark-{uuid.uuid4().hex[:8]}')
+        body_part_ids = list(BodyPart.objects.values_list('id', flat=True)[:3])
+
+        def call(view, method, payload):
+            request = getattr(factory, method)('/', payload, format='json')
+            force_authenticate(request, user=user)
+            started = time.perf_counter()
+            response = view(request)
+            elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                raise CommandError(f'{method.upper()} failed: {response.status_code} {response.data}')
+            return response, elapsed
+
+        recipes = [
+            {
+                'title': f'Benchmark recipe {index}',
+                'description': 'Synthetic recipe',
+                'ingredients': ingredients,
+                'instructions': 'Mix everything.\nCook until done.',
+                'servings': servings,
+                'tags': 'benchmark, synthetic',
+            }
+            for index, ingredients, servings in synthetic_recipes(options['recipes'], 12)
+        ]
+        stretches = [
+            {
+                'title': f'Benchmark stretch {index}',
+                'description': 'Synthetic stretch',
+                'instructions': 'Hold it.',
+                'duration': 30,
+                'body_part_ids': body_part_ids,
+            }
+            for index in range(options['stretches'])
+        ]
+
+        cases = [
+            ('recipes', RecipeBulkView.as_view(), recipes),
+            ('stretches', StretchBulkView.as_view(), stretches),
+        ]
+        slowest = None
+        try:
+            for key, view, items in cases:
+                if not items:
+                    continue
+                timings = {'post': [], 'patch': [], 'delete': []}
+                for _ in range(options['repeat']):
+                    response, elapsed = call(view, 'post', {key: items})
+                    timings['post'].append(elapsed)
+                    ids = [result['id'] for result in response.data['results']]
+
+                    updates = [{'id': pk, 'title': f'Updated {pk}'} for pk in ids]
+                    timings['patch'].append(call(view, 'patch', {key: updates})[1])
+                    timings['delete'].append(call(view, 'delete', {'ids': ids})[1])
+
+                rates = {method: len(items) / min(values) for method, values in timings.items()}
+                self.stdout.write(
+                    f'{len(items)} {key}: ' + ', '.join(
+                        f'{method} {rate:,.0f}/s' for method, rate in rates.items()
+                    )
+                )
+                slowest = rates['post'] if slowest is None else min(slowest, rates['post'])
+        finally:
+            user.delete()
+
+        if slowest is not None and slowest < options['target']:
+            raise CommandError(f'Bulk create ran at {slowest:,.0f} items/s, below the {options["target"]:,.0f}/s target')
+        self.stdout.write(self.style.SUCCESS(f'Bulk create meets the {options["target"]:,.0f} items/s target'))
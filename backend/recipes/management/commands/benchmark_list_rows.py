@@ -0,0 +1,131 @@
+import time
+import uuid
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+from recipe_project.eager import eager_load
+from recipe_project.renderers import ORJSONRenderer
+from recipe_project.seeding import seed_library
+from recipes.models import Recipe
+from recipes.rows import RecipeListRows
+from recipes.serializers import RecipeListSerializer
+from recipes.views import RecipeListCreateView
+from stretches.models import BodyPart, Stretch
+from stretches.rows import StretchListRows
+from stretches.serializers import StretchListSerializer
+from stretches.views import StretchListCreateView
+
+ENDPOINTS = [
+    ('recipes', RecipeListCreateView, Recipe, RecipeListSerializer, RecipeListRows, [
+        '', '?ordering=title', '?ordering=-prep_time', '?ordering=cook_time', '?is_favorite=true',
+        '?search=soup', '?tags=quick',
+    ]),
+    ('stretches', StretchListCreateView, Stretch, StretchListSerializer, StretchListRows, [
+        '', '?ordering=duration', '?ordering=-difficulty_level', '?ordering=title', '?is_favorite=true',
+        '?search=hip',
+    ]),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a library inside a transaction that is rolled back and check '
+        'that the list endpoints render the same bytes from their row fast '
+        'path (recipe_project.rows) as from their serializers, over every '
+        'page of several filters and orderings. Then time both on one '
+        'large page. Fails when any response differs.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Recipes and stretches to seed and time')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per path; the fastest counts')
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        renderer = ORJSONRenderer()
+        with transaction.atomic():
+            user = self.seed(options['rows'])
+
+            def get(view, path, fast):
+                request = factory.get(path, HTTP_HOST=settings.ALLOWED_HOSTS[0])
+                force_authenticate(request, user=user)
+                with override_settings(LIST_ROWS_FAST_PATH=fast):
+                    response = view(request)
+                    response.render()
+                return response
+
+            mismatches = []
+            for label, view_class, model, serializer_class, rows_class, queries in ENDPOINTS:
+                view = view_class.as_view()
+                pages = 0
+                for query in queries:
+                    path = f'/api/{label}/{query}{"&" if query else "?"}page_size=100'
+                    while path:
+                        expected, actual = get(view, path, False), get(view, path, True)
+                        pages += 1
+                        if expected.content != actual.content or expected.status_code != actual.status_code:
+                            mismatches.append(f'GET {path}')
+                            break
+                        path = expected.data['next'] if expected.status_code == 200 else None
+                self.stdout.write(f'{label}: compared {pages} pages')
+
+                queryset = model.objects.filter(created_by=user).order_by('-created_at', '-id')
+                request = factory.get('/')
+                force_authenticate(request, user=user)
+                context = {'request': request}
+
+                def serialized():
+                    items = eager_load(queryset, serializer_class)[:options['rows']]
+                    return serializer_class(items, many=True, context=context).data
+
+                def fast():
+                    rows = rows_class(context)
+                    return rows.render(list(rows.queryset(queryset, [])[:options['rows']]))
+
+                timings = {}
+                for name, build in (('serializer', serialized), ('rows', fast)):
+                    elapsed = []
+                    for _ in range(options['repeat']):
+                        started = time.perf_counter()
+                        data = build()
+                        elapsed.append(time.perf_counter() - started)
+                    timings[name] = (min(elapsed), renderer.render(data))
+                if timings['serializer'][1] != timings['rows'][1]:
+                    mismatches.append(f'{label}: a page of {options["rows"]}')
+                slow, fast_elapsed = timings['serializer'][0], timings['rows'][0]
+                self.stdout.write(
+                    f'{label}: {options["rows"]} rows in {slow * 1000:.1f}ms with the serializer, '
+                    f'{fast_elapsed * 1000:.1f}ms from rows ({slow / fast_elapsed:.1f}x)'
+                )
+            transaction.set_rollback(True)
+
+        if mismatches:
+            raise CommandError('The row fast path renders differently:\n' + '\n'.join(mismatches))
+        self.stdout.write(self.style.SUCCESS('The row fast path matches the serializers'))
+
+    def seed(self, count):
+        user = seed_library(
+            prefix=f'list-rows-{uuid.uuid4().hex[:8]}', users=1, recipes=count, stretches=count,
+            routines=0, image_files=False,
+        )[0]
+        # Cover the empty relations too: no category, no cover image, no
+        # body parts, and stretches with several body parts.
+        recipe_ids = list(Recipe.objects.filter(created_by=user).order_by('id').values_list('id', flat=True))
+        Recipe.objects.filter(id__in=recipe_ids[::7]).update(category=None)
+        Recipe.objects.filter(id__in=recipe_ids[:count // 5]).update(primary_image=None)
+        stretch_ids = list(Stretch.objects.filter(created_by=user).order_by('id').values_list('id', flat=True))
+        Stretch.objects.filter(id__in=stretch_ids[:count // 5]).update(primary_image=None)
+        through = Stretch.body_parts.through
+        body_part_ids = list(BodyPart.objects.values_list('id', flat=True))
+        through.objects.filter(stretch_id__in=stretch_ids[-(count // 10):]).delete()
+        through.objects.bulk_create(
+            [
+                through(stretch_id=stretch_id, bodypart_id=body_part_id)
+                for stretch_id in stretch_ids[count // 5:count // 2]
+                for body_part_id in body_part_ids
+            ],
+            ignore_conflicts=True,
+        )
+        return user
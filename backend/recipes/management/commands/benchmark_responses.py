@@ -0,0 +1,85 @@
+import time
+import uuid
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+from recipe_project.compression import CompressionMiddleware
+from recipe_project.renderers import ORJSONRenderer
+from recipe_project.seeding import seed_library
+from recipes.views import RecipeListCreateView
+
+RENDERERS = [('json', JSONRenderer), ('orjson', ORJSONRenderer)]
+ENCODINGS = ['identity', 'gzip', 'br']
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a library inside a transaction that is rolled back and page '
+        'through its recipe list with each renderer and content coding. '
+        'Reports the bytes sent (headers and body) and the CPU time per '
+        'request, both against DRF\'s JSONRenderer without compression.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=5, help='Walks per case; the fastest counts')
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        results = {}
+        with transaction.atomic():
+            user = seed_library(
+                prefix=f'response-benchmark-{uuid.uuid4().hex[:8]}', users=1, recipes=options['recipes'],
+                stretches=0, routines=0, image_files=False,
+            )[0]
+
+            def call(view, path, encoding):
+                request = factory.get(path, HTTP_HOST=settings.ALLOWED_HOSTS[0], HTTP_ACCEPT_ENCODING=encoding)
+                force_authenticate(request, user=user)
+                started = time.process_time()
+                response = view(request)
+                viewed = time.process_time()
+                response.render()
+                rendered = time.process_time()
+                response = CompressionMiddleware(lambda request: response)(request)
+                compressed = time.process_time()
+                if response.status_code != 200:
+                    raise CommandError(f'GET {path} returned {response.status_code}')
+                headers = sum(len(f'{name}: {value}\r\n') for name, value in response.items())
+                cpu = (compressed - started, rendered - viewed, compressed - rendered)
+                return response, cpu, headers + len(response.content)
+
+            for name, renderer in RENDERERS:
+                view = RecipeListCreateView.as_view(renderer_classes=[renderer])
+                for encoding in ENCODINGS:
+                    walks = []
+                    for _ in range(options['repeat']):
+                        path = f'/api/recipes/?page_size={options["page_size"]}'
+                        requests = sent = 0
+                        cpu = [0.0, 0.0, 0.0]
+                        while path:
+                            response, elapsed, size = call(view, path, encoding)
+                            requests += 1
+                            sent += size
+                            cpu = [total + part for total, part in zip(cpu, elapsed)]
+                            path = response.data['next']
+                        walks.append(([total / requests for total in cpu], sent, requests))
+                    cpu, sent, requests = min(walks)
+                    results[name, encoding] = (requests, sent, cpu)
+            transaction.set_rollback(True)
+
+        _, base_sent, (base_cpu, _, _) = results['json', 'identity']
+        self.stdout.write(
+            f'{options["recipes"]} recipes, {options["page_size"]} per page; CPU per request\n'
+            f'{"renderer":<9} {"encoding":<9} {"requests":>8} {"bytes":>10} {"":>7} '
+            f'{"total":>9} {"":>7} {"render":>9} {"compress":>9}'
+        )
+        for (name, encoding), (requests, sent, (cpu, render, compress)) in results.items():
+            self.stdout.write(
+                f'{name:<9} {encoding:<9} {requests:>8} {sent:>10,} {(sent - base_sent) / base_sent:>+7.0%} '
+                f'{cpu * 1000:>7.1f}ms {(cpu - base_cpu) / base_cpu:>+7.0%} '
+                f'{render * 1000:>7.2f}ms {compress * 1000:>7.2f}ms'
+            )
@@ -0,0 +1,84 @@
+import random
+import time
+import tracemalloc
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from recipes.models import Recipe
+from recipes.shopping import ShoppingList, scale_factor
+
+
+PANTRY = [
+    ('g', 'flour'), ('g', 'sugar'), ('kg', 'potatoes'), ('ml', 'milk'), ('l', 'water'),
+    ('cups', 'rice'), ('tbsp', 'olive oil'), ('tsp', 'salt'), ('cloves', 'garlic'),
+    (None, 'eggs'), (None, 'onions'), ('oz', 'cheddar cheese'), ('lb', 'ground beef'),
+    ('cans', 'chopped tomatoes'), ('tbsp', 'butter'), ('g', 'dark chocolate'),
+]
+
+
+def synthetic_recipes(count, lines, seed=0):
+    rng = random.Random(seed)
+    for recipe_id in range(count):
+        ingredients = []
+        for unit, name in rng.sample(PANTRY, min(lines, len(PANTRY))):
+            quantity = rng.choice(['1', '2', '1/2', '1 1/2', '250', '0.5', '3'])
+            ingredients.append(' '.join(part for part in (quantity, unit, name) if part))
+        ingredients.append('salt and pepper to taste')
+        yield recipe_id, '\n'.join(ingredients), rng.choice([None, 2, 4, 6])
+
+
+class Command(BaseCommand):
+    help = "Benchmark the shopping-list engine on synthetic recipes or a user's library."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=500)
+        parser.add_argument('--lines', type=int, default=12)
+        parser.add_argument('--servings', type=int, default=4)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--user', help="Read recipes from this user's library instead")
+
+    def handle(self, *args, **options):
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']!r} does not exist")
+            recipe_ids = list(
+                Recipe.objects.filter(created_by=user).values_list('id', flat=True)[:options['recipes']]
+            )
+
+            def source():
+                return (
+                    Recipe.objects.filter(id__in=recipe_ids).order_by('id')
+                    .values_list('id', 'ingredients', 'servings').iterator(chunk_size=200)
+                )
+        else:
+            def source():
+                return synthetic_recipes(options['recipes'], options['lines'])
+
+        def run():
+            shopping_list = ShoppingList()
+            recipe_count = 0
+            for _, ingredients, servings in source():
+                shopping_list.add_recipe(ingredients, scale_factor(servings, options['servings']))
+                recipe_count += 1
+            shopping_list.items()
+            return recipe_count, len(shopping_list)
+
+        timings = []
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            recipe_count, item_count = run()
+            timings.append(time.perf_counter() - started)
+
+        # Measured separately: tracemalloc slows the engine down several-fold.
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        timings.sort()
+        self.stdout.write(
+            f"{recipe_count} recipes -> {item_count} items | "
+            f"best {timings[0] * 1000:.1f} ms, median {timings[len(timings) // 2] * 1000:.1f} ms | "
+            f"peak memory {peak / 1024:.0f} KiB"
+        )
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from recipe_project.media import COLLECT_BATCH, collect_media
+from recipe_project.uploads import expire_upload_sessions
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete the media files no recipe or stretch image uses any more. '
+        'Files uploaded in the last --grace seconds are kept, since the image '
+        'that uses one may not be saved yet. Also deletes the resumable '
+        'uploads that expired unfinished. Run it periodically.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=None,
+            help=f'Seconds since the last upload (default MEDIA_BLOB_GRACE, {settings.MEDIA_BLOB_GRACE})',
+        )
+        parser.add_argument('--batch', type=int, default=COLLECT_BATCH, help='Files deleted per transaction')
+
+    def handle(self, *args, **options):
+        if options['batch'] < 1:
+            raise CommandError('--batch must be at least 1')
+        total = 0
+        while True:
+            deleted = collect_media(grace=options['grace'], limit=options['batch'])
+            total += len(deleted)
+            if options['verbosity'] > 1:
+                for name in deleted:
+                    self.stdout.write(f'Deleted {name}')
+            if len(deleted) < options['batch']:
+                break
+        expired = 0
+        while True:
+            deleted = expire_upload_sessions(limit=options['batch'])
+            expired += deleted
+            if deleted < options['batch']:
+                break
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {total} unused media files and {expired} expired uploads'
+        ))
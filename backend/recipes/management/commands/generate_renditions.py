@@ -0,0 +1,38 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.core.management.base import BaseCommand
+from recipe_project.renditions import render_renditions, renditions_stored, store_renditions
+from recipes.models import RecipeImage
+from stretches.models import StretchImage
+
+
+class Command(BaseCommand):
+    help = "Render thumbnail/card/full renditions for existing recipe and stretch images."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Re-render images that already have renditions")
+        parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+
+    def handle(self, *args, **options):
+        for model in (RecipeImage, StretchImage):
+            images = model.objects.exclude(image='').only('id', 'image', 'renditions')
+            if not options['all']:
+                images = [image for image in images.iterator(chunk_size=500) if image.renditions.get('source') != image.image.name]
+            else:
+                images = list(images)
+
+            rendered = failed = 0
+            with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+                futures = {executor.submit(render_renditions, image.image.path): image for image in images}
+                for future in as_completed(futures):
+                    image = futures[future]
+                    try:
+                        renditions = store_renditions(image.image, future.result())
+                    except Exception as exc:
+                        failed += 1
+                        self.stderr.write(f"{model.__name__} {image.pk}: {exc}")
+                        continue
+                    model.objects.filter(pk=image.pk).update(renditions=renditions)
+                    renditions_stored.send(sender=model, pk=image.pk)
+                    rendered += 1
+
+            self.stdout.write(f"{model.__name__}: {rendered} rendered, {failed} failed")
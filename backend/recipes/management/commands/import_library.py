@@ -0,0 +1,36 @@
+from django.contrib.auth.models import User
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recipe_project.library import LibraryImportError, LibraryImporter, open_archive
+
+
+class Command(BaseCommand):
+    help = "Import a library export (.ndjson or .zip from /api/recipes/export/) into a user's library."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--user', required=True, help="Username that receives the imported library")
+        parser.add_argument('--no-renditions', action='store_true', help="Skip rendering imported images")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']!r} does not exist")
+
+        try:
+            lines, open_media = open_archive(options['path'])
+            with transaction.atomic():
+                counts = LibraryImporter(user, open_media).load(lines)
+        except FileNotFoundError:
+            raise CommandError(f"{options['path']} does not exist")
+        except (LibraryImportError, SuspiciousFileOperation, ValueError, KeyError) as exc:
+            raise CommandError(f"Could not import {options['path']}: {exc}")
+
+        for name, count in sorted(counts.items()):
+            self.stdout.write(f"{name}: {count}")
+
+        if not options['no_renditions'] and (counts['recipe_image'] or counts['stretch_image']):
+            call_command('generate_renditions', stdout=self.stdout, stderr=self.stderr)
@@ -0,0 +1,50 @@
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recipe_project.seeding import seed_library
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed synthetic users with recipes (realistic ingredient lists), images, '
+        'stretches and routines for load benchmarks. Users are named '
+        '<prefix>-<n> and share --password.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--recipes', type=int, default=200, help='Recipes per user')
+        parser.add_argument('--images', type=int, default=1, help='Images per recipe and per stretch')
+        parser.add_argument('--stretches', type=int, default=100, help='Stretches per user')
+        parser.add_argument('--routines', type=int, default=10, help='Routines per user')
+        parser.add_argument('--routine-size', type=int, default=8, help='Stretches per routine')
+        parser.add_argument('--prefix', default='perf', help='Username prefix')
+        parser.add_argument('--password', default='perf-password')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data')
+        parser.add_argument('--clear', action='store_true', help='Delete existing <prefix>-* users and their data first')
+
+    def handle(self, *args, **options):
+        existing = User.objects.filter(username__startswith=f"{options['prefix']}-")
+        if options['clear']:
+            deleted = existing.delete()[1].get(User._meta.label, 0)
+            self.stdout.write(f'Deleted {deleted} existing {options["prefix"]} users')
+        elif existing.exists():
+            self.stderr.write(f'{options["prefix"]}-* users already exist; use --clear or another --prefix')
+            return
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            users = seed_library(
+                prefix=options['prefix'], users=options['users'], recipes=options['recipes'],
+                images=options['images'], stretches=options['stretches'], routines=options['routines'],
+                routine_size=options['routine_size'], password=options['password'], seed=options['seed'],
+                progress=lambda done: self.stdout.write(f'{done}/{options["users"]} users'),
+            )
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(users)} users with {len(users) * options['recipes']} recipes, "
+            f"{len(users) * options['stretches']} stretches and {len(users) * options['routines']} routines "
+            f"in {elapsed:.1f}s"
+        ))
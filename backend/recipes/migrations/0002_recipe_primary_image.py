@@ -0,0 +1,31 @@
+# Generated by Django 5.1.2 on 2026-10-17 19:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_primary_image(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeImage = apps.get_model('recipes', 'RecipeImage')
+    Recipe.objects.update(primary_image=Subquery(
+        RecipeImage.objects.filter(recipe=OuterRef('pk'))
+        .order_by('-is_primary', 'created_at', 'id')
+        .values('pk')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='primary_image',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Denormalized cover image, maintained by recipes.signals', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='recipes.recipeimage'),
+        ),
+        migrations.RunPython(backfill_primary_image, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.2 on 2026-10-17 19:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from recipes.ingredients import ingredient_tokens
+
+
+def build_ingredient_index(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    IngredientToken = apps.get_model('recipes', 'IngredientToken')
+    recipes = Recipe.objects.only('id', 'created_by_id', 'ingredients').iterator(chunk_size=500)
+    batch = []
+    for recipe in recipes:
+        line_number = 0
+        for line in recipe.ingredients.split('\n'):
+            tokens = ingredient_tokens(line) if line.strip() else []
+            if not tokens:
+                continue
+            batch.extend(
+                IngredientToken(recipe_id=recipe.pk, created_by_id=recipe.created_by_id, line=line_number, token=token[:50])
+                for token in tokens
+            )
+            line_number += 1
+        Recipe.objects.filter(pk=recipe.pk).update(ingredient_count=line_number)
+        if len(batch) >= 1000:
+            IngredientToken.objects.bulk_create(batch)
+            batch = []
+    IngredientToken.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_recipe_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of indexed ingredient lines'),
+        ),
+        migrations.CreateModel(
+            name='IngredientToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('line', models.PositiveSmallIntegerField()),
+                ('token', models.CharField(max_length=50)),
+                ('created_by', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ingredient_tokens', to='recipes.recipe')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_by', 'token'], name='ingredient_token_lookup')],
+            },
+        ),
+        migrations.RunPython(build_ingredient_index, migrations.RunPython.noop),
+    ]
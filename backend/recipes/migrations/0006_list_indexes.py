@@ -0,0 +1,44 @@
+# Generated by Django 5.1.2 on 2026-10-17 19:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_image_renditions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Create the composite indexes before dropping the single-column ones
+        # they replace.
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['created_by', '-created_at', '-id'], name='recipe_owner_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('is_favorite', True)), fields=['created_by', '-created_at', '-id'], name='recipe_owner_favorite_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['created_by', 'category', '-created_at', '-id'], name='recipe_owner_category_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='recipeimage',
+            index=models.Index(fields=['recipe', '-is_primary', 'created_at', 'id'], name='recipe_image_order'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='created_by',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='recipeimage',
+            name='recipe',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='images', to='recipes.recipe'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-17 20:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_list_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['created_by', 'updated_at'], name='recipe_owner_updated'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import recipe_project.search
+from django.db import migrations, models
+from recipe_project.search import TAGS_TEXT_FUNCTION_SQL
+from recipe_project.tags import MAX_TAG_LENGTH, normalize_tags
+
+
+def split_tags(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    batch = []
+    for recipe in Recipe.objects.exclude(tags='').only('id', 'tags').iterator(chunk_size=1000):
+        recipe.tag_array = [tag[:MAX_TAG_LENGTH] for tag in normalize_tags(recipe.tags)]
+        batch.append(recipe)
+        if len(batch) >= 1000:
+            Recipe.objects.bulk_update(batch, ['tag_array'])
+            batch = []
+    Recipe.objects.bulk_update(batch, ['tag_array'])
+
+
+def join_tags(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    batch = []
+    for recipe in Recipe.objects.exclude(tag_array=[]).only('id', 'tag_array').iterator(chunk_size=1000):
+        recipe.tags = ', '.join(recipe.tag_array)[:200]
+        batch.append(recipe)
+        if len(batch) >= 1000:
+            Recipe.objects.bulk_update(batch, ['tags'])
+            batch = []
+    Recipe.objects.bulk_update(batch, ['tags'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_owner_updated_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(TAGS_TEXT_FUNCTION_SQL, 'DROP FUNCTION IF EXISTS tags_text(varchar[])'),
+        # The generated column reads tags, so it goes first and is rebuilt
+        # over the array at the end.
+        migrations.RemoveIndex(
+            model_name='recipe',
+            name='recipe_search_vector_gin',
+        ),
+        migrations.RemoveField(
+            model_name='recipe',
+            name='search_vector',
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='tag_array',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=50), blank=True, default=list, help_text='Normalized tags', size=None),
+        ),
+        migrations.RunPython(split_tags, join_tags),
+        migrations.RemoveField(
+            model_name='recipe',
+            name='tags',
+        ),
+        migrations.RenameField(
+            model_name='recipe',
+            old_name='tag_array',
+            new_name='tags',
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('title', config='english', weight='A'), '||', django.contrib.postgres.search.SearchVector(recipe_project.search.TagsText('tags'), config='english', weight='B'), django.contrib.postgres.search.SearchConfig('english')), '||', django.contrib.postgres.search.SearchVector('ingredients', config='english', weight='C'), django.contrib.postgres.search.SearchConfig('english')), '||', django.contrib.postgres.search.SearchVector('description', config='english', weight='D'), django.contrib.postgres.search.SearchConfig('english')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_vector_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['tags'], name='recipe_tags_gin'),
+        ),
+    ]
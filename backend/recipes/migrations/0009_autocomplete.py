@@ -0,0 +1,56 @@
+# Generated by Django 5.1.2 on 2026-10-17 20:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from recipe_project.autocomplete import insert_rows, term_rows
+
+
+def build_autocomplete_index(apps, schema_editor):
+    for app_label, model_name, fields in (
+        ('recipes', 'Recipe', ['created_by', 'title', 'tags']),
+        ('stretches', 'Stretch', ['created_by', 'title', 'tags']),
+    ):
+        model = apps.get_model(app_label, model_name)
+        batch = []
+        for obj in model.objects.only('id', *fields).iterator(chunk_size=1000):
+            batch.append(obj)
+            if len(batch) >= 1000:
+                insert_rows(term_rows(batch))
+                batch = []
+        insert_rows(term_rows(batch))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_tag_array'),
+        ('stretches', '0008_tag_array'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AutocompleteTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('recipe', 'Recipe title'), ('stretch', 'Stretch title'), ('tag', 'Tag')], max_length=10)),
+                ('key', models.CharField(db_collation='C', help_text='Normalized label from one of its words on', max_length=100)),
+                ('label', models.CharField(db_collation='C', max_length=200)),
+                ('created_by', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('recipe', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='recipes.recipe')),
+                ('stretch', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='stretches.stretch')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_by', 'kind', 'key', 'label'], include=('recipe', 'stretch'), name='autocomplete_prefix')],
+            },
+        ),
+        # Ingredient suggestions come from IngredientToken; the C collation
+        # lets its (created_by, token) index serve prefix LIKE.
+        migrations.AlterField(
+            model_name='ingredienttoken',
+            name='token',
+            field=models.CharField(db_collation='C', max_length=50),
+        ),
+        migrations.RunPython(build_autocomplete_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.2 on 2026-10-17 20:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from recipe_project.sync import DROP_SYNC_FUNCTION_SQL, SYNC_FUNCTION_SQL, sync_backfill_sql, sync_trigger_sql
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_autocomplete'),
+        ('stretches', '0008_tag_array'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('recipe', 'Recipe'), ('recipe_image', 'Recipe image'), ('stretch', 'Stretch'), ('stretch_image', 'Stretch image'), ('routine', 'Routine'), ('routine_stretch', 'Routine stretch')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('seq', models.BigIntegerField(help_text='Position in the change sequence, set by the sync triggers')),
+                ('deleted', models.BooleanField(default=False)),
+                ('created_by', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_by', 'seq'], include=('kind', 'object_id', 'deleted'), name='sync_change_feed')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='sync_change_object')],
+            },
+        ),
+        migrations.RunSQL(SYNC_FUNCTION_SQL, DROP_SYNC_FUNCTION_SQL),
+        # Existing rows get an entry before the triggers start moving them.
+        migrations.RunSQL(sync_backfill_sql(), migrations.RunSQL.noop),
+        migrations.RunSQL(*sync_trigger_sql()),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.2 on 2026-10-17 21:05
+
+import django.utils.timezone
+from django.db import migrations, models
+from recipe_project.media import (
+    DROP_MEDIA_BLOB_FUNCTION_SQL, MEDIA_BLOB_FUNCTION_SQL, media_blob_backfill_sql, media_blob_trigger_sql,
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_sync_change'),
+        ('stretches', '0009_body_part_ordering'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('refs', models.PositiveIntegerField(default=0, help_text='Image rows using the file, set by the media triggers')),
+                ('touched_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Last time the file was uploaded')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('refs', 0)), fields=['touched_at'], name='media_blob_unused')],
+            },
+        ),
+        migrations.RunSQL(MEDIA_BLOB_FUNCTION_SQL, DROP_MEDIA_BLOB_FUNCTION_SQL),
+        # Existing rows are counted before the triggers start counting.
+        migrations.RunSQL(media_blob_backfill_sql(), migrations.RunSQL.noop),
+        migrations.RunSQL(*media_blob_trigger_sql()),
+    ]
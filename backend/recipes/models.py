@@ -1,11 +1,20 @@
-from django.db import models
+import uuid
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import models
+from django.utils import timezone
+from recipe_project.eager import uses_fields
+from recipe_project.search import SearchVectorManager, TagsText
 
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = "Categories"
@@ -23,34 +32,217 @@ class Recipe(models.Model):
     cook_time = models.PositiveIntegerField(help_text="Cooking time in minutes", null=True, blank=True)
     servings = models.PositiveIntegerField(null=True, blank=True)
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
-    tags = models.CharField(max_length=200, blank=True, help_text="Comma-separated tags")
-    created_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    tags = ArrayField(models.CharField(max_length=50), default=list, blank=True, help_text="Normalized tags")
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_favorite = models.BooleanField(default=False)
+    ingredient_count = models.PositiveIntegerField(
+        default=0, editable=False, help_text="Number of indexed ingredient lines"
+    )
+    primary_image = models.ForeignKey(
+        'RecipeImage', on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='+',
+        help_text="Denormalized cover image, maintained by recipes.signals"
+    )
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('title', weight='A', config=settings.SEARCH_CONFIG)
+            + SearchVector(TagsText('tags'), weight='B', config=settings.SEARCH_CONFIG)
+            + SearchVector('ingredients', weight='C', config=settings.SEARCH_CONFIG)
+            + SearchVector('description', weight='D', config=settings.SEARCH_CONFIG)
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    objects = SearchVectorManager()
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='recipe_search_vector_gin'),
+            GinIndex(OpClass('title', name='gin_trgm_ops'), name='recipe_title_trgm_gin'),
+            # ?tags= / ?tags_any= filters (@>, &&), see recipe_project.tags.
+            GinIndex(fields=['tags'], name='recipe_tags_gin'),
+            # Lists are one user's recipes, newest first (ties broken on id
+            # by the cursor pagination), optionally narrowed by a filter.
+            models.Index(fields=['created_by', '-created_at', '-id'], name='recipe_owner_recent'),
+            models.Index(
+                fields=['created_by', '-created_at', '-id'], condition=models.Q(is_favorite=True),
+                name='recipe_owner_favorite_recent'
+            ),
+            models.Index(fields=['created_by', 'category', '-created_at', '-id'], name='recipe_owner_category_recent'),
+            # Answers the list validators (MAX(updated_at), COUNT(*)) with an
+            # index-only scan; see recipe_project.conditional.
+            models.Index(fields=['created_by', 'updated_at'], name='recipe_owner_updated'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @uses_fields('ingredients')
     def get_ingredients_list(self):
         return [ingredient.strip() for ingredient in self.ingredients.split('\n') if ingredient.strip()]
 
+    @uses_fields('tags')
     def get_tags_list(self):
-        return [tag.strip() for tag in self.tags.split(',') if tag.strip()]
+        return list(self.tags)
 
 
 class RecipeImage(models.Model):
-    recipe = models.ForeignKey(Recipe, related_name='images', on_delete=models.CASCADE)
+    recipe = models.ForeignKey(Recipe, related_name='images', on_delete=models.CASCADE, db_index=False)
     image = models.ImageField(upload_to='recipe_images/')
     caption = models.CharField(max_length=200, blank=True)
     is_primary = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    renditions = models.JSONField(
+        default=dict, blank=True, editable=False,
+        help_text="Resized WebP/JPEG copies, see recipe_project.renditions"
+    )
 
     class Meta:
         ordering = ['-is_primary', 'created_at']
+        indexes = [
+            models.Index(fields=['recipe', '-is_primary', 'created_at', 'id'], name='recipe_image_order'),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe.title} - Image {self.id}"
+
+
+class IngredientToken(models.Model):
+    """
+    Inverted index over Recipe.ingredients: one row per (ingredient line,
+    token), rebuilt by recipes.signals whenever a recipe's ingredients change.
+    """
+    recipe = models.ForeignKey(Recipe, related_name='ingredient_tokens', on_delete=models.CASCADE)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    line = models.PositiveSmallIntegerField()
+    # Byte order, so the lookup index also serves autocomplete's prefix scans.
+    token = models.CharField(max_length=50, db_collation='C')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_by', 'token'], name='ingredient_token_lookup'),
+        ]
+
+    def __str__(self):
+        return f"{self.token} ({self.recipe_id}:{self.line})"
+
+
+class AutocompleteTerm(models.Model):
+    """
+    Typeahead index over a user's recipe and stretch titles and tags: one
+    row per (object, label, word-start key), rebuilt with the object by
+    recipe_project.autocomplete.
+    """
+    KIND_CHOICES = [
+        ('recipe', 'Recipe title'),
+        ('stretch', 'Stretch title'),
+        ('tag', 'Tag'),
+    ]
+
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # Byte order: prefix LIKE uses the plain btree and sorts stay cheap.
+    key = models.CharField(max_length=100, db_collation='C', help_text="Normalized label from one of its words on")
+    label = models.CharField(max_length=200, db_collation='C')
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, null=True, related_name='+')
+    stretch = models.ForeignKey('stretches.Stretch', on_delete=models.CASCADE, null=True, related_name='+')
+
+    class Meta:
+        indexes = [
+            # One range scan per kind for key LIKE 'pre%', in the order the
+            # suggestions are ranked and grouped in.
+            models.Index(
+                fields=['created_by', 'kind', 'key', 'label'], include=['recipe', 'stretch'], name='autocomplete_prefix'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}: {self.label}"
+
+
+class SyncChange(models.Model):
+    """
+    Change log behind the sync feed: one row per synced recipe, stretch,
+    routine, routine item or image, moved to the end of the change sequence
+    by database triggers whenever the object is written and kept as a
+    tombstone once it is deleted. See recipe_project.sync.
+    """
+    KIND_CHOICES = [
+        ('recipe', 'Recipe'),
+        ('recipe_image', 'Recipe image'),
+        ('stretch', 'Stretch'),
+        ('stretch_image', 'Stretch image'),
+        ('routine', 'Routine'),
+        ('routine_stretch', 'Routine stretch'),
+    ]
+
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    seq = models.BigIntegerField(help_text="Position in the change sequence, set by the sync triggers")
+    deleted = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='sync_change_object'),
+        ]
+        indexes = [
+            # The feed is one range scan from the client's cursor; with
+            # nothing new it reads no row at all.
+            models.Index(
+                fields=['created_by', 'seq'], include=['kind', 'object_id', 'deleted'], name='sync_change_feed'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} @ {self.seq}"
+
+
+class MediaBlob(models.Model):
+    """
+    A stored media file and the number of image rows that use it, counted
+    by database triggers; see recipe_project.media.
+    """
+    name = models.CharField(max_length=255, primary_key=True)
+    refs = models.PositiveIntegerField(default=0, help_text="Image rows using the file, set by the media triggers")
+    touched_at = models.DateTimeField(default=timezone.now, help_text="Last time the file was uploaded")
+
+    class Meta:
+        indexes = [
+            # What collect_media() looks for.
+            models.Index(fields=['touched_at'], condition=models.Q(refs=0), name='media_blob_unused'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.refs} refs)"
+
+
+class UploadSession(models.Model):
+    """
+    A resumable image upload. The bytes received so far are kept in a file
+    under MEDIA_ROOT until the upload is completed; see
+    recipe_project.uploads.
+    """
+    KIND_CHOICES = [
+        ('recipe_image', 'Recipe image'),
+        ('stretch_image', 'Stretch image'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_by = models.ForeignKey(User, related_name='upload_sessions', on_delete=models.CASCADE)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField(help_text="The recipe or stretch the image is uploaded to")
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField(help_text="Length of the whole file in bytes")
+    offset = models.PositiveBigIntegerField(default=0, help_text="Bytes received so far")
+    sha256 = models.CharField(max_length=64, blank=True, help_text="Expected digest, checked on completion")
+    caption = models.CharField(max_length=200, blank=True)
+    is_primary = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
 
     def __str__(self):
-        return f"{self.recipe.title} - Image {self.id}"
\ No newline at end of file
+        return f"{self.filename} ({self.offset}/{self.size})"
@@ -0,0 +1,44 @@
+from recipe_project.rows import ListRows, datetime_value, image_columns, user_columns
+from .models import RecipeImage
+
+IMAGE_STORAGE = RecipeImage._meta.get_field('image').storage
+
+
+class RecipeListRows(ListRows):
+    """RecipeListSerializer's output, see recipe_project.rows."""
+    columns = [
+        'id', 'title', 'description', 'prep_time', 'cook_time', 'servings',
+        'category_id', 'category__name', 'category__description', 'category__created_at',
+        *user_columns('created_by'), 'created_at', 'is_favorite', *image_columns('primary_image'), 'tags',
+    ]
+
+    def render(self, rows):
+        categories = {}
+        users = {}
+        results = []
+        for row in rows:
+            category = None
+            if row.category_id is not None:
+                category = self.cached(categories, row.category_id, lambda: {
+                    'id': row.category_id,
+                    'name': row.category__name,
+                    'description': row.category__description,
+                    'created_at': datetime_value(row.category__created_at),
+                })
+            results.append({
+                'id': row.id,
+                'title': row.title,
+                'description': row.description,
+                'prep_time': row.prep_time,
+                'cook_time': row.cook_time,
+                'servings': row.servings,
+                'category': category,
+                'created_by': self.cached(users, row.created_by_id, lambda: self.user(row, 'created_by')),
+                'created_at': datetime_value(row.created_at),
+                'is_favorite': row.is_favorite,
+                'primary_image': (
+                    None if row.primary_image_id is None else self.image(row, 'primary_image', IMAGE_STORAGE)
+                ),
+                'tags_list': list(row.tags),
+            })
+        return results
@@ -1,6 +1,15 @@
+import os
+import re
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.models import User
-from .models import Category, Recipe, RecipeImage
+from recipe_project.eager import uses_fields
+from recipe_project.fieldsets import SparseFieldsetMixin
+from recipe_project.renditions import rendition_urls
+from recipe_project.tags import TagsField
+from .models import Category, Recipe, RecipeImage, UploadSession
+
+MAX_SHOPPING_LIST_RECIPES = 1000
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -16,17 +25,31 @@ class CategorySerializer(serializers.ModelSerializer):
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
+    renditions = serializers.SerializerMethodField()
+
     class Meta:
         model = RecipeImage
-        fields = ['id', 'image', 'caption', 'is_primary', 'created_at']
+        fields = ['id', 'image', 'caption', 'is_primary', 'created_at', 'renditions']
+
+    @uses_fields('image', 'renditions')
+    def get_renditions(self, obj):
+        return rendition_urls(obj.renditions, obj.image.storage, self.context.get('request'))
+
+
+class RecipeImageSyncSerializer(RecipeImageSerializer):
+    """Images in the sync feed, which sends them apart from their recipe."""
 
+    class Meta(RecipeImageSerializer.Meta):
+        fields = ['recipe', *RecipeImageSerializer.Meta.fields]
 
-class RecipeSerializer(serializers.ModelSerializer):
+
+class RecipeSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     created_by = UserSerializer(read_only=True)
     category = CategorySerializer(read_only=True)
     category_id = serializers.IntegerField(write_only=True, required=False, allow_null=True)
     images = RecipeImageSerializer(many=True, read_only=True)
     ingredients_list = serializers.ReadOnlyField(source='get_ingredients_list')
+    tags = TagsField(required=False)
     tags_list = serializers.ReadOnlyField(source='get_tags_list')
 
     class Meta:
@@ -43,7 +66,7 @@ class RecipeSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class RecipeListSerializer(serializers.ModelSerializer):
+class RecipeListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     created_by = UserSerializer(read_only=True)
     category = CategorySerializer(read_only=True)
     primary_image = serializers.SerializerMethodField()
@@ -57,11 +80,56 @@ class RecipeListSerializer(serializers.ModelSerializer):
             'is_favorite', 'primary_image', 'tags_list'
         ]
 
+    @uses_fields('primary_image')
     def get_primary_image(self, obj):
-        primary_image = obj.images.filter(is_primary=True).first()
-        if primary_image:
-            return RecipeImageSerializer(primary_image).data
-        first_image = obj.images.first()
-        if first_image:
-            return RecipeImageSerializer(first_image).data
-        return None
\ No newline at end of file
+        if obj.primary_image_id is None:
+            return None
+        return RecipeImageSerializer(obj.primary_image).data
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """A resumable image upload, see recipe_project.uploads."""
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'filename', 'size', 'offset', 'sha256', 'caption', 'is_primary', 'created_at', 'expires_at']
+        read_only_fields = ['offset', 'expires_at']
+
+    def validate_filename(self, value):
+        value = os.path.basename(value.replace('\\', '/'))
+        if not value:
+            raise serializers.ValidationError('Must be a file name.')
+        return value
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.IMAGE_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f'Must be between 1 and {settings.IMAGE_UPLOAD_MAX_SIZE} bytes.')
+        return value
+
+    def validate_sha256(self, value):
+        value = value.lower()
+        if value and not re.fullmatch(r'[0-9a-f]{64}', value):
+            raise serializers.ValidationError('Must be a hex SHA-256 digest.')
+        return value
+
+
+class WhatCanICookSerializer(serializers.Serializer):
+    """Request body of the what-can-i-cook endpoint."""
+    ingredients = serializers.ListField(child=serializers.CharField(allow_blank=True), default=list)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+    min_coverage = serializers.FloatField(min_value=0, max_value=1, default=0)
+
+
+class ShoppingListSerializer(serializers.Serializer):
+    """Request body of the shopping list endpoint."""
+    recipe_ids = serializers.ListField(
+        child=serializers.IntegerField(), max_length=MAX_SHOPPING_LIST_RECIPES, default=list
+    )
+    servings = serializers.DictField(child=serializers.IntegerField(min_value=1), allow_null=True, default=dict)
+
+    def validate_servings(self, value):
+        # JSON object keys are strings.
+        try:
+            return {int(recipe_id): count for recipe_id, count in (value or {}).items()}
+        except ValueError:
+            raise serializers.ValidationError('Keys must be recipe ids.')
@@ -0,0 +1,135 @@
+from .ingredients import parse_ingredient
+
+
+# Units that convert into a common base unit: (dimension, factor to base).
+# Mass is summed in grams, volume in millilitres.
+CONVERSIONS = {
+    'mg': ('mass', 0.001),
+    'g': ('mass', 1.0),
+    'kg': ('mass', 1000.0),
+    'oz': ('mass', 28.349523125),
+    'lb': ('mass', 453.59237),
+    'ml': ('volume', 1.0),
+    'cl': ('volume', 10.0),
+    'dl': ('volume', 100.0),
+    'l': ('volume', 1000.0),
+    'tsp': ('volume', 4.92892159375),
+    'tbsp': ('volume', 14.78676478125),
+    'fl oz': ('volume', 29.5735295625),
+    'cup': ('volume', 236.5882365),
+    'pint': ('volume', 473.176473),
+    'quart': ('volume', 946.352946),
+    'gallon': ('volume', 3785.411784),
+}
+
+# Display units for mixed-unit totals, largest first.
+METRIC_UNITS = {
+    'mass': [('kg', 1000.0), ('g', 1.0)],
+    'volume': [('l', 1000.0), ('ml', 1.0)],
+}
+
+
+def format_quantity(quantity):
+    if quantity is None:
+        return ''
+    return f'{round(quantity, 2):g}'
+
+
+class ShoppingItem:
+    __slots__ = ('name', 'dimension', 'quantity', 'units', 'line')
+
+    def __init__(self, name, dimension, line):
+        self.name = name
+        self.dimension = dimension
+        self.quantity = None
+        self.units = set()
+        self.line = line
+
+    def add(self, quantity, unit):
+        if unit is not None:
+            self.units.add(unit)
+        if quantity is not None:
+            if unit in CONVERSIONS:
+                quantity = quantity * CONVERSIONS[unit][1]
+            self.quantity = quantity if self.quantity is None else self.quantity + quantity
+
+    def display_unit(self):
+        """
+        Returns (unit, factor) to present the total in: the original unit when
+        every contribution used the same one, otherwise the metric unit.
+        """
+        if self.dimension not in METRIC_UNITS:
+            return self.dimension, 1.0
+        if len(self.units) == 1:
+            unit = next(iter(self.units))
+            return unit, CONVERSIONS[unit][1]
+        for unit, factor in METRIC_UNITS[self.dimension]:
+            if self.quantity is not None and self.quantity >= factor:
+                return unit, factor
+        return METRIC_UNITS[self.dimension][-1]
+
+    def as_dict(self):
+        if self.quantity is None:
+            return {'name': self.name, 'quantity': None, 'unit': None, 'display': self.line}
+
+        unit, factor = self.display_unit()
+        quantity = self.quantity / factor
+        parts = [format_quantity(quantity), unit, self.name]
+        return {
+            'name': self.name,
+            'quantity': round(quantity, 2),
+            'unit': unit,
+            'display': ' '.join(part for part in parts if part),
+        }
+
+
+class ShoppingList:
+    """
+    Aggregates ingredient lines across recipes. Lines are parsed with
+    parse_ingredient, quantities in convertible units are summed per
+    (name, mass/volume), and other quantities per (name, unit).
+
+    Memory is proportional to the number of distinct ingredients, not to
+    the number of recipes added.
+    """
+
+    def __init__(self):
+        self._items = {}
+
+    def add_recipe(self, ingredients, factor=1.0):
+        for line in ingredients.split('\n'):
+            line = line.strip()
+            if line:
+                self.add_line(line, factor)
+
+    def add_line(self, line, factor=1.0):
+        quantity, unit, name = parse_ingredient(line)
+        if not name:
+            name = line.lower()
+        if quantity is not None:
+            quantity = float(quantity) * factor
+
+        if unit in CONVERSIONS:
+            dimension = CONVERSIONS[unit][0]
+        elif quantity is None:
+            dimension = None
+        else:
+            dimension = unit
+
+        key = (name, dimension)
+        item = self._items.get(key)
+        if item is None:
+            item = self._items[key] = ShoppingItem(name, dimension, line)
+        item.add(quantity, unit)
+
+    def __len__(self):
+        return len(self._items)
+
+    def items(self):
+        return [item.as_dict() for item in self._items.values()]
+
+
+def scale_factor(servings, requested_servings):
+    if not servings or not requested_servings:
+        return 1.0
+    return requested_servings / servings
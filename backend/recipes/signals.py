@@ -0,0 +1,134 @@
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from recipe_project.autocomplete import affects_terms, replace_terms, store_terms
+from recipe_project.media import release_image_files
+from recipe_project.renditions import needs_renditions, renditions_stored, schedule_renditions
+from recipe_project.uploads import release_upload_file
+from .authentication import token_cache
+from .ingredients import ingredient_tokens
+from .models import IngredientToken, Recipe, RecipeImage, UploadSession
+
+
+def primary_image_subquery():
+    """
+    The image a recipe card shows: the first image flagged primary,
+    otherwise the oldest image.
+    """
+    return Subquery(
+        RecipeImage.objects.filter(recipe=OuterRef('pk'))
+        .order_by('-is_primary', 'created_at', 'id')
+        .values('pk')[:1]
+    )
+
+
+def refresh_primary_image(recipe_id):
+    # Image changes show up in the recipe's payload, so they also move its
+    # updated_at (the conditional GET validator).
+    Recipe.objects.filter(pk=recipe_id).update(
+        primary_image=primary_image_subquery(), updated_at=timezone.now()
+    )
+
+
+def index_ingredients(recipes):
+    """
+    Tokenizes the ingredients of the given recipes: sets their
+    ingredient_count and returns (recipe, line, token) entries for
+    store_ingredient_tokens. Entries hold the recipe objects, so unsaved
+    recipes can be inserted in between.
+    """
+    entries = []
+    for recipe in recipes:
+        line_number = 0
+        for line in recipe.get_ingredients_list():
+            line_tokens = ingredient_tokens(line)
+            if not line_tokens:
+                continue
+            entries.extend((recipe, line_number, token[:50]) for token in line_tokens)
+            line_number += 1
+        recipe.ingredient_count = line_number
+    return entries
+
+
+def store_ingredient_tokens(entries):
+    """
+    Inserts IngredientToken rows with a single INSERT ... SELECT unnest()
+    statement; building a model instance per token dominated bulk imports.
+    """
+    if not entries:
+        return
+    opts = IngredientToken._meta
+    columns = ', '.join(
+        connection.ops.quote_name(opts.get_field(name).column)
+        for name in ('recipe', 'created_by', 'line', 'token')
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {connection.ops.quote_name(opts.db_table)} ({columns}) '
+            'SELECT * FROM unnest(%s::bigint[], %s::bigint[], %s::smallint[], %s::varchar[])',
+            [
+                [recipe.pk for recipe, _, _ in entries],
+                [recipe.created_by_id for recipe, _, _ in entries],
+                [line for _, line, _ in entries],
+                [token for _, _, token in entries],
+            ]
+        )
+
+
+def rebuild_ingredient_index(recipes):
+    """
+    Re-tokenizes the ingredients of the given recipes, replacing their
+    IngredientToken rows and ingredient_count in a handful of statements.
+    """
+    recipes = list(recipes)
+    if not recipes:
+        return
+
+    entries = index_ingredients(recipes)
+    with transaction.atomic():
+        IngredientToken.objects.filter(recipe__in=[recipe.pk for recipe in recipes]).delete()
+        store_ingredient_tokens(entries)
+        Recipe.objects.bulk_update(recipes, ['ingredient_count'], batch_size=1000)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created=False, update_fields=None, **kwargs):
+    if update_fields is None or 'ingredients' in update_fields:
+        rebuild_ingredient_index([instance])
+    if created:
+        store_terms([instance])
+    elif affects_terms(update_fields):
+        replace_terms([instance])
+
+
+@receiver(post_save, sender=RecipeImage)
+def recipe_image_saved(sender, instance, **kwargs):
+    refresh_primary_image(instance.recipe_id)
+    if needs_renditions(instance):
+        schedule_renditions(instance)
+
+
+@receiver(post_delete, sender=RecipeImage)
+def recipe_image_deleted(sender, instance, **kwargs):
+    refresh_primary_image(instance.recipe_id)
+    release_image_files(instance)
+
+
+@receiver(post_delete, sender=UploadSession)
+def upload_session_deleted(sender, instance, **kwargs):
+    release_upload_file(instance)
+
+
+@receiver(renditions_stored, sender=RecipeImage)
+def recipe_renditions_stored(sender, pk, **kwargs):
+    Recipe.objects.filter(images=pk).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    # Covers password changes and deactivation; cheap enough to do on any save.
+    token_cache.invalidate_user(instance.pk)
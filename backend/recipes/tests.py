@@ -0,0 +1,507 @@
+import base64
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.test import override_settings
+from PIL import Image
+
+from recipe_project.library import FORMAT, VERSION, LibraryImporter
+from recipe_project.media import ContentAddressedStorage, collect_media
+from recipe_project.middleware import QueryBudgetExceeded
+from recipe_project.seeding import seed_library
+from recipe_project.testing import APITestCase, QueryPlanTestCase
+from recipe_project.uploads import expire_upload_sessions, upload_path
+from .models import Category, MediaBlob, Recipe, RecipeImage, UploadSession
+from .views import RecipeListCreateView
+
+# Queries per request, whatever the number of rows: the conditional GET
+# validators, the page (primary images and categories joined), and for the
+# detail the recipe's images.
+RECIPE_LIST_QUERIES = 2
+RECIPE_DETAIL_QUERIES = 3
+
+
+class RecipeQueryCountTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.one = seed_library(
+            prefix='one', users=1, recipes=1, images=1, stretches=0, routines=0, image_files=False,
+        )[0]
+        cls.many = seed_library(
+            prefix='many', users=1, recipes=30, images=3, stretches=0, routines=0, image_files=False,
+        )[0]
+
+    def test_list_queries_do_not_grow_with_rows(self):
+        for user, rows in ((self.one, 1), (self.many, 30)):
+            with self.subTest(rows=rows), self.assertNumQueries(RECIPE_LIST_QUERIES):
+                response = self.get(user, '/api/recipes/?page_size=100')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results']), rows)
+            self.assertTrue(all(item['primary_image'] for item in response.data['results']))
+
+    def test_list_queries_do_not_grow_through_the_serializer(self):
+        # ?fields= bypasses the row fast path.
+        for user in (self.one, self.many):
+            with self.assertNumQueries(RECIPE_LIST_QUERIES):
+                response = self.get(user, '/api/recipes/?page_size=100&fields=id,title,primary_image,category')
+            self.assertEqual(response.status_code, 200)
+
+    def test_detail_queries_do_not_grow_with_images(self):
+        recipe = Recipe.objects.filter(created_by=self.many).first()
+        RecipeImage.objects.bulk_create([
+            RecipeImage(recipe=recipe, image='recipe_images/seeded.jpg') for _ in range(10)
+        ])
+        for user, images in ((self.one, 1), (self.many, 13)):
+            recipe = Recipe.objects.filter(created_by=user).first()
+            with self.subTest(images=images), self.assertNumQueries(RECIPE_DETAIL_QUERIES):
+                response = self.get(user, f'/api/recipes/{recipe.pk}/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['images']), images)
+
+
+class RecipeListRowsTests(APITestCase):
+    """The row fast path renders exactly what RecipeListSerializer does."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_library(
+            prefix='rows', users=1, recipes=30, images=2, stretches=0, routines=0, image_files=False,
+        )[0]
+        cls.user.first_name, cls.user.last_name = 'Ana', 'Ruiz'
+        cls.user.save()
+        Recipe.objects.create(
+            title='Plain toast', ingredients='1 slice of bread', instructions='Toast.', created_by=cls.user,
+        )
+        recipe = Recipe.objects.create(
+            title='Gazpacho', ingredients='4 tomatoes', instructions='Blend.', tags=['summer', 'cold'],
+            category=Category.objects.create(name='Rows soups', description='Hot and cold.'), created_by=cls.user,
+        )
+        renditions = {
+            name: {'width': width, 'height': width, 'webp': f'blobs/{name}.webp', 'jpeg': f'blobs/{name}.jpg'}
+            for name, width in (('card', 640), ('thumbnail', 200))
+        }
+        RecipeImage.objects.create(recipe=recipe, image='recipe_images/gazpacho.jpg', caption='Served', renditions=renditions)
+
+    def pages(self, path, fast):
+        contents = []
+        with override_settings(LIST_ROWS_FAST_PATH=fast):
+            while path:
+                response = self.get(self.user, path)
+                self.assertEqual(response.status_code, 200)
+                contents.append(response.content)
+                path = response.data['next']
+        return contents
+
+    def test_fast_path_matches_serializer(self):
+        for query in ('', '?ordering=title', '?ordering=-prep_time', '?is_favorite=true', '?search=gazpacho',
+                      '?tags=summer'):
+            path = f'/api/recipes/{query}{"&" if query else "?"}page_size=10'
+            with self.subTest(path=path):
+                self.assertEqual(self.pages(path, True), self.pages(path, False))
+
+    def test_covers_nested_objects(self):
+        items = self.get(self.user, '/api/recipes/?page_size=100').data['results']
+        self.assertTrue(any(item['category'] is None for item in items))
+        gazpacho = next(item for item in items if item['title'] == 'Gazpacho')
+        self.assertEqual(gazpacho['category']['name'], 'Rows soups')
+        self.assertEqual(gazpacho['tags_list'], ['summer', 'cold'])
+        self.assertEqual(gazpacho['created_by']['first_name'], 'Ana')
+        self.assertEqual(gazpacho['primary_image']['renditions']['card']['webp'], '/media/blobs/card.webp')
+
+
+class RecipeValidatorTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_library(prefix='etag', users=1, recipes=0, stretches=0, routines=0, image_files=False)[0]
+        cls.category = Category.objects.create(name='Etag soups')
+        cls.recipe = Recipe.objects.create(
+            title='Tomato soup', ingredients='2 tomatoes', instructions='Simmer.', category=cls.category,
+            created_by=cls.user,
+        )
+
+    def etags(self):
+        return [self.get(self.user, path)['ETag'] for path in ('/api/recipes/', f'/api/recipes/{self.recipe.pk}/')]
+
+    def test_unchanged_resources_are_not_modified(self):
+        for path, etag in zip(('/api/recipes/', f'/api/recipes/{self.recipe.pk}/'), self.etags()):
+            with self.subTest(path=path):
+                self.assertEqual(self.get(self.user, path, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_nested_category_changes_the_etag(self):
+        before = self.etags()
+        self.category.name = 'Etag stews'
+        self.category.save()
+        renamed = self.etags()
+        self.assertTrue(all(a != b for a, b in zip(before, renamed)))
+        Category.objects.create(name='Etag salads')
+        self.assertTrue(all(a != b for a, b in zip(renamed, self.etags())))
+
+    def test_facets_follow_category_renames(self):
+        self.assertEqual(self.get(self.user, '/api/recipes/facets/').data['category'][0]['name'], 'Etag soups')
+        self.category.name = 'Etag stews'
+        self.category.save()
+        self.assertEqual(self.get(self.user, '/api/recipes/facets/').data['category'][0]['name'], 'Etag stews')
+
+    def test_user_changes_the_etag(self):
+        before = self.etags()
+        self.user.first_name = 'Ana'
+        self.user.save()
+        self.assertTrue(all(a != b for a, b in zip(before, self.etags())))
+
+
+class RecipeQueryPlanTests(QueryPlanTestCase):
+    seed_options = {'users': 20, 'recipes': 250, 'stretches': 0, 'routines': 0}
+
+    def test_hot_endpoints_use_indexes(self):
+        recipe = Recipe.objects.filter(created_by=self.user, category__isnull=False).first()
+        self.assertIndexedPlans([
+            ('recipe list', '/api/recipes/'),
+            ('favorite recipes', '/api/recipes/?is_favorite=true'),
+            ('recipes by category', f'/api/recipes/?category={recipe.category_id}'),
+            ('recipe detail', f'/api/recipes/{recipe.pk}/'),
+            ('recipes by tags', '/api/recipes/?tags=quick,family'),
+            ('recipes by any tag', '/api/recipes/?tags_any=spicy,summer'),
+            ('recipe facets', '/api/recipes/facets/'),
+            ('recipe tag cloud', '/api/recipes/tags/'),
+            ('autocomplete', '/api/recipes/autocomplete/?q=st'),
+            ('sync', '/api/recipes/sync/?limit=100'),
+        ])
+
+
+class MediaCollectionTests(APITestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media_root = override_settings(MEDIA_ROOT=directory.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.user = seed_library(prefix='media', users=1, recipes=1, images=0, stretches=0, routines=0)[0]
+        self.name = default_storage.save('photo.jpg', io.BytesIO(b'photo'))
+
+    def test_unused_files_are_kept_for_the_grace_period(self):
+        # An upload writes its file before inserting the image that uses it.
+        self.assertEqual(MediaBlob.objects.get(name=self.name).refs, 0)
+        self.assertEqual(collect_media([self.name]), [])
+        self.assertTrue(default_storage.exists(self.name))
+        self.assertEqual(collect_media([self.name], grace=0), [self.name])
+        self.assertFalse(default_storage.exists(self.name))
+
+    def test_used_files_are_kept(self):
+        image = RecipeImage.objects.create(recipe=Recipe.objects.get(created_by=self.user), image=self.name)
+        self.assertEqual(MediaBlob.objects.get(name=self.name).refs, 1)
+        self.assertEqual(collect_media([self.name], grace=0), [])
+        image.delete()
+        self.assertEqual(MediaBlob.objects.get(name=self.name).refs, 0)
+        self.assertEqual(collect_media([self.name], grace=0), [self.name])
+
+
+class ResumableUploadTests(APITestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media_root = override_settings(MEDIA_ROOT=directory.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.user = seed_library(prefix='upload', users=1, recipes=1, images=0, stretches=0, routines=0)[0]
+        self.recipe = Recipe.objects.get(created_by=self.user)
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 48), 'teal').save(buffer, 'JPEG')
+        self.photo = buffer.getvalue()
+        self.client = self.client_for(self.user)
+
+    def start(self, content=None, **data):
+        content = self.photo if content is None else content
+        response = self.client.post('/api/recipes/images/uploads/', {
+            'recipe_id': self.recipe.pk, 'filename': 'photo.jpg', 'size': len(content),
+            'sha256': hashlib.sha256(content).hexdigest(), 'caption': 'Soup', **data,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return f'/api/recipes/images/uploads/{response.data["id"]}/'
+
+    def put(self, path, chunk, start, digest=None, size=None):
+        headers = {'HTTP_CONTENT_RANGE': f'bytes {start}-{start + len(chunk) - 1}/{size or len(self.photo)}'}
+        if digest is not None:
+            headers['HTTP_CONTENT_DIGEST'] = f'sha-256=:{base64.b64encode(digest).decode()}:'
+        return self.client.put(path, chunk, content_type='application/octet-stream', **headers)
+
+    def test_upload_in_chunks(self):
+        path = self.start()
+        half = len(self.photo) // 2
+        self.assertEqual(self.put(path, self.photo[:half], 0).data['offset'], half)
+        self.assertEqual(self.client.get(path).data['offset'], half)
+        rest = self.photo[half:]
+        response = self.put(path, rest, half, hashlib.sha256(rest).digest())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['offset'], len(self.photo))
+
+        response = self.client.post(path)
+        self.assertEqual(response.status_code, 201)
+        image = RecipeImage.objects.get(pk=response.data['id'])
+        self.assertEqual((image.recipe, image.caption), (self.recipe, 'Soup'))
+        self.assertTrue(image.image.name.startswith('blobs/'))
+        self.assertEqual(default_storage.open(image.image.name).read(), self.photo)
+        self.assertEqual(self.client.get(path).status_code, 404)
+
+    def test_chunk_must_start_at_the_offset(self):
+        path = self.start()
+        self.put(path, self.photo[:10], 0)
+        response = self.put(path, self.photo[20:30], 20)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['offset'], 10)
+
+    def test_chunk_must_match_its_digest(self):
+        path = self.start()
+        response = self.put(path, self.photo[:10], 0, hashlib.sha256(b'other').digest())
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['offset'], 0)
+        self.assertEqual(self.client.get(path).data['offset'], 0)
+
+    def test_completing_checks_the_file(self):
+        not_an_image = b'not an image'
+        for path, content in (
+            (self.start(sha256=hashlib.sha256(b'other').hexdigest()), self.photo),
+            (self.start(not_an_image), not_an_image),
+        ):
+            with self.subTest(content=content[:12]):
+                self.assertEqual(self.put(path, content, 0, size=len(content)).status_code, 200)
+                self.assertEqual(self.client.post(path).status_code, 400)
+                self.assertEqual(self.client.get(path).status_code, 404)
+        self.assertFalse(RecipeImage.objects.exists())
+
+    def test_expired_uploads_are_deleted_with_their_files(self):
+        path = self.start()
+        self.put(path, self.photo[:10], 0)
+        session = UploadSession.objects.get()
+        self.assertTrue(os.path.exists(upload_path(session)))
+        self.assertEqual(expire_upload_sessions(), 0)
+        UploadSession.objects.update(expires_at=session.created_at)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(expire_upload_sessions(), 1)
+        self.assertFalse(os.path.exists(upload_path(session)))
+
+
+class ServerTimingTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_library(prefix='timing', users=1, recipes=3, stretches=0, routines=0, image_files=False)[0]
+        cls.category = Recipe.objects.filter(created_by=cls.user, category__isnull=False).first().category
+
+    @override_settings(QUERY_BUDGET_STRICT=False)
+    def test_header_is_well_formed(self):
+        response = self.get(self.user, '/api/recipes/')
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;dur=\d+\.\d;desc="\d+ queries", view;dur=\d+\.\d, render;dur=\d+\.\d, '
+            r'compress;dur=\d+\.\d, total;dur=\d+\.\d$',
+        )
+        queries = int(re.search(r'desc="(\d+) queries"', response['Server-Timing']).group(1))
+        self.assertEqual(queries, RECIPE_LIST_QUERIES)
+
+    @override_settings(QUERY_BUDGET_STRICT=False)
+    def test_over_budget_logs_a_warning(self):
+        with mock.patch.object(RecipeListCreateView, 'query_budget', {'GET': 1}), \
+                self.assertLogs('recipe_project.timing', 'WARNING') as logs:
+            response = self.get(self.user, '/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('over the budget of 1 for recipe-list-create', logs.output[0])
+
+    def test_over_budget_fails_when_strict(self):
+        with mock.patch.object(RecipeListCreateView, 'query_budget', {'GET': 1}):
+            with self.assertRaisesMessage(QueryBudgetExceeded, 'over the budget of 1'):
+                self.get(self.user, '/api/recipes/')
+
+    def test_filters_are_validated_once(self):
+        # Looking up ?category= for the validators and again for the page
+        # would go over the list's budget.
+        response = self.get(self.user, f'/api/recipes/?category={self.category.pk}')
+        self.assertEqual(response.status_code, 200)
+
+
+class WhatCanICookTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_library(prefix='cook', users=1, recipes=0, stretches=0, routines=0, image_files=False)[0]
+        cls.recipe = Recipe.objects.create(
+            title='Tomato soup', ingredients='2 tomatoes\n1 onion', instructions='Simmer.', created_by=cls.user,
+        )
+
+    def post(self, data):
+        return self.client_for(self.user).post('/api/recipes/what-can-i-cook/', data, format='json')
+
+    def test_ranks_recipes_by_coverage(self):
+        response = self.post({'ingredients': ['tomato'], 'limit': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['recipe']['id'] for item in response.data['results']], [self.recipe.pk])
+        self.assertEqual(response.data['results'][0]['coverage'], 0.5)
+
+    def test_rejects_invalid_parameters(self):
+        for data in (
+            {'ingredients': 'tomato'},
+            {'ingredients': [{'name': 'tomato'}]},
+            {'ingredients': ['tomato'], 'limit': 'many'},
+            {'ingredients': ['tomato'], 'limit': -1},
+            {'ingredients': ['tomato'], 'limit': 0},
+            {'ingredients': ['tomato'], 'limit': 101},
+            {'ingredients': ['tomato'], 'min_coverage': 'half'},
+        ):
+            with self.subTest(data=data):
+                self.assertEqual(self.post(data).status_code, 400)
+
+
+class ShoppingListTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_library(prefix='shop', users=1, recipes=0, stretches=0, routines=0, image_files=False)[0]
+        cls.recipe = Recipe.objects.create(
+            title='Pancakes', ingredients='2 eggs\n200 ml milk', instructions='Fry.', servings=2, created_by=cls.user,
+        )
+
+    def post(self, data):
+        return self.client_for(self.user).post('/api/recipes/shopping-list/', data, format='json')
+
+    def test_scales_to_the_requested_servings(self):
+        response = self.post({'recipe_ids': [self.recipe.pk], 'servings': {str(self.recipe.pk): 4}})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['recipe_count'], 1)
+        self.assertIn('4 eggs', response.data['shopping_list'])
+
+    def test_rejects_invalid_parameters(self):
+        for data in (
+            {'recipe_ids': self.recipe.pk},
+            {'recipe_ids': ['abc']},
+            {'recipe_ids': [{'a': 1}]},
+            {'recipe_ids': list(range(1001))},
+            {'recipe_ids': [self.recipe.pk], 'servings': [4]},
+            {'recipe_ids': [self.recipe.pk], 'servings': {str(self.recipe.pk): 'four'}},
+            {'recipe_ids': [self.recipe.pk], 'servings': {str(self.recipe.pk): 0}},
+            {'recipe_ids': [self.recipe.pk], 'servings': {'pancakes': 4}},
+        ):
+            with self.subTest(data=data):
+                self.assertEqual(self.post(data).status_code, 400)
+
+
+class RecipeBulkDeleteTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_library(prefix='bulk', users=1, recipes=3, stretches=0, routines=0, image_files=False)[0]
+        cls.ids = list(Recipe.objects.filter(created_by=cls.user).values_list('pk', flat=True))
+
+    def delete(self, data):
+        return self.client_for(self.user).delete('/api/recipes/bulk/', data, format='json')
+
+    @override_settings(BULK_MAX_ITEMS=3)
+    def test_rejects_invalid_ids(self):
+        for data in (
+            {},
+            {'ids': []},
+            {'ids': self.ids[0]},
+            {'ids': [{'id': self.ids[0]}]},
+            {'ids': [[self.ids[0]]]},
+            {'ids': ['first']},
+            {'ids': self.ids + [self.ids[0]]},
+        ):
+            with self.subTest(data=data):
+                self.assertEqual(self.delete(data).status_code, 400)
+        self.assertEqual(Recipe.objects.filter(pk__in=self.ids).count(), 3)
+
+    def test_deletes_all_or_nothing(self):
+        response = self.delete({'ids': [self.ids[0], 0]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result['status'] for result in response.data['results']], [424, 404])
+        response = self.delete({'ids': self.ids[:2]})
+        self.assertEqual(response.status_code, 200)
+        remaining = Recipe.objects.filter(created_by=self.user).values_list('pk', flat=True)
+        self.assertQuerySetEqual(remaining, self.ids[2:], ordered=False)
+
+
+class LibraryImportTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_library(prefix='import', users=1, recipes=0, stretches=0, routines=0, image_files=False)[0]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.storage = ContentAddressedStorage(location=directory.name)
+        self.stored = self.storage.save('photo.jpg', io.BytesIO(b'stored'))
+
+    def load(self, files):
+        exported = {'created_at': '2024-01-01T00:00:00+00:00', 'updated_at': '2024-01-01T00:00:00+00:00'}
+        records = [
+            {'type': 'header', 'format': FORMAT, 'version': VERSION},
+            {'type': 'recipe', 'data': {
+                'id': 1, 'title': 'Imported', 'description': '', 'ingredients': '1 egg', 'instructions': 'Fry.',
+                **exported,
+            }},
+            {'type': 'recipe_image', 'data': {
+                'id': 1, 'recipe_id': 1, 'image': 'in-archive.jpg', 'created_at': exported['created_at'],
+            }},
+            {'type': 'recipe_image', 'data': {
+                'id': 2, 'recipe_id': 1, 'image': self.stored, 'created_at': exported['created_at'],
+            }},
+        ]
+        importer = LibraryImporter(
+            self.user, lambda name: io.BytesIO(files[name]) if name in files else None, self.storage,
+        )
+        return importer.load(json.dumps(record) + '\n' for record in records)
+
+    def test_imports_only_media_in_the_archive(self):
+        counts = self.load({'in-archive.jpg': b'imported'})
+        self.assertEqual(counts['recipe_image'], 1)
+        image = RecipeImage.objects.get(recipe__created_by=self.user)
+        self.assertNotEqual(image.image.name, self.stored)
+        with self.storage.open(image.image.name) as handle:
+            self.assertEqual(handle.read(), b'imported')
+
+    def test_existing_storage_names_are_not_attached(self):
+        counts = self.load({})
+        self.assertEqual(counts['recipe_image'], 0)
+        self.assertFalse(RecipeImage.objects.filter(recipe__created_by=self.user).exists())
+
+
+class SyncTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_library(prefix='sync', users=1, recipes=2, stretches=0, routines=0, image_files=False)[0]
+
+    def test_follows_the_cursor(self):
+        response = self.get(self.user, '/api/recipes/sync/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['changes']['recipes']), 2)
+        response = self.get(self.user, f'/api/recipes/sync/?since={response.data["cursor"]}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['changes']['recipes'], [])
+
+    def test_rejects_invalid_cursors(self):
+        for since in ('abc', '-1', '1.5', '%C2%B2'):
+            with self.subTest(since=since):
+                self.assertEqual(self.get(self.user, f'/api/recipes/sync/?since={since}').status_code, 400)
+
+
+class TagCloudTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_library(prefix='cloud', users=1, recipes=0, stretches=0, routines=0, image_files=False)[0]
+        for tags in (['quick', 'soup'], ['quick']):
+            Recipe.objects.create(
+                title='Soup', ingredients='1 leek', instructions='Boil.', tags=tags, created_by=cls.user,
+            )
+
+    def test_limit_keeps_the_most_used(self):
+        response = self.get(self.user, '/api/recipes/tags/?limit=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [{'name': 'quick', 'count': 2}])
+        response = self.get(self.user, f'/api/recipes/tags/?limit={"9" * 30}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 2)
+
+    def test_rejects_invalid_limits(self):
+        for limit in ('0', '-1', 'ten', '%C2%B2'):
+            with self.subTest(limit=limit):
+                self.assertEqual(self.get(self.user, f'/api/recipes/tags/?limit={limit}').status_code, 400)
@@ -5,8 +5,17 @@ urlpatterns = [
     path('categories/', views.CategoryListCreateView.as_view(), name='category-list-create'),
     path('categories/<int:pk>/', views.CategoryDetailView.as_view(), name='category-detail'),
     path('', views.RecipeListCreateView.as_view(), name='recipe-list-create'),
+    path('bulk/', views.RecipeBulkView.as_view(), name='recipe-bulk'),
+    path('facets/', views.RecipeFacetsView.as_view(), name='recipe-facets'),
+    path('tags/', views.RecipeTagCloudView.as_view(), name='recipe-tags'),
     path('<int:pk>/', views.RecipeDetailView.as_view(), name='recipe-detail'),
     path('images/', views.RecipeImageUploadView.as_view(), name='recipe-image-upload'),
     path('images/<int:pk>/', views.RecipeImageDetailView.as_view(), name='recipe-image-detail'),
+    path('images/uploads/', views.RecipeImageUploadSessionView.as_view(), name='recipe-image-upload-session'),
+    path('images/uploads/<uuid:pk>/', views.RecipeImageUploadSessionDetailView.as_view(), name='recipe-image-upload-session-detail'),
     path('shopping-list/', views.generate_shopping_list, name='generate-shopping-list'),
+    path('export/', views.export_library, name='export-library'),
+    path('autocomplete/', views.autocomplete, name='autocomplete'),
+    path('sync/', views.sync, name='sync'),
+    path('what-can-i-cook/', views.what_can_i_cook, name='what-can-i-cook'),
 ]
\ No newline at end of file
@@ -1,36 +1,67 @@
-from rest_framework import generics, status, filters
+from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
-from .models import Category, Recipe, RecipeImage
-from .serializers import CategorySerializer, RecipeSerializer, RecipeListSerializer, RecipeImageSerializer
+from django.db.models import Count, F, FloatField, Max, Q
+from django.db.models.functions import Cast
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from recipe_project.autocomplete import MAX_SUGGESTIONS, affects_terms, replace_terms, store_terms, suggest
+from recipe_project.bulk import BulkWriteView
+from recipe_project.conditional import ConditionalGetMixin
+from recipe_project.eager import EagerLoadingMixin, eager_load
+from recipe_project.facets import FacetsView, favorite_counts, grouped_counts, tag_counts
+from recipe_project.fieldsets import requested_fieldset
+from recipe_project.library import stream_ndjson, stream_zip
+from recipe_project.middleware import query_budget
+from recipe_project.pagination import KeysetCursorPagination
+from recipe_project.rows import ListRowsMixin
+from recipe_project.search import RankedOrderingFilter, RankedSearchFilter
+from recipe_project.sync import DEFAULT_SYNC_LIMIT, MAX_SYNC_LIMIT, changes_since, parse_cursor
+from recipe_project.tags import TagCloudView
+from recipe_project.uploads import UploadSessionCreateView, UploadSessionDetailView
+from .filters import RecipeFilter
+from .ingredients import ingredient_tokens
+from .models import Category, IngredientToken, Recipe, RecipeImage
+from .rows import RecipeListRows
+from .serializers import (
+    CategorySerializer, RecipeSerializer, RecipeListSerializer, RecipeImageSerializer, ShoppingListSerializer,
+    WhatCanICookSerializer,
+)
+from .shopping import ShoppingList, scale_factor
+from .signals import index_ingredients, store_ingredient_tokens
 
 
-class CategoryListCreateView(generics.ListCreateAPIView):
+class CategoryListCreateView(EagerLoadingMixin, generics.ListCreateAPIView):
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated]
+    query_budget = {'GET': 2}
 
     def get_queryset(self):
         return Category.objects.all()
 
 
-class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CategoryDetailView(EagerLoadingMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated]
+    query_budget = {'GET': 2}
 
     def get_queryset(self):
         return Category.objects.all()
 
 
-class RecipeListCreateView(generics.ListCreateAPIView):
+class RecipeListCreateView(ConditionalGetMixin, ListRowsMixin, EagerLoadingMixin, generics.ListCreateAPIView):
+    related_validator_models = [Category]
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['category', 'is_favorite']
-    search_fields = ['title', 'description', 'ingredients', 'tags']
+    query_budget = {'GET': 3}
+    pagination_class = KeysetCursorPagination
+    filter_backends = [DjangoFilterBackend, RankedSearchFilter, RankedOrderingFilter]
+    filterset_class = RecipeFilter
+    trigram_search_fields = ['title']
     ordering_fields = ['created_at', 'title', 'prep_time', 'cook_time']
     ordering = ['-created_at']
+    list_rows = RecipeListRows
 
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -38,15 +69,96 @@ class RecipeListCreateView(generics.ListCreateAPIView):
         return RecipeSerializer
 
     def get_queryset(self):
-        return Recipe.objects.filter(created_by=self.request.user).prefetch_related('images', 'category')
+        return Recipe.objects.filter(created_by=self.request.user)
 
 
-class RecipeDetailView(generics.RetrieveUpdateDestroyAPIView):
+class RecipeFacetsView(FacetsView):
+    """
+    Counts per category, favorite flag and tag for the recipes the list
+    would return with the same ?search= and filters.
+    """
+    query_budget = {'GET': 4}
+    cache_prefix = 'recipe-facets'
+    related_validator_models = [Category]
+    filter_backends = [DjangoFilterBackend, RankedSearchFilter]
+    filterset_class = RecipeListCreateView.filterset_class
+    trigram_search_fields = RecipeListCreateView.trigram_search_fields
+
+    def get_queryset(self):
+        return Recipe.objects.filter(created_by=self.request.user)
+
+    def get_facets(self, queryset):
+        groups = grouped_counts(queryset, 'category', 'category__name')
+        count, favorites = favorite_counts(groups)
+        return {
+            'count': count,
+            'category': sorted(
+                ({'id': group['category'], 'name': group['category__name'], 'count': group['count']}
+                 for group in groups),
+                key=lambda facet: (-facet['count'], facet['name'] or '')
+            ),
+            'is_favorite': favorites,
+            'tags': tag_counts(queryset, self.tag_limit),
+        }
+
+
+class RecipeTagCloudView(TagCloudView):
+    cache_prefix = 'recipe-tags'
+
+    def get_queryset(self):
+        return Recipe.objects.filter(created_by=self.request.user)
+
+
+class RecipeDetailView(ConditionalGetMixin, EagerLoadingMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = RecipeSerializer
+    related_validator_models = [Category]
     permission_classes = [IsAuthenticated]
+    query_budget = {'GET': 4}
 
     def get_queryset(self):
-        return Recipe.objects.filter(created_by=self.request.user).prefetch_related('images', 'category')
+        return Recipe.objects.filter(created_by=self.request.user)
+
+
+class RecipeBulkView(BulkWriteView):
+    """
+    POST {"recipes": [...]} creates, PATCH {"recipes": [{"id": ..., ...}]}
+    updates and DELETE {"ids": [...]} deletes recipes in one transaction.
+    """
+    serializer_class = RecipeSerializer
+    permission_classes = [IsAuthenticated]
+    items_key = 'recipes'
+
+    def get_queryset(self):
+        return Recipe.objects.filter(created_by=self.request.user)
+
+    def validate_batch(self, validated):
+        category_ids = {data['category_id'] for data in validated if data.get('category_id') is not None}
+        existing = set(Category.objects.filter(id__in=category_ids).values_list('id', flat=True))
+        return {
+            index: {'category_id': [f'Category {data["category_id"]} does not exist.']}
+            for index, data in enumerate(validated)
+            if data.get('category_id') is not None and data['category_id'] not in existing
+        }
+
+    # bulk_create/bulk_update skip the post_save handler that maintains the
+    # ingredient and autocomplete indexes. ingredient_count is set before the
+    # write so it goes out with the same INSERT/UPDATE.
+    def before_write(self, instances, fields):
+        self.ingredient_index = None
+        if fields is None or 'ingredients' in fields:
+            self.ingredient_index = index_ingredients(instances)
+            if fields is not None:
+                fields.add('ingredient_count')
+
+    def after_write(self, instances, fields):
+        if self.ingredient_index is not None:
+            if fields is not None:
+                IngredientToken.objects.filter(recipe__in=instances).delete()
+            store_ingredient_tokens(self.ingredient_index)
+        if fields is None:
+            store_terms(instances)
+        elif affects_terms(fields):
+            replace_terms(instances)
 
 
 class RecipeImageUploadView(generics.CreateAPIView):
@@ -67,34 +179,175 @@ class RecipeImageUploadView(generics.CreateAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class RecipeImageDetailView(generics.RetrieveUpdateDestroyAPIView):
+class RecipeImageUploadSessionView(UploadSessionCreateView):
+    """POST {"recipe_id": ..., "filename": ..., "size": ...} starts a resumable upload."""
+    serializer_class = RecipeImageSerializer
+    permission_classes = [IsAuthenticated]
+    parent_model = Recipe
+    parent_field = 'recipe'
+    kind = 'recipe_image'
+
+
+class RecipeImageUploadSessionDetailView(UploadSessionDetailView):
+    """GET the offset, PUT a byte range, POST to complete, DELETE to cancel."""
     serializer_class = RecipeImageSerializer
     permission_classes = [IsAuthenticated]
+    parent_model = Recipe
+    parent_field = 'recipe'
+    kind = 'recipe_image'
+
+
+class RecipeImageDetailView(EagerLoadingMixin, generics.RetrieveUpdateDestroyAPIView):
+    serializer_class = RecipeImageSerializer
+    permission_classes = [IsAuthenticated]
+    query_budget = {'GET': 2}
 
     def get_queryset(self):
         return RecipeImage.objects.filter(recipe__created_by=self.request.user)
 
 
+@query_budget(2)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def generate_shopping_list(request):
-    recipe_ids = request.data.get('recipe_ids', [])
-    recipes = Recipe.objects.filter(id__in=recipe_ids, created_by=request.user)
-    
-    all_ingredients = []
-    for recipe in recipes:
-        ingredients_list = recipe.get_ingredients_list()
-        all_ingredients.extend(ingredients_list)
-    
-    # Remove duplicates while preserving order
-    unique_ingredients = []
-    seen = set()
-    for ingredient in all_ingredients:
-        if ingredient.lower() not in seen:
-            unique_ingredients.append(ingredient)
-            seen.add(ingredient.lower())
-    
+    """
+    Builds an aggregated shopping list for `recipe_ids`. Optional `servings`
+    maps recipe ids to the number of servings to shop for; quantities are
+    scaled from the recipe's own servings.
+    """
+    serializer = ShoppingListSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    recipe_ids = serializer.validated_data['recipe_ids']
+    requested_servings = serializer.validated_data['servings']
+
+    # Only the two columns the engine needs, streamed in chunks.
+    recipes = (
+        Recipe.objects.filter(id__in=recipe_ids, created_by=request.user)
+        .order_by('id')
+        .values_list('id', 'ingredients', 'servings')
+    )
+
+    shopping_list = ShoppingList()
+    recipe_count = 0
+    for recipe_id, ingredients, recipe_servings in recipes.iterator(chunk_size=200):
+        shopping_list.add_recipe(ingredients, scale_factor(recipe_servings, requested_servings.get(recipe_id)))
+        recipe_count += 1
+
+    items = shopping_list.items()
+    return Response({
+        'shopping_list': [item['display'] for item in items],
+        'items': items,
+        'recipe_count': recipe_count
+    })
+
+
+@query_budget(3)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def what_can_i_cook(request):
+    """
+    Ranks the user's recipes by how many of their ingredient lines are
+    covered by the ingredients on hand, using the IngredientToken index.
+    """
+    serializer = WhatCanICookSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    ingredients, limit, min_coverage = (
+        serializer.validated_data[name] for name in ('ingredients', 'limit', 'min_coverage')
+    )
+
+    tokens = sorted({token for item in ingredients for token in ingredient_tokens(item)})
+    if not tokens:
+        return Response({'results': []})
+
+    matches = (
+        IngredientToken.objects
+        .filter(created_by=request.user, token__in=tokens)
+        .values('recipe_id')
+        .annotate(
+            matched=Count('line', distinct=True),
+            required=Max('recipe__ingredient_count'),
+        )
+        .annotate(coverage=Cast('matched', FloatField()) / F('required'))
+        .filter(coverage__gte=min_coverage)
+        .order_by('-coverage', '-matched', 'recipe_id')[:limit]
+    )
+    matches = list(matches)
+
+    recipes = eager_load(
+        Recipe.objects.filter(id__in=[match['recipe_id'] for match in matches]), RecipeListSerializer,
+        fieldset=requested_fieldset(request),
+    ).in_bulk()
+    serializer_context = {'request': request}
+
+    # A recipe deleted between the two queries is left out.
     return Response({
-        'shopping_list': unique_ingredients,
-        'recipe_count': len(recipes)
-    })
\ No newline at end of file
+        'results': [
+            {
+                'recipe': RecipeListSerializer(recipes[match['recipe_id']], context=serializer_context).data,
+                'matched': match['matched'],
+                'required': match['required'],
+                'coverage': round(match['coverage'], 3),
+            }
+            for match in matches
+            if match['recipe_id'] in recipes
+        ]
+    })
+
+
+@query_budget(3)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def autocomplete(request):
+    """
+    Typeahead for the search box: up to ?limit= (default 5) recipe and
+    stretch titles, tags and ingredient names with a word starting with ?q=.
+    """
+    try:
+        limit = min(int(request.query_params.get('limit', 5)), MAX_SUGGESTIONS)
+    except ValueError:
+        return Response({'error': 'Invalid limit'}, status=status.HTTP_400_BAD_REQUEST)
+    if limit < 1:
+        return Response({'error': 'Invalid limit'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(suggest(request.user, request.query_params.get('q', ''), limit))
+
+
+@query_budget(14)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sync(request):
+    """
+    Changes to the user's recipes, stretches, routines and their images
+    since ?since= (the cursor of the previous response; omitted for a first
+    sync), up to ?limit= rows. Follow up while has_more is true.
+    """
+    since = parse_cursor(request.query_params.get('since'))
+    if since is None:
+        return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = min(int(request.query_params.get('limit', DEFAULT_SYNC_LIMIT)), MAX_SYNC_LIMIT)
+    except ValueError:
+        return Response({'error': 'Invalid limit'}, status=status.HTTP_400_BAD_REQUEST)
+    if limit < 1:
+        return Response({'error': 'Invalid limit'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(changes_since(request, since, limit))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_library(request):
+    """
+    Streams the user's recipes, stretches and routines as NDJSON, or with
+    ?media=1 as a zip that also holds the original images. Load it with
+    `manage.py import_library`.
+    """
+    filename = f"library-{timezone.now():%Y%m%d}"
+    if request.query_params.get('media') in ('1', 'true'):
+        response = StreamingHttpResponse(stream_zip(request.user), content_type='application/zip')
+        filename += '.zip'
+    else:
+        response = StreamingHttpResponse(stream_ndjson(request.user), content_type='application/x-ndjson')
+        filename += '.ndjson'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
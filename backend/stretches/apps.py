@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class StretchesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'stretches'
\ No newline at end of file
+    name = 'stretches'
+
+    def ready(self):
+        from . import signals  # noqa: F401
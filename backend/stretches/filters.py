@@ -0,0 +1,25 @@
+import django_filters
+from recipe_project.tags import TagsFilter
+from .models import BodyPart, Stretch
+
+
+class StretchFilter(django_filters.FilterSet):
+    # The default M2M filter joins the through table and adds DISTINCT, which
+    # forces a sort of every matching row; a semi-join keeps the list
+    # ordered by the (created_by, -created_at, -id) index.
+    body_parts = django_filters.ModelMultipleChoiceFilter(
+        queryset=BodyPart.objects.all(), method='filter_body_parts'
+    )
+    tags = TagsFilter()
+    tags_any = TagsFilter(match='any')
+
+    class Meta:
+        model = Stretch
+        fields = ['body_parts', 'difficulty_level', 'is_favorite', 'tags', 'tags_any']
+
+    def filter_body_parts(self, queryset, name, value):
+        if not value:
+            return queryset
+        return queryset.filter(pk__in=Stretch.body_parts.through.objects.filter(
+            bodypart__in=value
+        ).values('stretch_id'))
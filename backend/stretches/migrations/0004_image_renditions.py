@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-17 19:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stretches', '0003_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stretchimage',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized WebP/JPEG copies, see recipe_project.renditions'),
+        ),
+    ]
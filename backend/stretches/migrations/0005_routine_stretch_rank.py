@@ -0,0 +1,53 @@
+# Generated by Django 5.1.2 on 2026-10-17 19:40
+
+from django.db import migrations, models
+from stretches.ranking import spaced_ranks
+
+
+def ranks_from_order(apps, schema_editor):
+    RoutineStretch = apps.get_model('stretches', 'RoutineStretch')
+    routine_ids = RoutineStretch.objects.values_list('routine_id', flat=True).distinct()
+    for routine_id in routine_ids.iterator():
+        items = list(RoutineStretch.objects.filter(routine_id=routine_id).order_by('order', 'id'))
+        for item, rank in zip(items, spaced_ranks(len(items))):
+            item.rank = rank
+        RoutineStretch.objects.bulk_update(items, ['rank'])
+
+
+def order_from_ranks(apps, schema_editor):
+    RoutineStretch = apps.get_model('stretches', 'RoutineStretch')
+    routine_ids = RoutineStretch.objects.values_list('routine_id', flat=True).distinct()
+    for routine_id in routine_ids.iterator():
+        items = list(RoutineStretch.objects.filter(routine_id=routine_id).order_by('rank', 'id'))
+        for position, item in enumerate(items):
+            item.order = position
+        RoutineStretch.objects.bulk_update(items, ['order'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stretches', '0004_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='routinestretch',
+            name='rank',
+            field=models.CharField(db_collation='C', default='', editable=False, help_text='Fractional ordering key, see stretches.ranking', max_length=64),
+            preserve_default=False,
+        ),
+        migrations.RunPython(ranks_from_order, order_from_ranks),
+        migrations.AlterModelOptions(
+            name='routinestretch',
+            options={'ordering': ['rank', 'id']},
+        ),
+        migrations.RemoveField(
+            model_name='routinestretch',
+            name='order',
+        ),
+        migrations.AddIndex(
+            model_name='routinestretch',
+            index=models.Index(fields=['routine', 'rank'], name='routine_stretch_rank'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.2 on 2026-10-17 19:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stretches', '0005_routine_stretch_rank'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Create the composite indexes before dropping the single-column ones
+        # they replace.
+        migrations.AddIndex(
+            model_name='stretch',
+            index=models.Index(fields=['created_by', '-created_at', '-id'], name='stretch_owner_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='stretch',
+            index=models.Index(condition=models.Q(('is_favorite', True)), fields=['created_by', '-created_at', '-id'], name='stretch_owner_favorite_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='stretch',
+            index=models.Index(fields=['created_by', 'difficulty_level', '-created_at', '-id'], name='stretch_owner_level_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='stretchimage',
+            index=models.Index(fields=['stretch', '-is_primary', 'created_at', 'id'], name='stretch_image_order'),
+        ),
+        migrations.AddIndex(
+            model_name='stretchroutine',
+            index=models.Index(fields=['created_by', '-created_at', '-id'], name='routine_owner_recent'),
+        ),
+        migrations.AlterField(
+            model_name='stretch',
+            name='created_by',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='stretchimage',
+            name='stretch',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='images', to='stretches.stretch'),
+        ),
+        migrations.AlterField(
+            model_name='stretchroutine',
+            name='created_by',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,80 @@
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import recipe_project.search
+from django.db import migrations, models
+from recipe_project.tags import MAX_TAG_LENGTH, normalize_tags
+
+
+def split_tags(apps, schema_editor):
+    Stretch = apps.get_model('stretches', 'Stretch')
+    batch = []
+    for stretch in Stretch.objects.exclude(tags='').only('id', 'tags').iterator(chunk_size=1000):
+        stretch.tag_array = [tag[:MAX_TAG_LENGTH] for tag in normalize_tags(stretch.tags)]
+        batch.append(stretch)
+        if len(batch) >= 1000:
+            Stretch.objects.bulk_update(batch, ['tag_array'])
+            batch = []
+    Stretch.objects.bulk_update(batch, ['tag_array'])
+
+
+def join_tags(apps, schema_editor):
+    Stretch = apps.get_model('stretches', 'Stretch')
+    batch = []
+    for stretch in Stretch.objects.exclude(tag_array=[]).only('id', 'tag_array').iterator(chunk_size=1000):
+        stretch.tags = ', '.join(stretch.tag_array)[:200]
+        batch.append(stretch)
+        if len(batch) >= 1000:
+            Stretch.objects.bulk_update(batch, ['tags'])
+            batch = []
+    Stretch.objects.bulk_update(batch, ['tags'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stretches', '0007_owner_updated_index'),
+        # Creates the tags_text() function the search vector uses.
+        ('recipes', '0008_tag_array'),
+    ]
+
+    operations = [
+        # The generated column reads tags, so it goes first and is rebuilt
+        # over the array at the end.
+        migrations.RemoveIndex(
+            model_name='stretch',
+            name='stretch_search_vector_gin',
+        ),
+        migrations.RemoveField(
+            model_name='stretch',
+            name='search_vector',
+        ),
+        migrations.AddField(
+            model_name='stretch',
+            name='tag_array',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=50), blank=True, default=list, help_text='Normalized tags', size=None),
+        ),
+        migrations.RunPython(split_tags, join_tags),
+        migrations.RemoveField(
+            model_name='stretch',
+            name='tags',
+        ),
+        migrations.RenameField(
+            model_name='stretch',
+            old_name='tag_array',
+            new_name='tags',
+        ),
+        migrations.AddField(
+            model_name='stretch',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('title', config='english', weight='A'), '||', django.contrib.postgres.search.SearchVector(recipe_project.search.TagsText('tags'), config='english', weight='B'), django.contrib.postgres.search.SearchConfig('english')), '||', django.contrib.postgres.search.SearchVector('description', config='english', weight='D'), django.contrib.postgres.search.SearchConfig('english')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='stretch',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='stretch_search_vector_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='stretch',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['tags'], name='stretch_tags_gin'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.2 on 2026-10-17 20:59
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stretches', '0008_tag_array'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='bodypart',
+            options={'ordering': ['name']},
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.2 on 2026-10-17 21:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stretches', '0009_body_part_ordering'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bodypart',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -1,11 +1,24 @@
-from django.db import models
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import models
+from recipe_project.eager import uses_fields
+from recipe_project.search import SearchVectorManager, TagsText
+from .ranking import MAX_RANK_LENGTH, rank_in_routine
 
 
 class BodyPart(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # A stretch's body parts are listed in this order, so that the list
+        # fast path (stretches.rows) renders them as the serializer does.
+        ordering = ['name']
 
     def __str__(self):
         return self.name
@@ -28,31 +41,69 @@ class Stretch(models.Model):
         default='beginner'
     )
     video_url = models.URLField(blank=True, help_text="YouTube or other video URL")
-    tags = models.CharField(max_length=200, blank=True, help_text="Comma-separated tags")
-    created_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    tags = ArrayField(models.CharField(max_length=50), default=list, blank=True, help_text="Normalized tags")
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_favorite = models.BooleanField(default=False)
+    primary_image = models.ForeignKey(
+        'StretchImage', on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='+',
+        help_text="Denormalized cover image, maintained by stretches.signals"
+    )
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('title', weight='A', config=settings.SEARCH_CONFIG)
+            + SearchVector(TagsText('tags'), weight='B', config=settings.SEARCH_CONFIG)
+            + SearchVector('description', weight='D', config=settings.SEARCH_CONFIG)
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    objects = SearchVectorManager()
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='stretch_search_vector_gin'),
+            GinIndex(OpClass('title', name='gin_trgm_ops'), name='stretch_title_trgm_gin'),
+            GinIndex(fields=['tags'], name='stretch_tags_gin'),
+            # Same access paths as recipes, see recipes.models.Recipe.
+            models.Index(fields=['created_by', '-created_at', '-id'], name='stretch_owner_recent'),
+            models.Index(
+                fields=['created_by', '-created_at', '-id'], condition=models.Q(is_favorite=True),
+                name='stretch_owner_favorite_recent'
+            ),
+            models.Index(
+                fields=['created_by', 'difficulty_level', '-created_at', '-id'], name='stretch_owner_level_recent'
+            ),
+            models.Index(fields=['created_by', 'updated_at'], name='stretch_owner_updated'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @uses_fields('tags')
     def get_tags_list(self):
-        return [tag.strip() for tag in self.tags.split(',') if tag.strip()]
+        return list(self.tags)
 
 
 class StretchImage(models.Model):
-    stretch = models.ForeignKey(Stretch, related_name='images', on_delete=models.CASCADE)
+    stretch = models.ForeignKey(Stretch, related_name='images', on_delete=models.CASCADE, db_index=False)
     image = models.ImageField(upload_to='stretch_images/')
     caption = models.CharField(max_length=200, blank=True)
     is_primary = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    renditions = models.JSONField(
+        default=dict, blank=True, editable=False,
+        help_text="Resized WebP/JPEG copies, see recipe_project.renditions"
+    )
 
     class Meta:
         ordering = ['-is_primary', 'created_at']
+        indexes = [
+            models.Index(fields=['stretch', '-is_primary', 'created_at', 'id'], name='stretch_image_order'),
+        ]
 
     def __str__(self):
         return f"{self.stretch.title} - Image {self.id}"
@@ -62,9 +113,26 @@ class StretchRoutine(models.Model):
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     stretches = models.ManyToManyField(Stretch, through='RoutineStretch')
-    created_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('name', weight='A', config=settings.SEARCH_CONFIG)
+            + SearchVector('description', weight='D', config=settings.SEARCH_CONFIG)
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    objects = SearchVectorManager()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='routine_search_vector_gin'),
+            GinIndex(OpClass('name', name='gin_trgm_ops'), name='routine_name_trgm_gin'),
+            models.Index(fields=['created_by', '-created_at', '-id'], name='routine_owner_recent'),
+        ]
 
     def __str__(self):
         return self.name
@@ -73,10 +141,21 @@ class StretchRoutine(models.Model):
 class RoutineStretch(models.Model):
     routine = models.ForeignKey(StretchRoutine, on_delete=models.CASCADE)
     stretch = models.ForeignKey(Stretch, on_delete=models.CASCADE)
-    order = models.PositiveIntegerField(default=0)
+    rank = models.CharField(
+        max_length=MAX_RANK_LENGTH, db_collation='C', editable=False,
+        help_text="Fractional ordering key, see stretches.ranking"
+    )
     custom_duration = models.PositiveIntegerField(null=True, blank=True, help_text="Override default duration")
     custom_repetitions = models.PositiveIntegerField(null=True, blank=True, help_text="Override default repetitions")
 
     class Meta:
-        ordering = ['order']
-        unique_together = ['routine', 'stretch']
\ No newline at end of file
+        ordering = ['rank', 'id']
+        unique_together = ['routine', 'stretch']
+        indexes = [
+            models.Index(fields=['routine', 'rank'], name='routine_stretch_rank'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self.rank:
+            self.rank = rank_in_routine(self.routine)
+        super().save(*args, **kwargs)
\ No newline at end of file
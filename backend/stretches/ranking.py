@@ -0,0 +1,141 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Rank keys are base-62 fractions (0.<digits>) compared as plain strings, so
+# the column uses the "C" collation. Keys never end in '0', which guarantees
+# there is always another key between two neighbours.
+DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+
+# Keys grow by a digit every few inserts into the same gap. Past this length
+# the routine's keys are respaced in the background.
+REBALANCE_LENGTH = 12
+MAX_RANK_LENGTH = 64
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _midpoint(low, high):
+    """
+    Key strictly between low and high, where low may be '' (zero) and high
+    None (one).
+    """
+    if high is not None:
+        # Keep the common prefix and recurse on the rest.
+        prefix = 0
+        while (low[prefix] if prefix < len(low) else '0') == high[prefix]:
+            prefix += 1
+        if prefix:
+            return high[:prefix] + _midpoint(low[prefix:], high[prefix:])
+
+    digit_low = DIGITS.index(low[0]) if low else 0
+    digit_high = DIGITS.index(high[0]) if high is not None else BASE
+    if digit_high - digit_low > 1:
+        return DIGITS[(digit_low + digit_high + 1) // 2]
+    # Adjacent digits: take the shorter high key, or extend low.
+    if high is not None and len(high) > 1:
+        return high[:1]
+    return DIGITS[digit_low] + _midpoint(low[1:], None)
+
+
+def rank_between(before, after):
+    """
+    Returns a key that sorts after `before` and before `after`; None for
+    either means the start or the end of the list.
+    """
+    before = before or ''
+    if after is not None and before >= after:
+        raise ValueError(f'{before!r} does not sort before {after!r}')
+    return _midpoint(before, after)
+
+
+def spaced_ranks(count):
+    """
+    `count` ascending keys spread evenly over the key space, with at least
+    BASE free keys of the same length between neighbours.
+    """
+    width = 1
+    while BASE ** width < (count + 1) * BASE:
+        width += 1
+    space = BASE ** width
+    ranks = []
+    for position in range(1, count + 1):
+        value = position * space // (count + 1)
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        ranks.append(''.join(reversed(digits)).rstrip('0'))
+    return ranks
+
+
+def rank_in_routine(routine, before=None, after=None, exclude=None):
+    """
+    Rank for an item placed right before the item with stretch `before`,
+    right after the one with stretch `after`, or at the end of the routine.
+    `exclude` is the item being moved. Raises RoutineStretch.DoesNotExist
+    for an unknown neighbour.
+    """
+    from .models import RoutineStretch
+
+    items = RoutineStretch.objects.filter(routine=routine)
+    if exclude is not None:
+        items = items.exclude(pk=exclude.pk)
+    ranks = items.values_list('rank', flat=True)
+
+    if before is not None:
+        high = items.get(stretch_id=before).rank
+        low = ranks.filter(rank__lt=high).order_by('-rank').first()
+    elif after is not None:
+        low = items.get(stretch_id=after).rank
+        high = ranks.filter(rank__gt=low).order_by('rank').first()
+    else:
+        low, high = ranks.order_by('-rank').first(), None
+
+    rank = rank_between(low, high)
+    if len(rank) > MAX_RANK_LENGTH:
+        # The background rebalance has not caught up; respace now.
+        rebalance(routine.pk)
+        return rank_in_routine(routine, before, after, exclude)
+    if len(rank) > REBALANCE_LENGTH:
+        schedule_rebalance(routine.pk)
+    return rank
+
+
+def rebalance(routine_id):
+    """
+    Rewrites the routine's keys evenly spaced, keeping their order.
+    """
+    from .models import RoutineStretch, StretchRoutine
+
+    with transaction.atomic():
+        list(StretchRoutine.objects.select_for_update().filter(pk=routine_id).values_list('pk'))
+        items = list(RoutineStretch.objects.filter(routine_id=routine_id).order_by('rank', 'id').only('id', 'rank'))
+        for item, rank in zip(items, spaced_ranks(len(items))):
+            item.rank = rank
+        RoutineStretch.objects.bulk_update(items, ['rank'])
+        StretchRoutine.objects.filter(pk=routine_id).update(updated_at=timezone.now())
+
+
+def _rebalance_in_background(routine_id):
+    try:
+        rebalance(routine_id)
+    except Exception:
+        logger.exception('Could not rebalance routine %s', routine_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_rebalance(routine_id):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='routine-rebalance')
+    transaction.on_commit(lambda: _executor.submit(_rebalance_in_background, routine_id))
@@ -0,0 +1,52 @@
+from recipe_project.rows import ListRows, datetime_value, image_columns, user_columns
+from .models import Stretch, StretchImage
+
+IMAGE_STORAGE = StretchImage._meta.get_field('image').storage
+
+
+class StretchListRows(ListRows):
+    """StretchListSerializer's output, see recipe_project.rows."""
+    columns = [
+        'id', 'title', 'description', 'duration', 'repetitions', 'difficulty_level',
+        *user_columns('created_by'), 'created_at', 'is_favorite', *image_columns('primary_image'), 'tags',
+    ]
+
+    def body_parts(self, stretch_ids):
+        """{stretch id: [body part, ...]}, in one query."""
+        body_parts = {}
+        by_stretch = {}
+        links = Stretch.body_parts.through.objects.filter(stretch_id__in=stretch_ids).values_list(
+            'stretch_id', 'bodypart_id', 'bodypart__name', 'bodypart__description', 'bodypart__created_at',
+        ).order_by('bodypart__name')
+        for stretch_id, body_part_id, name, description, created_at in links:
+            body_part = self.cached(body_parts, body_part_id, lambda: {
+                'id': body_part_id,
+                'name': name,
+                'description': description,
+                'created_at': datetime_value(created_at),
+            })
+            by_stretch.setdefault(stretch_id, []).append(body_part)
+        return by_stretch
+
+    def render(self, rows):
+        body_parts = self.body_parts([row.id for row in rows]) if rows else {}
+        users = {}
+        return [
+            {
+                'id': row.id,
+                'title': row.title,
+                'description': row.description,
+                'duration': row.duration,
+                'repetitions': row.repetitions,
+                'body_parts': body_parts.get(row.id, []),
+                'difficulty_level': row.difficulty_level,
+                'created_by': self.cached(users, row.created_by_id, lambda: self.user(row, 'created_by')),
+                'created_at': datetime_value(row.created_at),
+                'is_favorite': row.is_favorite,
+                'primary_image': (
+                    None if row.primary_image_id is None else self.image(row, 'primary_image', IMAGE_STORAGE)
+                ),
+                'tags_list': list(row.tags),
+            }
+            for row in rows
+        ]
@@ -1,5 +1,9 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from recipe_project.eager import uses_fields
+from recipe_project.fieldsets import SparseFieldsetMixin
+from recipe_project.renditions import rendition_urls
+from recipe_project.tags import TagsField
 from .models import BodyPart, Stretch, StretchImage, StretchRoutine, RoutineStretch
 
 
@@ -16,12 +20,25 @@ class BodyPartSerializer(serializers.ModelSerializer):
 
 
 class StretchImageSerializer(serializers.ModelSerializer):
+    renditions = serializers.SerializerMethodField()
+
     class Meta:
         model = StretchImage
-        fields = ['id', 'image', 'caption', 'is_primary', 'created_at']
+        fields = ['id', 'image', 'caption', 'is_primary', 'created_at', 'renditions']
+
+    @uses_fields('image', 'renditions')
+    def get_renditions(self, obj):
+        return rendition_urls(obj.renditions, obj.image.storage, self.context.get('request'))
+
 
+class StretchImageSyncSerializer(StretchImageSerializer):
+    """Images in the sync feed, which sends them apart from their stretch."""
 
-class StretchSerializer(serializers.ModelSerializer):
+    class Meta(StretchImageSerializer.Meta):
+        fields = ['stretch', *StretchImageSerializer.Meta.fields]
+
+
+class StretchSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     created_by = UserSerializer(read_only=True)
     body_parts = BodyPartSerializer(many=True, read_only=True)
     body_part_ids = serializers.ListField(
@@ -30,6 +47,7 @@ class StretchSerializer(serializers.ModelSerializer):
         required=False
     )
     images = StretchImageSerializer(many=True, read_only=True)
+    tags = TagsField(required=False)
     tags_list = serializers.ReadOnlyField(source='get_tags_list')
 
     class Meta:
@@ -57,7 +75,7 @@ class StretchSerializer(serializers.ModelSerializer):
         return stretch
 
 
-class StretchListSerializer(serializers.ModelSerializer):
+class StretchListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     created_by = UserSerializer(read_only=True)
     body_parts = BodyPartSerializer(many=True, read_only=True)
     primary_image = serializers.SerializerMethodField()
@@ -71,14 +89,11 @@ class StretchListSerializer(serializers.ModelSerializer):
             'is_favorite', 'primary_image', 'tags_list'
         ]
 
+    @uses_fields('primary_image')
     def get_primary_image(self, obj):
-        primary_image = obj.images.filter(is_primary=True).first()
-        if primary_image:
-            return StretchImageSerializer(primary_image).data
-        first_image = obj.images.first()
-        if first_image:
-            return StretchImageSerializer(first_image).data
-        return None
+        if obj.primary_image_id is None:
+            return None
+        return StretchImageSerializer(obj.primary_image).data
 
 
 class RoutineStretchSerializer(serializers.ModelSerializer):
@@ -87,10 +102,18 @@ class RoutineStretchSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = RoutineStretch
-        fields = ['id', 'stretch', 'stretch_id', 'order', 'custom_duration', 'custom_repetitions']
+        fields = ['id', 'stretch', 'stretch_id', 'rank', 'custom_duration', 'custom_repetitions']
+
+
+class RoutineStretchSyncSerializer(serializers.ModelSerializer):
+    """Routine items in the sync feed, with their routine and stretch as ids."""
+
+    class Meta:
+        model = RoutineStretch
+        fields = ['id', 'routine', 'stretch', 'rank', 'custom_duration', 'custom_repetitions']
 
 
-class StretchRoutineSerializer(serializers.ModelSerializer):
+class StretchRoutineSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     created_by = UserSerializer(read_only=True)
     routine_stretches = RoutineStretchSerializer(source='routinestretch_set', many=True, read_only=True)
 
@@ -103,4 +126,8 @@ class StretchRoutineSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         validated_data['created_by'] = self.context['request'].user
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+
+class RoutineOrderSerializer(serializers.Serializer):
+    stretch_ids = serializers.ListField(child=serializers.IntegerField())
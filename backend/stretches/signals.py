@@ -0,0 +1,60 @@
+from django.db.models import OuterRef, Subquery
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from recipe_project.autocomplete import affects_terms, replace_terms, store_terms
+from recipe_project.media import release_image_files
+from recipe_project.renditions import needs_renditions, renditions_stored, schedule_renditions
+from .models import RoutineStretch, Stretch, StretchImage, StretchRoutine
+
+
+def primary_image_subquery():
+    """
+    The image a stretch card shows: the first image flagged primary,
+    otherwise the oldest image.
+    """
+    return Subquery(
+        StretchImage.objects.filter(stretch=OuterRef('pk'))
+        .order_by('-is_primary', 'created_at', 'id')
+        .values('pk')[:1]
+    )
+
+
+def refresh_primary_image(stretch_id):
+    # Image changes show up in the stretch's payload, so they also move its
+    # updated_at (the conditional GET validator).
+    Stretch.objects.filter(pk=stretch_id).update(
+        primary_image=primary_image_subquery(), updated_at=timezone.now()
+    )
+
+
+@receiver(post_save, sender=Stretch)
+def stretch_saved(sender, instance, created=False, update_fields=None, **kwargs):
+    if created:
+        store_terms([instance])
+    elif affects_terms(update_fields):
+        replace_terms([instance])
+
+
+@receiver(post_save, sender=StretchImage)
+def stretch_image_saved(sender, instance, **kwargs):
+    refresh_primary_image(instance.stretch_id)
+    if needs_renditions(instance):
+        schedule_renditions(instance)
+
+
+@receiver(post_delete, sender=StretchImage)
+def stretch_image_deleted(sender, instance, **kwargs):
+    refresh_primary_image(instance.stretch_id)
+    release_image_files(instance)
+
+
+@receiver(renditions_stored, sender=StretchImage)
+def stretch_renditions_stored(sender, pk, **kwargs):
+    Stretch.objects.filter(images=pk).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=RoutineStretch)
+@receiver(post_delete, sender=RoutineStretch)
+def routine_stretch_changed(sender, instance, **kwargs):
+    StretchRoutine.objects.filter(pk=instance.routine_id).update(updated_at=timezone.now())
@@ -0,0 +1,224 @@
+from django.test import override_settings
+
+from recipe_project.seeding import seed_library
+from recipe_project.testing import APITestCase, QueryPlanTestCase
+from .models import BodyPart, RoutineStretch, Stretch, StretchImage, StretchRoutine
+
+# Queries per request, whatever the number of rows: the conditional GET
+# validators, the page (primary images joined) and the body parts; the
+# detail adds the stretch's images, and the routines fetch their stretches
+# with one more query. A timeline reads the validators, the routine and its
+# items.
+STRETCH_LIST_QUERIES = 3
+STRETCH_DETAIL_QUERIES = 4
+ROUTINE_LIST_QUERIES = 4
+ROUTINE_DETAIL_QUERIES = 4
+ROUTINE_TIMELINE_QUERIES = 3
+
+
+class StretchQueryCountTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.one = seed_library(
+            prefix='one', users=1, recipes=0, images=1, stretches=1, routines=1, routine_size=1, image_files=False,
+        )[0]
+        cls.many = seed_library(
+            prefix='many', users=1, recipes=0, images=3, stretches=30, routines=10, routine_size=8,
+            image_files=False,
+        )[0]
+
+    def test_stretch_list_queries_do_not_grow_with_rows(self):
+        for user, rows in ((self.one, 1), (self.many, 30)):
+            with self.subTest(rows=rows), self.assertNumQueries(STRETCH_LIST_QUERIES):
+                response = self.get(user, '/api/stretches/?page_size=100')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results']), rows)
+            self.assertTrue(all(item['body_parts'] for item in response.data['results']))
+
+    def test_stretch_list_queries_do_not_grow_through_the_serializer(self):
+        # ?fields= bypasses the row fast path.
+        for user in (self.one, self.many):
+            with self.assertNumQueries(STRETCH_LIST_QUERIES):
+                response = self.get(user, '/api/stretches/?page_size=100&fields=id,title,body_parts,primary_image')
+            self.assertEqual(response.status_code, 200)
+
+    def test_stretch_detail_queries_do_not_grow_with_images(self):
+        stretch = Stretch.objects.filter(created_by=self.many).first()
+        StretchImage.objects.bulk_create([
+            StretchImage(stretch=stretch, image='stretch_images/seeded.jpg') for _ in range(10)
+        ])
+        for user, images in ((self.one, 1), (self.many, 13)):
+            stretch = Stretch.objects.filter(created_by=user).first()
+            with self.subTest(images=images), self.assertNumQueries(STRETCH_DETAIL_QUERIES):
+                response = self.get(user, f'/api/stretches/{stretch.pk}/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['images']), images)
+
+    def test_routine_list_queries_do_not_grow_with_rows(self):
+        for user, rows in ((self.one, 1), (self.many, 10)):
+            with self.subTest(rows=rows), self.assertNumQueries(ROUTINE_LIST_QUERIES):
+                response = self.get(user, '/api/stretches/routines/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data), rows)
+
+    def test_routine_queries_do_not_grow_with_stretches(self):
+        for user, size in ((self.one, 1), (self.many, 8)):
+            routine = StretchRoutine.objects.filter(created_by=user).first()
+            with self.subTest(stretches=size), self.assertNumQueries(ROUTINE_DETAIL_QUERIES):
+                response = self.get(user, f'/api/stretches/routines/{routine.pk}/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['routine_stretches']), size)
+            with self.subTest(stretches=size), self.assertNumQueries(ROUTINE_TIMELINE_QUERIES):
+                response = self.get(user, f'/api/stretches/routines/{routine.pk}/timeline/')
+            self.assertEqual(response.status_code, 200)
+
+
+class StretchQueryPlanTests(QueryPlanTestCase):
+    seed_options = {'users': 20, 'recipes': 0, 'stretches': 100, 'routines': 10}
+
+    def test_hot_endpoints_use_indexes(self):
+        stretch = Stretch.objects.filter(created_by=self.user).first()
+        routine = StretchRoutine.objects.filter(created_by=self.user).first()
+        self.assertIndexedPlans([
+            ('stretch list', '/api/stretches/'),
+            ('favorite stretches', '/api/stretches/?is_favorite=true'),
+            ('stretches by level', '/api/stretches/?difficulty_level=advanced'),
+            ('stretches by body part', f'/api/stretches/?body_parts={stretch.body_parts.first().pk}'),
+            ('stretch detail', f'/api/stretches/{stretch.pk}/'),
+            ('stretch facets', '/api/stretches/facets/?difficulty_level=advanced'),
+            ('stretch tag cloud', '/api/stretches/tags/'),
+            ('routine list', '/api/stretches/routines/'),
+            ('routine detail', f'/api/stretches/routines/{routine.pk}/'),
+            ('routine timeline', f'/api/stretches/routines/{routine.pk}/timeline/'),
+        ])
+
+
+class StretchListRowsTests(APITestCase):
+    """The row fast path renders exactly what StretchListSerializer does."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_library(
+            prefix='rows', users=1, recipes=0, images=2, stretches=30, routines=0, image_files=False,
+        )[0]
+        cls.user.first_name, cls.user.last_name = 'Ana', 'Ruiz'
+        cls.user.save()
+        Stretch.objects.create(title='Neck roll', description='Roll.', instructions='Slowly.', created_by=cls.user)
+        stretch = Stretch.objects.create(
+            title='Pigeon', description='Hips.', instructions='Hold.', tags=['hips', 'yoga'], created_by=cls.user,
+        )
+        stretch.body_parts.add(
+            BodyPart.objects.create(name='Rows hips', description='Hip flexors.'),
+            BodyPart.objects.create(name='Rows glutes'),
+        )
+        renditions = {
+            name: {'width': width, 'height': width, 'webp': f'blobs/{name}.webp', 'jpeg': f'blobs/{name}.jpg'}
+            for name, width in (('card', 640), ('thumbnail', 200))
+        }
+        StretchImage.objects.create(stretch=stretch, image='stretch_images/pigeon.jpg', caption='Hold', renditions=renditions)
+
+    def pages(self, path, fast):
+        contents = []
+        with override_settings(LIST_ROWS_FAST_PATH=fast):
+            while path:
+                response = self.get(self.user, path)
+                self.assertEqual(response.status_code, 200)
+                contents.append(response.content)
+                path = response.data['next']
+        return contents
+
+    def test_fast_path_matches_serializer(self):
+        for query in ('', '?ordering=duration', '?ordering=-difficulty_level', '?is_favorite=true',
+                      '?search=pigeon', '?tags=yoga'):
+            path = f'/api/stretches/{query}{"&" if query else "?"}page_size=10'
+            with self.subTest(path=path):
+                self.assertEqual(self.pages(path, True), self.pages(path, False))
+
+    def test_covers_nested_objects(self):
+        items = self.get(self.user, '/api/stretches/?page_size=100').data['results']
+        self.assertTrue(any(not item['body_parts'] for item in items))
+        pigeon = next(item for item in items if item['title'] == 'Pigeon')
+        self.assertEqual([body_part['name'] for body_part in pigeon['body_parts']], ['Rows glutes', 'Rows hips'])
+        self.assertEqual(pigeon['tags_list'], ['hips', 'yoga'])
+        self.assertEqual(pigeon['created_by']['first_name'], 'Ana')
+        self.assertEqual(pigeon['primary_image']['renditions']['card']['webp'], '/media/blobs/card.webp')
+
+
+class StretchValidatorTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_library(prefix='etag', users=1, recipes=0, stretches=0, routines=0, image_files=False)[0]
+        cls.body_part = BodyPart.objects.create(name='Etag hamstrings')
+        cls.stretch = Stretch.objects.create(
+            title='Forward fold', description='Fold.', instructions='Reach down.', created_by=cls.user,
+        )
+        cls.stretch.body_parts.add(cls.body_part)
+        cls.routine = StretchRoutine.objects.create(name='Morning', created_by=cls.user)
+        RoutineStretch.objects.create(routine=cls.routine, stretch=cls.stretch)
+        cls.paths = [
+            '/api/stretches/',
+            f'/api/stretches/{cls.stretch.pk}/',
+            '/api/stretches/routines/',
+            f'/api/stretches/routines/{cls.routine.pk}/',
+        ]
+
+    def etags(self):
+        return [self.get(self.user, path)['ETag'] for path in self.paths]
+
+    def test_unchanged_resources_are_not_modified(self):
+        for path, etag in zip(self.paths, self.etags()):
+            with self.subTest(path=path):
+                self.assertEqual(self.get(self.user, path, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_nested_body_part_changes_the_etag(self):
+        before = self.etags()
+        self.body_part.name = 'Etag calves'
+        self.body_part.save()
+        renamed = self.etags()
+        self.assertTrue(all(a != b for a, b in zip(before, renamed)))
+        BodyPart.objects.create(name='Etag shoulders')
+        self.assertTrue(all(a != b for a, b in zip(renamed, self.etags())))
+
+    def test_facets_follow_body_part_renames(self):
+        facets = self.get(self.user, '/api/stretches/facets/').data
+        self.assertEqual(facets['body_parts'][0]['name'], 'Etag hamstrings')
+        self.body_part.name = 'Etag calves'
+        self.body_part.save()
+        facets = self.get(self.user, '/api/stretches/facets/').data
+        self.assertEqual(facets['body_parts'][0]['name'], 'Etag calves')
+
+
+class RoutineReorderTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_library(prefix='reorder', users=1, recipes=0, stretches=3, routines=0, image_files=False)[0]
+        cls.routine = StretchRoutine.objects.create(name='Evening', created_by=cls.user)
+        cls.ids = list(Stretch.objects.filter(created_by=cls.user).order_by('pk').values_list('pk', flat=True))
+        for stretch_id in cls.ids:
+            RoutineStretch.objects.create(routine=cls.routine, stretch_id=stretch_id)
+
+    def put(self, data):
+        path = f'/api/stretches/routines/{self.routine.pk}/stretches/'
+        return self.client_for(self.user).put(path, data, format='json')
+
+    def order(self):
+        return list(self.routine.routinestretch_set.order_by('rank').values_list('stretch_id', flat=True))
+
+    def test_reorders_stretches(self):
+        response = self.put({'stretch_ids': self.ids[::-1]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.order(), self.ids[::-1])
+
+    def test_rejects_invalid_stretch_ids(self):
+        for data in (
+            {},
+            {'stretch_ids': self.ids[0]},
+            {'stretch_ids': [str(self.ids[0]), {'id': self.ids[1]}, self.ids[2]]},
+            {'stretch_ids': [[self.ids[0]], self.ids[1], self.ids[2]]},
+            {'stretch_ids': ['first', self.ids[1], self.ids[2]]},
+            {'stretch_ids': self.ids[:2]},
+            {'stretch_ids': self.ids + [self.ids[0]]},
+        ):
+            with self.subTest(data=data):
+                self.assertEqual(self.put(data).status_code, 400)
+        self.assertEqual(self.order(), self.ids)
@@ -5,11 +5,18 @@ urlpatterns = [
     path('body-parts/', views.BodyPartListCreateView.as_view(), name='bodypart-list-create'),
     path('body-parts/<int:pk>/', views.BodyPartDetailView.as_view(), name='bodypart-detail'),
     path('', views.StretchListCreateView.as_view(), name='stretch-list-create'),
+    path('bulk/', views.StretchBulkView.as_view(), name='stretch-bulk'),
+    path('facets/', views.StretchFacetsView.as_view(), name='stretch-facets'),
+    path('tags/', views.StretchTagCloudView.as_view(), name='stretch-tags'),
     path('<int:pk>/', views.StretchDetailView.as_view(), name='stretch-detail'),
     path('images/', views.StretchImageUploadView.as_view(), name='stretch-image-upload'),
     path('images/<int:pk>/', views.StretchImageDetailView.as_view(), name='stretch-image-detail'),
+    path('images/uploads/', views.StretchImageUploadSessionView.as_view(), name='stretch-image-upload-session'),
+    path('images/uploads/<uuid:pk>/', views.StretchImageUploadSessionDetailView.as_view(), name='stretch-image-upload-session-detail'),
     path('routines/', views.StretchRoutineListCreateView.as_view(), name='routine-list-create'),
     path('routines/<int:pk>/', views.StretchRoutineDetailView.as_view(), name='routine-detail'),
-    path('routines/<int:routine_id>/stretches/', views.add_stretch_to_routine, name='add-stretch-to-routine'),
+    path('routines/<int:pk>/timeline/', views.StretchRoutineTimelineView.as_view(), name='routine-timeline'),
+    path('routines/<int:routine_id>/stretches/', views.routine_stretches, name='routine-stretches'),
     path('routines/<int:routine_id>/stretches/<int:stretch_id>/', views.remove_stretch_from_routine, name='remove-stretch-from-routine'),
+    path('routines/<int:routine_id>/stretches/<int:stretch_id>/move/', views.move_routine_stretch, name='move-routine-stretch'),
 ]
\ No newline at end of file
@@ -1,38 +1,64 @@
-from rest_framework import generics, status, filters
+from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, RowRange, Sum, Value, Window
+from django.db.models.functions import Coalesce, RowNumber
+from django.utils import timezone
+from recipe_project.autocomplete import affects_terms, replace_terms, store_terms
+from recipe_project.bulk import BulkWriteView
+from recipe_project.conditional import ConditionalGetMixin
+from recipe_project.eager import EagerLoadingMixin, eager_load
+from recipe_project.facets import FacetsView, favorite_counts, grouped_counts, tag_counts
+from recipe_project.fieldsets import requested_fieldset
+from recipe_project.pagination import KeysetCursorPagination
+from recipe_project.rows import ListRowsMixin
+from recipe_project.search import RankedOrderingFilter, RankedSearchFilter
+from recipe_project.tags import TagCloudView
+from recipe_project.uploads import UploadSessionCreateView, UploadSessionDetailView
+from .filters import StretchFilter
 from .models import BodyPart, Stretch, StretchImage, StretchRoutine, RoutineStretch
+from .ranking import rank_in_routine, spaced_ranks
+from .rows import StretchListRows
 from .serializers import (
     BodyPartSerializer, StretchSerializer, StretchListSerializer,
-    StretchImageSerializer, StretchRoutineSerializer, RoutineStretchSerializer
+    StretchImageSerializer, StretchRoutineSerializer, RoutineStretchSerializer, RoutineOrderSerializer
 )
 
 
-class BodyPartListCreateView(generics.ListCreateAPIView):
+class BodyPartListCreateView(EagerLoadingMixin, generics.ListCreateAPIView):
     serializer_class = BodyPartSerializer
     permission_classes = [IsAuthenticated]
+    query_budget = {'GET': 2}
 
     def get_queryset(self):
         return BodyPart.objects.all()
 
 
-class BodyPartDetailView(generics.RetrieveUpdateDestroyAPIView):
+class BodyPartDetailView(EagerLoadingMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = BodyPartSerializer
     permission_classes = [IsAuthenticated]
+    query_budget = {'GET': 2}
 
     def get_queryset(self):
         return BodyPart.objects.all()
 
 
-class StretchListCreateView(generics.ListCreateAPIView):
+class StretchListCreateView(ConditionalGetMixin, ListRowsMixin, EagerLoadingMixin, generics.ListCreateAPIView):
+    related_validator_models = [BodyPart]
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['body_parts', 'difficulty_level', 'is_favorite']
-    search_fields = ['title', 'description', 'tags']
+    query_budget = {'GET': 4}
+    pagination_class = KeysetCursorPagination
+    filter_backends = [DjangoFilterBackend, RankedSearchFilter, RankedOrderingFilter]
+    filterset_class = StretchFilter
+    trigram_search_fields = ['title']
     ordering_fields = ['created_at', 'title', 'difficulty_level', 'duration']
     ordering = ['-created_at']
+    list_rows = StretchListRows
 
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -40,15 +66,96 @@ class StretchListCreateView(generics.ListCreateAPIView):
         return StretchSerializer
 
     def get_queryset(self):
-        return Stretch.objects.filter(created_by=self.request.user).prefetch_related('body_parts', 'images')
+        return Stretch.objects.filter(created_by=self.request.user)
 
 
-class StretchDetailView(generics.RetrieveUpdateDestroyAPIView):
+class StretchFacetsView(FacetsView):
+    """
+    Counts per difficulty level, body part, favorite flag and tag for the
+    stretches the list would return with the same ?search= and filters.
+    """
+    query_budget = {'GET': 5}
+    cache_prefix = 'stretch-facets'
+    related_validator_models = [BodyPart]
+    filter_backends = [DjangoFilterBackend, RankedSearchFilter]
+    filterset_class = StretchListCreateView.filterset_class
+    trigram_search_fields = StretchListCreateView.trigram_search_fields
+
+    def get_queryset(self):
+        return Stretch.objects.filter(created_by=self.request.user)
+
+    def get_facets(self, queryset):
+        groups = {group['difficulty_level']: group for group in grouped_counts(queryset, 'difficulty_level')}
+        count, favorites = favorite_counts(list(groups.values()))
+        body_parts = (
+            Stretch.body_parts.through.objects
+            .filter(stretch__in=queryset.order_by().values('pk'))
+            .values('bodypart', 'bodypart__name')
+            .annotate(count=Count('stretch'))
+            .order_by('-count', 'bodypart__name')
+        )
+        return {
+            'count': count,
+            'difficulty_level': [
+                {'value': value, 'count': groups[value]['count'] if value in groups else 0}
+                for value, _ in Stretch._meta.get_field('difficulty_level').choices
+            ],
+            'body_parts': [
+                {'id': row['bodypart'], 'name': row['bodypart__name'], 'count': row['count']}
+                for row in body_parts
+            ],
+            'is_favorite': favorites,
+            'tags': tag_counts(queryset, self.tag_limit),
+        }
+
+
+class StretchTagCloudView(TagCloudView):
+    cache_prefix = 'stretch-tags'
+
+    def get_queryset(self):
+        return Stretch.objects.filter(created_by=self.request.user)
+
+
+class StretchDetailView(ConditionalGetMixin, EagerLoadingMixin, generics.RetrieveUpdateDestroyAPIView):
+    serializer_class = StretchSerializer
+    related_validator_models = [BodyPart]
+    permission_classes = [IsAuthenticated]
+    query_budget = {'GET': 5}
+
+    def get_queryset(self):
+        return Stretch.objects.filter(created_by=self.request.user)
+
+
+class StretchBulkView(BulkWriteView):
+    """
+    POST {"stretches": [...]} creates, PATCH {"stretches": [{"id": ..., ...}]}
+    updates and DELETE {"ids": [...]} deletes stretches in one transaction.
+    """
     serializer_class = StretchSerializer
     permission_classes = [IsAuthenticated]
+    items_key = 'stretches'
+    m2m_fields = {'body_part_ids': 'body_parts'}
 
     def get_queryset(self):
-        return Stretch.objects.filter(created_by=self.request.user).prefetch_related('body_parts', 'images')
+        return Stretch.objects.filter(created_by=self.request.user)
+
+    def validate_batch(self, validated):
+        body_part_ids = {pk for data in validated for pk in data.get('body_part_ids', [])}
+        existing = set(BodyPart.objects.filter(id__in=body_part_ids).values_list('id', flat=True))
+        errors = {}
+        for index, data in enumerate(validated):
+            missing = [pk for pk in data.get('body_part_ids', []) if pk not in existing]
+            if missing:
+                errors[index] = {'body_part_ids': [f'Body parts {missing} do not exist.']}
+        return errors
+
+    # bulk_create/bulk_update skip the post_save handler that maintains the
+    # autocomplete index.
+    def after_write(self, instances, fields):
+        if fields is None:
+            store_terms(instances)
+        elif affects_terms(fields):
+            replace_terms(instances)
 
 
 class StretchImageUploadView(generics.CreateAPIView):
@@ -69,47 +176,225 @@ class StretchImageUploadView(generics.CreateAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class StretchImageDetailView(generics.RetrieveUpdateDestroyAPIView):
+class StretchImageUploadSessionView(UploadSessionCreateView):
+    """POST {"stretch_id": ..., "filename": ..., "size": ...} starts a resumable upload."""
     serializer_class = StretchImageSerializer
     permission_classes = [IsAuthenticated]
+    parent_model = Stretch
+    parent_field = 'stretch'
+    kind = 'stretch_image'
+
+
+class StretchImageUploadSessionDetailView(UploadSessionDetailView):
+    """GET the offset, PUT a byte range, POST to complete, DELETE to cancel."""
+    serializer_class = StretchImageSerializer
+    permission_classes = [IsAuthenticated]
+    parent_model = Stretch
+    parent_field = 'stretch'
+    kind = 'stretch_image'
+
+
+class StretchImageDetailView(EagerLoadingMixin, generics.RetrieveUpdateDestroyAPIView):
+    serializer_class = StretchImageSerializer
+    permission_classes = [IsAuthenticated]
+    query_budget = {'GET': 2}
 
     def get_queryset(self):
         return StretchImage.objects.filter(stretch__created_by=self.request.user)
 
 
-class StretchRoutineListCreateView(generics.ListCreateAPIView):
+class StretchRoutineListCreateView(ConditionalGetMixin, EagerLoadingMixin, generics.ListCreateAPIView):
     serializer_class = StretchRoutineSerializer
+    # Routines embed their stretches, so edits to those count as modifications.
+    last_modified_fields = ['updated_at', 'routinestretch__stretch__updated_at']
+    related_validator_models = [BodyPart]
     permission_classes = [IsAuthenticated]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['name', 'description']
+    query_budget = {'GET': 5}
+    filter_backends = [RankedSearchFilter, RankedOrderingFilter]
+    trigram_search_fields = ['name']
     ordering_fields = ['created_at', 'name']
     ordering = ['-created_at']
 
     def get_queryset(self):
-        return StretchRoutine.objects.filter(created_by=self.request.user).prefetch_related('routinestretch_set__stretch')
+        return StretchRoutine.objects.filter(created_by=self.request.user)
 
 
-class StretchRoutineDetailView(generics.RetrieveUpdateDestroyAPIView):
+class StretchRoutineDetailView(ConditionalGetMixin, EagerLoadingMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = StretchRoutineSerializer
+    # Routines embed their stretches, so edits to those count as modifications.
+    last_modified_fields = ['updated_at', 'routinestretch__stretch__updated_at']
+    related_validator_models = [BodyPart]
     permission_classes = [IsAuthenticated]
+    query_budget = {'GET': 5}
 
     def get_queryset(self):
-        return StretchRoutine.objects.filter(created_by=self.request.user).prefetch_related('routinestretch_set__stretch')
+        return StretchRoutine.objects.filter(created_by=self.request.user)
 
 
-@api_view(['POST'])
+def _placement(data):
+    """
+    Reads the optional `before`/`after` stretch ids that position an item.
+    """
+    before, after = data.get('before'), data.get('after')
+    if before is not None and after is not None:
+        raise ValueError('Give either before or after, not both')
+    for value in (before, after):
+        if value is not None and (not isinstance(value, int) or isinstance(value, bool)):
+            raise ValueError('before and after must be stretch ids')
+    return before, after
+
+
+class StretchRoutineTimelineView(ConditionalGetMixin, generics.RetrieveAPIView):
+    """
+    Flat playback timeline of a routine: effective duration and repetitions
+    of each stretch (the routine's overrides, else the stretch's own) and
+    start offsets in seconds, computed in one SQL query and cached until the
+    routine or one of its stretches changes.
+    """
+    permission_classes = [IsAuthenticated]
+    query_budget = {'GET': 4}
+    last_modified_fields = ['updated_at', 'routinestretch__stretch__updated_at']
+
+    def get_queryset(self):
+        return StretchRoutine.objects.filter(created_by=self.request.user)
+
+    def retrieve(self, request, *args, **kwargs):
+        if self.etag is None:
+            # No validators: the routine does not exist for this user.
+            self.get_object()
+        # The ETag covers the routine, its stretches and the user.
+        cache_key = f'routine-timeline:{self.etag}'
+        timeline = cache.get(cache_key)
+        if timeline is None:
+            timeline = self.build_timeline(self.get_object())
+            cache.set(cache_key, timeline, settings.ROUTINE_TIMELINE_CACHE_TIMEOUT)
+        return Response(timeline)
+
+    def build_timeline(self, routine):
+        duration = Coalesce('custom_duration', 'stretch__duration')
+        playback_order = [F('rank').asc(), F('id').asc()]
+        items = list(
+            RoutineStretch.objects.filter(routine=routine)
+            .annotate(
+                position=Window(RowNumber(), order_by=playback_order),
+                duration=duration,
+                repetitions=Coalesce('custom_repetitions', 'stretch__repetitions'),
+                start=Coalesce(
+                    Window(
+                        Sum(Coalesce(duration, Value(0))),
+                        order_by=playback_order,
+                        frame=RowRange(start=None, end=-1),
+                    ),
+                    Value(0),
+                ),
+                total=Window(Sum(Coalesce(duration, Value(0)))),
+            )
+            .order_by('rank', 'id')
+            .values('position', 'stretch_id', 'stretch__title', 'duration', 'repetitions', 'start', 'total')
+        )
+        return {
+            'id': routine.pk,
+            'name': routine.name,
+            'total_duration': items[0]['total'] if items else 0,
+            'timeline': [
+                {
+                    'position': item['position'],
+                    'stretch_id': item['stretch_id'],
+                    'title': item['stretch__title'],
+                    'duration': item['duration'],
+                    'repetitions': item['repetitions'],
+                    'start': item['start'],
+                }
+                for item in items
+            ],
+        }
+
+
+@api_view(['POST', 'PUT'])
 @permission_classes([IsAuthenticated])
-def add_stretch_to_routine(request, routine_id):
+def routine_stretches(request, routine_id):
+    """
+    POST adds a stretch, at the end or next to the stretch given as
+    `before`/`after`. PUT takes `stretch_ids`, the routine's stretches in
+    their new order, and rewrites every rank in one bulk_update.
+    """
     try:
-        routine = StretchRoutine.objects.get(id=routine_id, created_by=request.user)
-    except StretchRoutine.DoesNotExist:
-        return Response({'error': 'Routine not found'}, status=status.HTTP_404_NOT_FOUND)
+        before, after = _placement(request.data)
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
-    serializer = RoutineStretchSerializer(data=request.data)
-    if serializer.is_valid():
-        serializer.save(routine=routine)
+    with transaction.atomic():
+        # Serializes concurrent reorders of the same routine.
+        routine = StretchRoutine.objects.select_for_update().filter(id=routine_id, created_by=request.user).first()
+        if routine is None:
+            return Response({'error': 'Routine not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        if request.method == 'PUT':
+            return _reorder_routine(request, routine)
+
+        serializer = RoutineStretchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            rank = rank_in_routine(routine, before, after)
+        except RoutineStretch.DoesNotExist:
+            return Response({'error': 'Neighbouring stretch not in routine'}, status=status.HTTP_400_BAD_REQUEST)
+        serializer.save(routine=routine, rank=rank)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+def _reorder_routine(request, routine):
+    serializer = RoutineOrderSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    stretch_ids = serializer.validated_data['stretch_ids']
+    items = {item.stretch_id: item for item in RoutineStretch.objects.filter(routine=routine).only('id', 'stretch_id', 'rank')}
+    if sorted(stretch_ids) != sorted(items):
+        return Response(
+            {'error': "stretch_ids must list each of the routine's stretches exactly once"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    ordered = [items[stretch_id] for stretch_id in stretch_ids]
+    for item, rank in zip(ordered, spaced_ranks(len(ordered))):
+        item.rank = rank
+    RoutineStretch.objects.bulk_update(ordered, ['rank'])
+    StretchRoutine.objects.filter(pk=routine.pk).update(updated_at=timezone.now())
+
+    routine = eager_load(
+        StretchRoutine.objects.all(), StretchRoutineSerializer, fieldset=requested_fieldset(request)
+    ).get(pk=routine.pk)
+    return Response(StretchRoutineSerializer(routine, context={'request': request}).data)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def move_routine_stretch(request, routine_id, stretch_id):
+    """
+    Moves a stretch right before or after another one (`before`/`after`),
+    or to the end when neither is given. Writes only the moved item.
+    """
+    try:
+        before, after = _placement(request.data)
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    if stretch_id in (before, after):
+        return Response({'error': 'Cannot move a stretch next to itself'}, status=status.HTTP_400_BAD_REQUEST)
+
+    with transaction.atomic():
+        routine = StretchRoutine.objects.select_for_update().filter(id=routine_id, created_by=request.user).first()
+        item = eager_load(
+            RoutineStretch.objects.filter(routine=routine, stretch_id=stretch_id), RoutineStretchSerializer
+        ).first() if routine else None
+        if item is None:
+            return Response({'error': 'Routine or stretch not found'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            item.rank = rank_in_routine(routine, before, after, exclude=item)
+        except RoutineStretch.DoesNotExist:
+            return Response({'error': 'Neighbouring stretch not in routine'}, status=status.HTTP_400_BAD_REQUEST)
+        item.save(update_fields=['rank'])
+
+    return Response(RoutineStretchSerializer(item, context={'request': request}).data)
 
 
 @api_view(['DELETE'])